@@ -6,13 +6,40 @@ import inspect
 import sys
 
 from .lexing.lexer import Lexer, LexerError
+from .optimizer.constant_folding import ConstantFolder
 from .parsing.control_flow_parser import ControlFlowParser
 from .parsing.expression_parser import ExpressionParser, ParserError
+from .runtime.closure_compiler import ClosureCompiler
 from .runtime.evaluator import Evaluator, EvaluatorError
+from .semantic.effect_analysis import describe
 from .semantic.semantic_analysis import SemanticAnalysis, SemanticError
+from .transpiler.python_engine import PythonEngine
+from .vm.compiler import BytecodeCompiler
+from .vm.disassembler import disassemble
+from .vm.vm import VirtualMachine
 
+# every engine runs the same checked tree and shares the evaluator's
+# value semantics, they only differ in how the tree gets executed
+ENGINES = {
+    "tree": Evaluator,
+    "closure": ClosureCompiler,
+    "vm": VirtualMachine,
+    "python": PythonEngine,
+}
 
-def run_file(path: str, *, show_tokens=False, show_ast=False, trace=False) -> int:
+
+def run_file(
+    path: str,
+    *,
+    show_tokens=False,
+    show_ast=False,
+    trace=False,
+    engine="tree",
+    show_bytecode=False,
+    show_python=False,
+    fold=True,
+    show_effects=False,
+) -> int:
     try:
         lex = Lexer(path)
         tokens = lex.tokenizer()
@@ -28,17 +55,35 @@ def run_file(path: str, *, show_tokens=False, show_ast=False, trace=False) -> in
         if show_ast:
             print(roots)
 
-        SemanticAnalysis(lex.text, roots).walk_program()
+        semantics = SemanticAnalysis(lex.text, roots)
+        semantics.walk_program()
+        if show_effects:
+            for summary in semantics.effects.values():
+                print(describe(summary))
+        if fold:
+            ConstantFolder(roots).fold()
+
+        if show_bytecode:
+            compiler = BytecodeCompiler(roots)
+            print(disassemble(compiler.compile_program(), compiler.code_objects))
+
+        if show_python:
+            source = PythonEngine(lex.text, roots).transpile()
+            if source is None:
+                print("note: this program runs on the closure compiler, it can't be transpiled.")
+            else:
+                print(source)
 
         # --- only pass trace if supported ---
+        engine_class = ENGINES[engine]
         kwargs = {}
-        params = inspect.signature(Evaluator.__init__).parameters
+        params = inspect.signature(engine_class.__init__).parameters
         if trace and ("trace" not in params):
             print("note: this build doesn't support --trace; running normally.", file=sys.stderr)
         elif "trace" in params:
             kwargs["trace"] = bool(trace)
 
-        Evaluator(lex.text, roots, **kwargs).eval_program()
+        engine_class(lex.text, roots, **kwargs).eval_program()
         return 0
     except LexerError as e:
         print(e, file=sys.stderr)
@@ -60,10 +105,43 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--tokens", action="store_true", help="Print tokens before running")
     p.add_argument("--ast", action="store_true", help="Print parsed block AST before running")
     p.add_argument("--trace", action="store_true", help="Trace evaluation (if supported)")
+    p.add_argument(
+        "--engine",
+        choices=tuple(ENGINES),
+        default="tree",
+        help="Execution engine: tree walking evaluator, closure compiler, bytecode vm "
+        "or transpiled python",
+    )
+    p.add_argument("--dis", action="store_true", help="Print the vm bytecode before running")
+    p.add_argument(
+        "--emit-python",
+        action="store_true",
+        help="Print the python source the program transpiles to before running",
+    )
+    p.add_argument(
+        "--no-fold",
+        action="store_true",
+        help="Don't fold constant expressions before running (to measure what folding buys)",
+    )
+    p.add_argument(
+        "--effects",
+        action="store_true",
+        help="Print what calling every function can do (pure, cacheable, memoized) before running",
+    )
     return p
 
 
 def main(argv: list[str] | None = None) -> None:
     args = build_parser().parse_args(argv)
-    code = run_file(args.file, show_tokens=args.tokens, show_ast=args.ast, trace=args.trace)
+    code = run_file(
+        args.file,
+        show_tokens=args.tokens,
+        show_ast=args.ast,
+        trace=args.trace,
+        engine=args.engine,
+        show_bytecode=args.dis,
+        show_python=args.emit_python,
+        fold=not args.no_fold,
+        show_effects=args.effects,
+    )
     sys.exit(code)
@@ -0,0 +1,313 @@
+# an optional pass run after the semantic pass and before any engine, which works out
+# everything in the tree that doesn't depend on the program running.
+#
+# every literal is replaced by the python value it evaluates to, so no engine converts
+# it again on every evaluation, and every binary or unary operation whose operands are
+# all constant is carried out once, here, with the very same handlers the engines use
+# (see binary_operations.py). an array literal of constants becomes a ConstantArrayNode,
+# which hands out a fresh copy of its value whenever it is evaluated, because arrays are
+# mutable and every evaluation of an array literal is a new array.
+#
+# an operation that fails (1 / 0, "a" * "b") is left in the tree as it is, so it still
+# raises when, and only if, it runs, with the error pointing at the operation like it
+# would without this pass. so are operations whose results would be huge
+# ("a" * 1000000000), which would otherwise be built before the program even starts
+
+import math
+
+from bang.lexing.lexer_tokens import (
+    T_ASTERISK_ENUM_VAL,
+    T_EXPO_ENUM_VAL,
+    T_NEGATE_ENUM_VAL,
+    T_UMINUS_ENUM_VAL,
+    T_UPLUS_ENUM_VAL,
+)
+from bang.parsing.parser_nodes import (
+    ARRAY_LITERAL_NODE_CLASS,
+    ASSIGNMENT_NODE_CLASS,
+    BIN_OP_NODE_CLASS,
+    BLOCK_NODE_CLASS,
+    BOOLEAN_LITERAL_NODE_CLASS,
+    BREAK_NODE_CLASS,
+    CALL_NODE_CLASS,
+    CONSTANT_ARRAY_NODE_CLASS,
+    CONTINUE_NODE_CLASS,
+    DATA_CLASS_NODE_CLASS,
+    EXPRESSION_NODE_CLASS,
+    FIELD_ACCESS_NODE_CLASS,
+    FLOAT_LITERAL_NODE_CLASS,
+    FOR_NODE_CLASS,
+    FUNCTION_NODE_CLASS,
+    IF_NODE_CLASS,
+    INDEX_NODE_CLASS,
+    INTEGER_LITERAL_NODE_CLASS,
+    NONE_LITERAL_NODE_CLASS,
+    RETURN_NODE_CLASS,
+    STRING_LITERAL_NODE_CLASS,
+    UNARY_OP_NODE_CLASS,
+    WHILE_NODE_CLASS,
+)
+from bang.runtime.binary_operations import BIN_OP_TABLE, BinOpError, resolve_bin_op
+from bang.runtime.evaluator_nodes import NUMERIC_ARRAY
+
+# the same conversions the evaluator makes (booleans are ints, none is zero)
+LITERALS = {
+    INTEGER_LITERAL_NODE_CLASS: int,
+    FLOAT_LITERAL_NODE_CLASS: float,
+    STRING_LITERAL_NODE_CLASS: str,
+    BOOLEAN_LITERAL_NODE_CLASS: int,
+    NONE_LITERAL_NODE_CLASS: lambda _: 0,
+}
+
+SCALAR_TYPES = frozenset((int, float, str, bool))
+
+# the largest string or array (counting nested elements) and int (in bits) a folded
+# operation may produce, anything bigger is left to be built at runtime
+MAX_FOLDED_SIZE = 4096
+MAX_FOLDED_BITS = 4096
+
+
+def is_constant(root):
+    type_root = type(root)
+    return type_root in SCALAR_TYPES or type_root is CONSTANT_ARRAY_NODE_CLASS
+
+
+def constant_value(root):
+    if type(root) is CONSTANT_ARRAY_NODE_CLASS:
+        return root.value
+    return root
+
+
+def value_size(value):
+    """The number of elements in value, nested arrays included, or None when it
+    holds something that isn't a constant."""
+    size = 0
+    for element in value:
+        size += 1
+        if type(element) is list:
+            inner = value_size(element)
+            if inner is None:
+                return None
+            size += inner
+        elif type(element) not in SCALAR_TYPES:
+            return None
+    return size
+
+
+# the operations whose result can be far bigger than their operands, those
+# are checked before they are carried out
+GROWING_OPS = frozenset((T_EXPO_ENUM_VAL, T_ASTERISK_ENUM_VAL))
+
+
+def too_large(op, left, right):
+    if op == T_EXPO_ENUM_VAL:
+        if type(left) in (int, bool) and type(right) in (int, bool) and right > 0:
+            return abs(left) > 1 and right * left.bit_length() > MAX_FOLDED_BITS
+        return False
+    if op == T_ASTERISK_ENUM_VAL:
+        if type(left) is int and type(right) in (str, list):
+            left, right = right, left
+        if type(left) in (str, list) and type(right) is int:
+            return len(left) * right > MAX_FOLDED_SIZE
+        if type(left) is int and type(right) is int:
+            return left.bit_length() + right.bit_length() > MAX_FOLDED_BITS
+    return False
+
+
+class ConstantFolder:
+    def __init__(self, roots):
+        self.roots = roots
+        # how many operations and array literals were replaced by their value
+        self.folded = 0
+
+        self.construct_to_fold = {
+            ASSIGNMENT_NODE_CLASS: self.fold_assignment,
+            IF_NODE_CLASS: self.fold_if,
+            FOR_NODE_CLASS: self.fold_for,
+            WHILE_NODE_CLASS: self.fold_while,
+            BLOCK_NODE_CLASS: self.fold_block,
+            BREAK_NODE_CLASS: self.fold_nothing,
+            CONTINUE_NODE_CLASS: self.fold_nothing,
+            RETURN_NODE_CLASS: self.fold_return,
+            EXPRESSION_NODE_CLASS: self.fold_wrapped,
+            FUNCTION_NODE_CLASS: self.fold_function,
+            CALL_NODE_CLASS: self.fold_call,
+            DATA_CLASS_NODE_CLASS: self.fold_nothing,
+        }
+
+    def fold(self):
+        for root in self.roots:
+            self.fold_construct(root)
+        return self.roots
+
+    # -------------------------------------------
+    # STATEMENTS START
+    # -------------------------------------------
+
+    def fold_construct(self, root):
+        self.construct_to_fold[type(root)](root)
+
+    def fold_nothing(self, root):
+        pass
+
+    def fold_block(self, root):
+        for construct in root.block:
+            self.fold_construct(construct)
+
+    def fold_if(self, root):
+        self.fold_wrapped(root.condition)
+        self.fold_block(root.body)
+        for elif_root in root.elif_branch.block:
+            self.fold_wrapped(elif_root.condition)
+            self.fold_block(elif_root.body)
+        for else_root in root.else_branch.block:
+            self.fold_block(else_root.body)
+
+    def fold_for(self, root):
+        self.fold_wrapped(root.bound)
+        self.fold_block(root.body)
+
+    def fold_while(self, root):
+        self.fold_wrapped(root.condition)
+        self.fold_block(root.body)
+
+    def fold_return(self, root):
+        self.fold_wrapped(root.expression)
+
+    def fold_function(self, root):
+        self.fold_block(root.body)
+
+    def fold_assignment(self, root):
+        self.fold_wrapped(root.right_hand)
+        self.fold_target(root.left_hand)
+
+    def fold_target(self, left_hand):
+        # the targets themselves stay as they are, only the indexes in them are values
+        type_left_hand = type(left_hand)
+        if type_left_hand is INDEX_NODE_CLASS:
+            for index in left_hand.index:
+                self.fold_wrapped(index)
+        elif type_left_hand is ARRAY_LITERAL_NODE_CLASS:
+            for element in left_hand.elements:
+                self.fold_target(element.root_expr)
+
+    # -------------------------------------------
+    # STATEMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EXPRESSIONS START
+    # -------------------------------------------
+
+    def fold_wrapped(self, root):
+        # an ExpressionNode the engines expect to find where it is, only its
+        # expression is replaced
+        if type(root) is EXPRESSION_NODE_CLASS:
+            root.root_expr = self.fold_expression(root.root_expr)
+
+    def fold_expression(self, root):
+        """Return what root is replaced by: its value when it's constant, otherwise
+        root itself, with everything constant inside of it folded."""
+        type_root = type(root)
+        if type_root is EXPRESSION_NODE_CLASS:
+            folded = self.fold_expression(root.root_expr)
+            if is_constant(folded):
+                return folded
+            root.root_expr = folded
+            return root
+
+        if type_root in LITERALS:
+            return LITERALS[type_root](root.value)
+        if type_root is BIN_OP_NODE_CLASS:
+            return self.fold_bin_op(root)
+        if type_root is UNARY_OP_NODE_CLASS:
+            return self.fold_unary_op(root)
+        if type_root is ARRAY_LITERAL_NODE_CLASS:
+            return self.fold_array_literal(root)
+        if type_root is INDEX_NODE_CLASS:
+            for index in root.index:
+                self.fold_wrapped(index)
+            root.base = self.fold_expression(root.base)
+        elif type_root is CALL_NODE_CLASS:
+            self.fold_call(root)
+        elif type_root is FIELD_ACCESS_NODE_CLASS:
+            root.base = self.fold_expression(root.base)
+        return root
+
+    def fold_call(self, root):
+        root.name = self.fold_expression(root.name)
+        for arg in root.args:
+            self.fold_wrapped(arg)
+
+    def fold_array_literal(self, root):
+        for element in root.elements:
+            self.fold_wrapped(element)
+        if not all(is_constant(element.root_expr) for element in root.elements):
+            return root
+        value = [constant_value(element.root_expr) for element in root.elements]
+        return self.folded_value(value, root)
+
+    def fold_bin_op(self, root):
+        root.left = left = self.fold_expression(root.left)
+        root.right = right = self.fold_expression(root.right)
+        if not (is_constant(left) and is_constant(right)):
+            return root
+
+        left, right = constant_value(left), constant_value(right)
+        op = root.op
+        if op in GROWING_OPS and too_large(op, left, right):
+            return root
+        key = (type(left), type(right), op)
+        handler = BIN_OP_TABLE.get(key) or resolve_bin_op(*key)
+        try:
+            value = handler(left, right)
+        except (BinOpError, ArithmeticError, TypeError, ValueError):
+            # left for the engines to raise, where the operation is
+            return root
+        return self.folded_value(value, root)
+
+    def fold_unary_op(self, root):
+        root.operand = operand = self.fold_expression(root.operand)
+        if not is_constant(operand):
+            return root
+
+        operand = constant_value(operand)
+        if root.op == T_NEGATE_ENUM_VAL:
+            value = not operand
+        elif type(operand) in (int, float) and root.op == T_UMINUS_ENUM_VAL:
+            value = -operand
+        elif type(operand) in (int, float) and root.op == T_UPLUS_ENUM_VAL:
+            value = +operand
+        else:
+            return root
+        return self.folded_value(value, root)
+
+    def folded_value(self, value, root):
+        """Return what root is replaced by now that its value is known, which is root
+        itself when the value can't (or shouldn't) be put in the tree."""
+        type_value = type(value)
+        if type_value is NUMERIC_ARRAY:
+            # a numpy vectorized result, put in the tree as the array it is
+            value = value.materialize()
+            type_value = list
+        if type_value is list:
+            size = value_size(value)
+            if size is None or size > MAX_FOLDED_SIZE:
+                return root
+            self.folded += 1
+            nested = any(type(element) is list for element in value)
+            return CONSTANT_ARRAY_NODE_CLASS(value=value, meta_data=root.meta_data, nested=nested)
+        if type_value not in SCALAR_TYPES:
+            return root
+        if type_value is str and len(value) > MAX_FOLDED_SIZE:
+            return root
+        if type_value is int and value.bit_length() > MAX_FOLDED_BITS:
+            return root
+        if type_value is float and not math.isfinite(value):
+            return root
+        self.folded += 1
+        return value
+
+    # -------------------------------------------
+    # EXPRESSIONS END
+    # -------------------------------------------
@@ -0,0 +1,136 @@
+import pytest
+
+from bang.lexing.lexer import Lexer
+from bang.optimizer.constant_folding import ConstantFolder
+from bang.parsing.control_flow_parser import ControlFlowParser
+from bang.parsing.expression_parser import ExpressionParser
+from bang.parsing.parser_nodes import BIN_OP_NODE_CLASS, CONSTANT_ARRAY_NODE_CLASS
+from bang.runtime.closure_compiler import ClosureCompiler
+from bang.runtime.evaluator import Evaluator, EvaluatorError
+from bang.semantic.semantic_analysis import SemanticAnalysis
+from bang.transpiler.python_engine import PythonEngine
+from bang.vm.vm import VirtualMachine
+
+ENGINES = [Evaluator, ClosureCompiler, VirtualMachine, PythonEngine]
+
+
+def build(code: str, tmp_path, fold=True):
+    """Lexes, parses and semantically checks a Bang program, folding its constants
+    unless told not to, and returns the file text and the roots."""
+    src = tmp_path / "temp.bang"
+    src.write_text(code)
+
+    lexer = Lexer(str(src))
+    tokens = lexer.tokenizer()
+
+    e_parser = ExpressionParser(tokens, lexer.text)
+    e_parser.split()
+    e_parser.loading_into_algos()
+
+    roots = ControlFlowParser(lexer.text, e_parser.post_SYA).blockenize()
+    SemanticAnalysis(lexer.text, roots).walk_program()
+    if fold:
+        ConstantFolder(roots).fold()
+    return lexer.text, roots
+
+
+def run(code: str, tmp_path, engine=Evaluator, fold=True):
+    runner = engine(*build(code, tmp_path, fold))
+    runner.eval_program()
+    return runner
+
+
+def right_hand(code, tmp_path):
+    """The right hand of the program's last assignment, after folding."""
+    _, roots = build(code, tmp_path)
+    return roots[-1].right_hand.root_expr
+
+
+# ----------------------------
+# What gets folded
+# ----------------------------
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        ("x = 1 + 2 * (3 + 4)\n", 15),
+        ('x = "ab" + "c"\n', "abc"),
+        ("x = -(2 ** 3)\n", -8),
+        ("x = !0\n", True),
+        ("x = true\n", 1),
+        ("x = none\n", 0),
+        ("x = 7 // 2 < 4\n", True),
+        ('x = "b" in "abc"\n', True),
+        ("x = 1.5 * 2\n", 3.0),
+    ],
+)
+def test_constant_expressions_become_values(code, expected, tmp_path):
+    value = right_hand(code, tmp_path)
+    assert type(value) is type(expected)
+    assert value == expected
+
+
+def test_constant_arrays_are_folded(tmp_path):
+    value = right_hand("x = [[0] * 2] * 2 + [[1, 2]]\n", tmp_path)
+    assert type(value) is CONSTANT_ARRAY_NODE_CLASS
+    assert value.value == [[0, 0], [0, 0], [1, 2]]
+    assert value.nested
+
+
+def test_only_the_constant_part_is_folded(tmp_path):
+    value = right_hand("y = 1\nx = y + 2 * 3\n", tmp_path)
+    assert type(value) is BIN_OP_NODE_CLASS
+    assert value.right == 6
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "x = 1 / 0\n",
+        "x = [1, 2] * [1, 2, 3]\n",
+        'x = "a" * 100000\n',
+        "x = 2 ** 100000\n",
+        "x = [1] * 100000\n",
+    ],
+)
+def test_failing_and_huge_operations_are_left_alone(code, tmp_path):
+    assert type(right_hand(code, tmp_path)) is BIN_OP_NODE_CLASS
+
+
+# ----------------------------
+# Semantics
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_constant_arrays_are_copied_on_use(engine, tmp_path):
+    code = (
+        "fn f args\nr = [1, [2]]\nr[1] += [3]\nreturn r\nend\n"
+        "a = f{}\nb = f{}\nc = [[0] * 2] * 2\nc[0][0] = 9\nr = [a, b, c]\n"
+    )
+    engine = run(code, tmp_path, engine)
+    assert engine.scope_stack[0]["r"] == [[1, [2, 3]], [1, [2, 3]], [[9, 0], [0, 0]]]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_folding_doesnt_change_results(engine, tmp_path):
+    code = (
+        'r = [1 + 2 * 3, "ab" * 2, [1, 2] * 2, 7 / 2, 7 // 2, 2 ** 10, -3, +2.5, !1, '
+        '"abc" - "b", [1, 2, 3] / [2], [1, 2] * [3, 4], "a" < "b", 2 in [1, 2], true + 1, '
+        '"a,b" / ",", [[1]] && [2], 0 || "x"]\n'
+    )
+    expected = run(code, tmp_path, Evaluator, fold=False).scope_stack[0]["r"]
+    assert run(code, tmp_path, engine).scope_stack[0]["r"] == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_errors_are_raised_where_the_operation_is(engine, tmp_path):
+    code = "fn f args\nreturn 1\nend\nif f{} == 2\nx = 1 / 0\nend\ny = 2 + 3\nz = 4 // (2 - 2)\n"
+    with pytest.raises(EvaluatorError) as expected:
+        run(code, tmp_path, Evaluator, fold=False)
+    with pytest.raises(EvaluatorError) as error:
+        run(code, tmp_path, engine)
+
+    assert error.value.msg == expected.value.msg == "division by zero"
+    assert (error.value.row, error.value.start, error.value.end) == (
+        expected.value.row,
+        expected.value.start,
+        expected.value.end,
+    )
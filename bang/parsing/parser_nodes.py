@@ -109,6 +109,29 @@ class ArrayLiteralNode:
         return f"ArrayLiteral({self.elements!r})"
 
 
+def _copy_nested(value):
+    return [_copy_nested(v) if type(v) is list else v for v in value]
+
+
+# never made by the parser, the constant folder (see optimizer/constant_folding.py)
+# puts one in place of an array literal whose elements are all known before the
+# program runs. arrays are mutable, so every evaluation gets a fresh copy of value
+@dataclass(slots=True)
+class ConstantArrayNode:
+    value: list
+    meta_data: Lexeme
+    # whether value holds arrays of its own, which have to be copied as well
+    nested: bool = False
+
+    def materialize(self):
+        if self.nested:
+            return _copy_nested(self.value)
+        return self.value[:]
+
+    def __repr__(self):
+        return f"ConstantArray({self.value!r})"
+
+
 @dataclass(slots=True)
 class IndexNode:
     base: Any  # the expression evaluating to an array
@@ -266,6 +289,8 @@ class FunctionNode:
     arg_list_name: IdentifierNode
     return_expr: ReturnNode | None = None
     body: BlockNode = field(default_factory=BlockNode)
+    # the EffectSummary the semantic pass works out for the function
+    effects: Any = None
 
     def __repr__(self) -> str:
         return f"""
@@ -312,6 +337,7 @@ BOOLEAN_LITERAL_NODE_CLASS = BooleanLiteralNode
 BREAK_NODE_CLASS = BreakNode
 CALL_NODE_CLASS = CallNode
 CONTINUE_NODE_CLASS = ContinueNode
+CONSTANT_ARRAY_NODE_CLASS = ConstantArrayNode
 DATA_CLASS_NODE_CLASS = DataClassNode
 ELIF_NODE_CLASS = ElifNode
 ELSE_NODE_CLASS = ElseNode
@@ -0,0 +1,721 @@
+# every binary operation bang supports at runtime, resolved ahead of time.
+#
+# which python function carries out an operation only depends on the types of its
+# two operands and on the operator, so instead of working that out on every single
+# operation, every combination is worked out once, when this module is imported,
+# and put in one table keyed on (left type, right type, operator). evaluating a
+# binary operation is then one dictionary lookup and one call.
+#
+# the handlers don't know where in the source the operation is, so when one fails
+# it raises a BinOpError with just the message, which the evaluator turns into an
+# EvaluatorError pointing at the operation
+
+import operator
+import sys
+import sysconfig
+from array import array
+from copy import deepcopy
+from itertools import chain, repeat
+
+from bang.lexing.lexer_tokens import (
+    T_AND_ENUM_VAL,
+    T_ASTERISK_ENUM_VAL,
+    T_DSLASH_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_EXPO_ENUM_VAL,
+    T_GT_ENUM_VAL,
+    T_GTEQ_ENUM_VAL,
+    T_IN_ENUM_VAL,
+    T_LEQ_ENUM_VAL,
+    T_LT_ENUM_VAL,
+    T_MINUS_ENUM_VAL,
+    T_NEQ_ENUM_VAL,
+    T_OR_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+    T_SLASH_ENUM_VAL,
+)
+from bang.runtime.evaluator_nodes import (
+    LAZY_RANGE,
+    NUMERIC_ARRAY,
+    PACKED_ARRAY,
+    PACKED_MIN_LENGTH,
+    PACKED_TYPECODES,
+)
+
+try:
+    import numpy
+except ImportError:
+    # numpy is optional (pip install bang-lang[numpy]), without it every
+    # element-wise operation runs on python lists
+    numpy = None
+
+
+class BinOpError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+        super().__init__(msg)
+
+
+BIN_OPS = (
+    T_PLUS_ENUM_VAL,
+    T_MINUS_ENUM_VAL,
+    T_ASTERISK_ENUM_VAL,
+    T_SLASH_ENUM_VAL,
+    T_DSLASH_ENUM_VAL,
+    T_EXPO_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_NEQ_ENUM_VAL,
+    T_LT_ENUM_VAL,
+    T_LEQ_ENUM_VAL,
+    T_GT_ENUM_VAL,
+    T_GTEQ_ENUM_VAL,
+    T_AND_ENUM_VAL,
+    T_OR_ENUM_VAL,
+    T_IN_ENUM_VAL,
+)
+
+
+def _and(a, b):
+    return a and b
+
+
+def _or(a, b):
+    return a or b
+
+
+def _in(a, b):
+    return a in b
+
+
+def unsupported(op):
+    def raise_unsupported(a, b):
+        raise BinOpError(f"operation '{op}' not supported between {type(a)} and {type(b)}")
+
+    return raise_unsupported
+
+
+# -------------------------------------------
+# NUMBER OPERATIONS START
+# -------------------------------------------
+
+
+def number_div(a, b):
+    if b == 0:
+        raise BinOpError("division by zero")
+    return a / b
+
+
+def number_floor_div(a, b):
+    if b == 0:
+        raise BinOpError("division by zero")
+    return a // b
+
+
+# every supported operation between two numbers (ints, floats and bools) in bang
+NUMBER_OPS = {
+    T_PLUS_ENUM_VAL: operator.add,
+    T_MINUS_ENUM_VAL: operator.sub,
+    T_ASTERISK_ENUM_VAL: operator.mul,
+    T_SLASH_ENUM_VAL: number_div,
+    T_DSLASH_ENUM_VAL: number_floor_div,
+    T_EXPO_ENUM_VAL: operator.pow,
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_LT_ENUM_VAL: operator.lt,
+    T_LEQ_ENUM_VAL: operator.le,
+    T_GT_ENUM_VAL: operator.gt,
+    T_GTEQ_ENUM_VAL: operator.ge,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+}
+
+# -------------------------------------------
+# NUMBER OPERATIONS END
+# -------------------------------------------
+
+# -------------------------------------------
+# STRING OPERATIONS START
+# -------------------------------------------
+
+
+def str_sub(a, b):
+    return a.replace(b, "")
+
+
+def str_div(a, b):
+    if b == "":
+        return list(a)
+    return a.split(b)
+
+
+STR_OPS = {
+    T_PLUS_ENUM_VAL: operator.add,
+    T_MINUS_ENUM_VAL: str_sub,
+    T_SLASH_ENUM_VAL: str_div,
+    T_LT_ENUM_VAL: operator.lt,
+    T_LEQ_ENUM_VAL: operator.le,
+    T_GT_ENUM_VAL: operator.gt,
+    T_GTEQ_ENUM_VAL: operator.ge,
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+    T_IN_ENUM_VAL: _in,
+}
+
+# -------------------------------------------
+# STRING OPERATIONS END
+# -------------------------------------------
+
+# -------------------------------------------
+# LIST OPERATIONS START
+# -------------------------------------------
+
+
+def list_div_helper(a, b, div_type):
+    if b == 0:
+        raise BinOpError("attempted divison by zero")
+    return a / b if div_type == "true" else a // b
+
+
+def list_sub(a, b):
+    to_remove = set(b)
+    return [x for x in a if x not in to_remove]
+
+
+def list_mul(a, b):
+    if len(a) != len(b):
+        if 1 not in (len(a), len(b)):
+            raise BinOpError(
+                "list element-wise multiplication is not "
+                "supported between lists of different lengths where"
+                "multiplicand length is not one"
+            )
+        multiplier = b[0] if len(b) == 1 else a[0]
+        base = a if len(a) != 1 else b
+        return [x * multiplier for x in base]
+    return [i * j for i, j in zip(a, b, strict=False)]
+
+
+def list_elementwise_div(a, b, div_type):
+    if len(a) != len(b):
+        if 1 not in (len(a), len(b)):
+            raise BinOpError(
+                "list element-wise divsion is not supported "
+                "between lists of different lengths where"
+                "divisor length is not one"
+            )
+        divisor = b[0] if len(b) == 1 else a[0]
+        base = a if len(a) != 1 else b
+        return [list_div_helper(x, divisor, div_type) for x in base]
+    return [list_div_helper(i, j, div_type) for i, j in zip(a, b, strict=False)]
+
+
+def list_div(a, b):
+    return list_elementwise_div(a, b, "true")
+
+
+def list_floor_div(a, b):
+    return list_elementwise_div(a, b, "floor")
+
+
+LIST_OPS = {
+    T_PLUS_ENUM_VAL: operator.add,
+    T_MINUS_ENUM_VAL: list_sub,
+    T_ASTERISK_ENUM_VAL: list_mul,
+    T_SLASH_ENUM_VAL: list_div,
+    T_DSLASH_ENUM_VAL: list_floor_div,
+    T_LT_ENUM_VAL: operator.lt,
+    T_LEQ_ENUM_VAL: operator.le,
+    T_GT_ENUM_VAL: operator.gt,
+    T_GTEQ_ENUM_VAL: operator.ge,
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+    T_IN_ENUM_VAL: _in,
+}
+
+# -------------------------------------------
+# LIST OPERATIONS END
+# -------------------------------------------
+
+# -------------------------------------------
+# SET AND DICT OPERATIONS START
+# -------------------------------------------
+
+
+def set_add(a, b):
+    return a | b
+
+
+SET_OPS = {
+    T_PLUS_ENUM_VAL: set_add,
+    T_MINUS_ENUM_VAL: operator.sub,
+    T_LT_ENUM_VAL: operator.lt,
+    T_LEQ_ENUM_VAL: operator.le,
+    T_GT_ENUM_VAL: operator.gt,
+    T_GTEQ_ENUM_VAL: operator.ge,
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+}
+
+
+def dict_add(a, b):
+    return a | b
+
+
+def dict_sub(a, b):
+    return {k: v for k, v in a.items() if k not in b}
+
+
+DICT_OPS = {
+    T_PLUS_ENUM_VAL: dict_add,
+    T_MINUS_ENUM_VAL: dict_sub,
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+}
+
+# -------------------------------------------
+# SET AND DICT OPERATIONS END
+# -------------------------------------------
+
+# -------------------------------------------
+# MIXED OPERATIONS START
+# -------------------------------------------
+
+
+def different_in(a, b):
+    try:
+        return a in b
+    except TypeError:
+        raise BinOpError(
+            f"in binary operation not supported between {type(a)} and {type(b)}"
+        ) from None
+
+
+# array * n repeats every element n times, each repetition an independent deep copy
+# of it. the values nothing can change are repeated as they are, and arrays are copied
+# here instead of by deepcopy's generic machinery, so only the values that really need
+# it (sets, dicts, ranges, instances, functions) ever go through deepcopy
+
+IMMUTABLE_TYPES = frozenset((int, float, str, bool))
+
+
+def is_flat(value):
+    # whether value is an array of values nothing can change
+    return set(map(type, value)) <= IMMUTABLE_TYPES
+
+
+def copied(value, memo, flatness):
+    # deepcopy(value, memo) for arrays: an array in value more than once, or in itself,
+    # is copied once and that copy used everywhere the array was. flatness remembers
+    # which arrays is_flat, every copy of value looks at the same arrays
+    type_value = type(value)
+    if type_value in IMMUTABLE_TYPES:
+        return value
+    if type_value is not list:
+        return deepcopy(value, memo)
+    copy = memo.get(id(value))
+    if copy is None:
+        value_is_flat = flatness.get(id(value))
+        if value_is_flat is None:
+            value_is_flat = flatness[id(value)] = is_flat(value)
+        if value_is_flat:
+            copy = memo[id(value)] = value[:]
+        else:
+            copy = memo[id(value)] = []
+            copy.extend([copied(element, memo, flatness) for element in value])
+    return copy
+
+
+def is_tree(value, seen, flat):
+    # whether value is an array of plain values and arrays like it, with no array in it
+    # twice, which copied_tree can copy without keeping track of what it copied.
+    # seen ends up with every array in value, and flat with the ones that is_flat
+    if id(value) in seen:
+        return False
+    seen.add(id(value))
+    has_arrays = False
+    for element in value:
+        type_element = type(element)
+        if type_element is list:
+            if not is_tree(element, seen, flat):
+                return False
+            has_arrays = True
+        elif type_element is PACKED_ARRAY and element.items is None:
+            # holds nothing but numbers, like a flat array
+            if id(element) in seen:
+                return False
+            seen.add(id(element))
+            has_arrays = True
+        elif type_element not in IMMUTABLE_TYPES:
+            return False
+    if not has_arrays:
+        flat.add(id(value))
+    return True
+
+
+def copied_tree(value, flat):
+    copy = []
+    for element in value:
+        type_element = type(element)
+        if type_element is list:
+            element = element[:] if id(element) in flat else copied_tree(element, flat)
+        elif type_element is PACKED_ARRAY:
+            element = element.copy()
+        copy.append(element)
+    return copy
+
+
+def repeated(value, times):
+    type_value = type(value)
+    if type_value in IMMUTABLE_TYPES:
+        return repeat(value, times)
+    if type_value is list:
+        if is_flat(value):
+            # a row of plain values, the most common thing to repeat, is just sliced
+            return (value[:] for _ in range(times))
+        flat = set()
+        if is_tree(value, set(), flat):
+            return (copied_tree(value, flat) for _ in range(times))
+    elif type_value is PACKED_ARRAY and value.items is None:
+        return (value.copy() for _ in range(times))
+    flatness = {}
+    return (copied(value, {}, flatness) for _ in range(times))
+
+
+def packed_times_int(a, b):
+    """a * b as a packed array (see packed_array in evaluator_nodes.py) when a is
+    only ints (that fit in 64 bits) or only floats, and a * b is long enough to
+    be worth packing. None otherwise."""
+    types = set(map(type, a))
+    if len(types) != 1 or len(a) * b < PACKED_MIN_LENGTH:
+        return None
+    typecode = PACKED_TYPECODES.get(types.pop())
+    if typecode is None:
+        return None
+    try:
+        if len(a) == 1:
+            return PACKED_ARRAY(array(typecode, a) * b)
+        return PACKED_ARRAY(array(typecode, chain.from_iterable([repeat(i, b) for i in a])))
+    except OverflowError:
+        return None
+
+
+def list_times_int(a, b):
+    result = packed_times_int(a, b)
+    if result is not None:
+        return result
+    return list(chain.from_iterable([repeated(i, b) for i in a]))
+
+
+def int_times_list(a, b):
+    return list_times_int(b, a)
+
+
+# operations between operands of different types, that work on any two types
+DIFFERENT_OPS = {
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+    T_IN_ENUM_VAL: different_in,
+}
+
+# and the ones that only work on some
+DIFFERENT_TYPED_OPS = {
+    (list, int, T_ASTERISK_ENUM_VAL): list_times_int,
+    (int, list, T_ASTERISK_ENUM_VAL): int_times_list,
+    (str, int, T_ASTERISK_ENUM_VAL): operator.mul,
+    (int, str, T_ASTERISK_ENUM_VAL): operator.mul,
+}
+
+# -------------------------------------------
+# MIXED OPERATIONS END
+# -------------------------------------------
+
+# -------------------------------------------
+# IN PLACE ADDITION START
+# -------------------------------------------
+
+# x += y is x = x + y, and + builds a new array (set, dict), so building one an element
+# at a time copies it over and over. when nothing else refers to x's value, no one can
+# tell it was changed in place instead, so it is. like cpython's own in place string
+# concatenation, that's found out from the value's reference count, which has to be
+# what the one variable (element, field) assigned to, the one local variable of the
+# engine holding the value and the call to add_in_place account for. that count is
+# measured here, once, with exactly that setup.
+#
+# reference counts are a cpython implementation detail, and a count too low would
+# change a value something else still refers to. so it's only trusted on the cpython
+# versions it is known to work on (not free threaded builds, whose counts are split
+# between threads, nor 3.14 on, which loads locals without counting a reference), and
+# only once an alias was seen to add one to it. anywhere else nothing is ever
+# changed in place, x += y simply builds a new value
+
+_getrefcount = getattr(sys, "getrefcount", None)
+
+
+def _references(value):
+    return _getrefcount(value)
+
+
+def _counts_references():
+    return (
+        _getrefcount is not None
+        and sys.implementation.name == "cpython"
+        and sys.version_info < (3, 14)
+        and not sysconfig.get_config_var("Py_GIL_DISABLED")
+    )
+
+
+def _unshared_references():
+    if not _counts_references():
+        return -1
+    assigned = [[]]
+    value = assigned[0]
+    unshared = _references(value)
+    alias = value
+    if _references(value) != unshared + 1:
+        return -1
+    del alias
+    return unshared
+
+
+UNSHARED_REFERENCES = _unshared_references()
+
+
+def add_in_place(left, right):
+    """Carry out left + right by changing left itself, and return whether it was.
+    The caller holds left in exactly one local variable, and has checked the
+    variable, element or field being assigned still holds it."""
+    if UNSHARED_REFERENCES < 0 or _getrefcount(left) != UNSHARED_REFERENCES:
+        return False
+    type_left = type(left)
+    type_right = type(right)
+    if type_left is list:
+        if type_right not in ARRAY_VALUE_TYPES:
+            return False
+        left.extend(right)
+    elif type_left is type_right and (type_left is set or type_left is dict):
+        left.update(right)
+    else:
+        return False
+    return True
+
+
+# -------------------------------------------
+# IN PLACE ADDITION END
+# -------------------------------------------
+
+# -------------------------------------------
+# VECTORIZED OPERATIONS START
+# -------------------------------------------
+
+# with numpy installed, the element-wise operations (*, /, //) between arrays of only
+# ints or only floats run as numpy kernels and return a numeric array (see
+# numeric_array in evaluator_nodes.py), which the next element-wise operation runs on
+# without converting anything. the results are exactly the ones of the list handlers
+# above: whenever numpy's 64 bit numbers could give another answer (ints big enough
+# to overflow, or to lose precision as floats) the operation runs on lists instead.
+# multiplying two python lists isn't vectorized, converting them costs as much as
+# multiplying them does
+
+VECTORIZED_MIN_LENGTH = 64
+# every int up to this is exactly a float, and their quotients are correctly rounded
+EXACT_INT = 2**53
+INT64_MAX = 2**63 - 1
+
+# the arrays a vectorized operation can run on
+ARRAY_VALUE_TYPES = (list, LAZY_RANGE, NUMERIC_ARRAY, PACKED_ARRAY)
+
+
+PACKED_DTYPES = {"q": "int64", "d": "float64"}
+
+
+def as_vector(value):
+    """The numbers of an array as a numpy array, or None when they aren't
+    all ints or all floats."""
+    type_value = type(value)
+    if type_value is NUMERIC_ARRAY:
+        if value.items is None:
+            return value.data
+        value = value.items
+    elif type_value is LAZY_RANGE:
+        if value.items is None:
+            span = value.span
+            if max(abs(span.start), abs(span.stop)) > EXACT_INT:
+                return None
+            return numpy.arange(span.start, span.stop, span.step, dtype=numpy.int64)
+        value = value.items
+        type_value = type(value)
+    if type_value is PACKED_ARRAY:
+        if value.items is None:
+            # a view of the packed numbers, nothing is copied
+            return numpy.frombuffer(value.data, dtype=PACKED_DTYPES[value.data.typecode])
+        value = value.items
+    types = set(map(type, value))
+    if types == {int}:
+        dtype = numpy.int64
+    elif types == {float}:
+        dtype = numpy.float64
+    else:
+        return None
+    try:
+        return numpy.array(value, dtype=dtype)
+    except OverflowError:
+        return None
+
+
+def int_bound(vector):
+    # the largest magnitude of an int vector, as a python int so it can't overflow
+    return max(-int(vector.min()), int(vector.max()))
+
+
+def exact_as_floats(*vectors):
+    return all(vector.dtype.kind == "f" or int_bound(vector) <= EXACT_INT for vector in vectors)
+
+
+def elementwise(a, b, op):
+    """a op b as a numeric array, or None when it has to run on lists."""
+    len_a = len(a)
+    len_b = len(b)
+    if len_a != len_b and len_a != 1 and len_b != 1:
+        # the list handler raises the error
+        return None
+    if max(len_a, len_b) < VECTORIZED_MIN_LENGTH:
+        return None
+    if op == T_ASTERISK_ENUM_VAL and type(a) is list and type(b) is list:
+        return None
+    x = as_vector(a)
+    if x is None:
+        return None
+    y = as_vector(b)
+    if y is None:
+        return None
+
+    if op == T_ASTERISK_ENUM_VAL:
+        if x.dtype.kind == "i" and y.dtype.kind == "i":
+            if int_bound(x) * int_bound(y) > INT64_MAX:
+                return None
+        elif not exact_as_floats(x, y):
+            return None
+        with numpy.errstate(all="ignore"):
+            return NUMERIC_ARRAY(x * y)
+
+    if not exact_as_floats(x, y):
+        return None
+    if len_a == 1 and len_b != 1:
+        # like list_elementwise_div, [d] / array divides the array by d
+        x, y = y, x
+    with numpy.errstate(all="ignore"):
+        if not y.all():
+            raise BinOpError("attempted divison by zero")
+        if op == T_SLASH_ENUM_VAL:
+            return NUMERIC_ARRAY(x / y)
+        return NUMERIC_ARRAY(numpy.floor_divide(x, y))
+
+
+VECTORIZED_OPS = frozenset((T_ASTERISK_ENUM_VAL, T_SLASH_ENUM_VAL, T_DSLASH_ENUM_VAL))
+
+
+def vectorized(handler, op):
+    def run(a, b):
+        result = elementwise(a, b, op)
+        return handler(a, b) if result is None else result
+
+    return run
+
+
+# -------------------------------------------
+# VECTORIZED OPERATIONS END
+# -------------------------------------------
+
+NUMBER_TYPES = (int, float, bool)
+
+SAME_TYPE_OPS = {
+    int: NUMBER_OPS,
+    float: NUMBER_OPS,
+    bool: NUMBER_OPS,
+    str: STR_OPS,
+    list: LIST_OPS,
+    set: SET_OPS,
+    dict: DICT_OPS,
+}
+
+UNSUPPORTED = {op: unsupported(op) for op in BIN_OPS}
+
+# the operations a lazy range (what range{} returns), a numeric array or a packed
+# array carries out itself, without working out its numbers, every other one is carried out on the
+# array they make
+LAZY_ARRAY_TYPES = (LAZY_RANGE, NUMERIC_ARRAY, PACKED_ARRAY)
+RANGE_OPS = {
+    T_EQ_ENUM_VAL: operator.eq,
+    T_NEQ_ENUM_VAL: operator.ne,
+    T_AND_ENUM_VAL: _and,
+    T_OR_ENUM_VAL: _or,
+    T_IN_ENUM_VAL: different_in,
+}
+
+
+def on_arrays(handler):
+    def run(a, b):
+        if type(a) in LAZY_ARRAY_TYPES:
+            a = list(a)
+        if type(b) in LAZY_ARRAY_TYPES:
+            b = list(b)
+        return handler(a, b)
+
+    return run
+
+
+def resolve_bin_op(type_left, type_right, op):
+    """Return the function carrying out op between values of the two types."""
+    handler = resolve_unvectorized_bin_op(type_left, type_right, op)
+    if (
+        numpy is not None
+        and op in VECTORIZED_OPS
+        and type_left in ARRAY_VALUE_TYPES
+        and type_right in ARRAY_VALUE_TYPES
+    ):
+        return vectorized(handler, op)
+    return handler
+
+
+def resolve_unvectorized_bin_op(type_left, type_right, op):
+    if type_left in LAZY_ARRAY_TYPES or type_right in LAZY_ARRAY_TYPES:
+        if op in RANGE_OPS:
+            return RANGE_OPS[op]
+        return on_arrays(
+            resolve_unvectorized_bin_op(
+                list if type_left in LAZY_ARRAY_TYPES else type_left,
+                list if type_right in LAZY_ARRAY_TYPES else type_right,
+                op,
+            )
+        )
+    if type_left is type_right or (type_left in NUMBER_TYPES and type_right in NUMBER_TYPES):
+        # two values of a type without operations of its own (functions, instances)
+        # only have the operations every two values have
+        supported = SAME_TYPE_OPS.get(type_left, DIFFERENT_OPS)
+        handler = supported.get(op)
+    else:
+        handler = DIFFERENT_OPS.get(op) or DIFFERENT_TYPED_OPS.get((type_left, type_right, op))
+    return handler or UNSUPPORTED.get(op) or unsupported(op)
+
+
+TABLE_TYPES = (*SAME_TYPE_OPS, *LAZY_ARRAY_TYPES)
+
+# every combination of the builtin value types. the table is shared by every engine
+# and never changes once built, the handlers for any other type (functions,
+# dataclasses, instances) are kept by the engine running the program using them
+BIN_OP_TABLE = {
+    (type_left, type_right, op): resolve_bin_op(type_left, type_right, op)
+    for type_left in TABLE_TYPES
+    for type_right in TABLE_TYPES
+    for op in BIN_OPS
+}
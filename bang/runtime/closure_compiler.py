@@ -0,0 +1,953 @@
+# an alternate execution engine for the blockenized tree.
+# the tree walking evaluator re-discovers what every node is each time
+# it is evaluated (tuple membership checks, the LITERALS probe, a long
+# elif chain on the node type). here we walk the tree exactly once and
+# turn every node into a python closure that already knows what it is,
+# so running the program is just a chain of direct calls.
+
+# all value level semantics (binary/unary operations, indexing, field access,
+# calling dataclasses and built ins) are shared with the evaluator, we only replace
+# the dispatching and the control flow plumbing
+
+from bang.lexing.lexer_tokens import (
+    T_AND_ENUM_VAL,
+    T_ASSIGN_ENUM_VAL,
+    T_ASTERISK_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_GT_ENUM_VAL,
+    T_GTEQ_ENUM_VAL,
+    T_LEQ_ENUM_VAL,
+    T_LT_ENUM_VAL,
+    T_MINUS_ENUM_VAL,
+    T_NEQ_ENUM_VAL,
+    T_OR_ENUM_VAL,
+    T_PLUS_ASSIGN_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+    T_UMINUS_ENUM_VAL,
+)
+from bang.runtime.binary_operations import BIN_OP_TABLE, BinOpError, add_in_place
+from bang.runtime.evaluator import (
+    _BREAK,
+    _CONTINUE,
+    Evaluator,
+    EvaluatorError,
+    _Return,
+    _TailCall,
+)
+from bang.runtime.evaluator_nodes import UNSET
+from bang.runtime.resolver import Resolver
+
+# statement closures return None when execution simply falls through to the next
+# statement, otherwise they return one of the evaluator's completion markers which
+# the enclosing loop or call consumes, exactly like the evaluator's statements do
+
+_NUMERIC = frozenset((int, float, bool))
+
+
+def _numeric_fast_path(op_id, left, right, slow):
+    # for two numbers these operators behave exactly like their python counterparts,
+    # so we skip the generic operator machinery and only fall back to it
+    # (through slow) for every other combination of types
+
+    if op_id == T_PLUS_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a + b
+            return slow(a, b)
+
+    elif op_id == T_MINUS_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a - b
+            return slow(a, b)
+
+    elif op_id == T_ASTERISK_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a * b
+            return slow(a, b)
+
+    elif op_id == T_LT_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a < b
+            return slow(a, b)
+
+    elif op_id == T_LEQ_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a <= b
+            return slow(a, b)
+
+    elif op_id == T_GT_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a > b
+            return slow(a, b)
+
+    elif op_id == T_GTEQ_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a >= b
+            return slow(a, b)
+
+    elif op_id == T_EQ_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a == b
+            return slow(a, b)
+
+    elif op_id == T_NEQ_ENUM_VAL:
+
+        def run():
+            a = left()
+            b = right()
+            if type(a) in _NUMERIC and type(b) in _NUMERIC:
+                return a != b
+            return slow(a, b)
+
+    else:
+
+        def run():
+            return slow(left(), right())
+
+    return run
+
+
+class ClosureCompiler(Evaluator):
+    def __init__(self, file, roots):
+        super().__init__(file, roots)
+        # function bodies are compiled once, when the program is compiled,
+        # and looked up by their block when a function value is called
+        self.compiled_bodies = {}
+        # static bookkeeping used while compiling so break/continue/return
+        # know whether they live inside a loop/function
+        self.compile_loop_depth = 0
+        self.compile_func_depth = 0
+
+        self.construct_to_compile = {
+            self.ASSIGNMENT_NODE_CLASS: self.compile_assignment,
+            self.IF_NODE_CLASS: self.compile_if,
+            self.FOR_NODE_CLASS: self.compile_for,
+            self.WHILE_NODE_CLASS: self.compile_while,
+            self.BLOCK_NODE_CLASS: self.compile_block,
+            self.BREAK_NODE_CLASS: self.compile_break,
+            self.CONTINUE_NODE_CLASS: self.compile_continue,
+            self.RETURN_NODE_CLASS: self.compile_return,
+            self.EXPRESSION_NODE_CLASS: self.compile_expression_statement,
+            self.FUNCTION_NODE_CLASS: self.compile_function,
+            self.CALL_NODE_CLASS: self.compile_expression_statement,
+            self.DATA_CLASS_NODE_CLASS: self.compile_dataclass,
+        }
+
+    def eval_program(self):
+        program = self.compile_program()
+        self.frames = [self.resolution.global_frame.template[:]]
+        program()
+        self.publish_globals()
+
+    def compile_program(self):
+        # the same list frames as the evaluator, every name is compiled
+        # straight to the (depth, slot) the resolver gave it
+        self.resolution = Resolver(self.roots, self.built_in_functions).resolve()
+        self.resolved_names = self.resolution.names
+        self.call_sites = self.resolution.calls
+        return self.compile_statements(self.roots)
+
+    # -------------------------------------------
+    # STATEMENTS START
+    # -------------------------------------------
+
+    def compile_construct(self, root):
+        return self.construct_to_compile[type(root)](root)
+
+    def compile_statements(self, constructs):
+        statements = tuple(self.compile_construct(construct) for construct in constructs)
+
+        if not statements:
+            return lambda: None
+        if len(statements) == 1:
+            return statements[0]
+
+        def run_block():
+            for statement in statements:
+                signal = statement()
+                if signal is not None:
+                    return signal
+
+        return run_block
+
+    def compile_block(self, root):
+        return self.compile_statements(root.block)
+
+    def compile_expression_statement(self, root):
+        expression = self.compile_expression(root)
+
+        def run_expression():
+            expression()
+
+        return run_expression
+
+    def compile_scoped_block(self, root):
+        # if/elif/else bodies run inside a fresh scope which is popped
+        # no matter how the body completes, unless they declare nothing
+        body = self.compile_block(root)
+        layout = self.resolution.frames[id(root)]
+        if layout is None:
+            return body
+        evaluator = self
+        template = layout.template
+
+        def run_scoped():
+            frames = evaluator.frames
+            frames.append(template[:])
+            signal = body()
+            frames.pop()
+            return signal
+
+        return run_scoped
+
+    def compile_if(self, root):
+        branches = [
+            (
+                self.compile_expression(root.condition.root_expr),
+                self.compile_scoped_block(root.body),
+            )
+        ]
+        for elif_root in root.elif_branch.block:
+            branches.append(
+                (
+                    self.compile_expression(elif_root.condition.root_expr),
+                    self.compile_scoped_block(elif_root.body),
+                )
+            )
+        else_body = None
+        for else_root in root.else_branch.block:
+            else_body = self.compile_scoped_block(else_root.body)
+            break
+        branches = tuple(branches)
+
+        if len(branches) == 1:
+            condition, body = branches[0]
+
+            def run_if():
+                if condition():
+                    return body()
+                if else_body is not None:
+                    return else_body()
+
+            return run_if
+
+        def run_if_chain():
+            for condition, body in branches:
+                if condition():
+                    return body()
+            if else_body is not None:
+                return else_body()
+
+        return run_if_chain
+
+    def compile_for(self, root):
+        evaluator = self
+        store_variable = self.compile_store(self.resolved_names[id(root.variable)])
+        bound = self.compile_expression(root.bound.root_expr)
+        meta_data = root.meta_data
+
+        layout = self.resolution.frames[id(root.body)]
+        scoped = layout is not None
+        template = layout.template if scoped else None
+
+        self.compile_loop_depth += 1
+        body = self.compile_block(root.body)
+        self.compile_loop_depth -= 1
+
+        def run_for():
+            frames = evaluator.frames
+            if scoped:
+                frames.append(template[:])
+            bound_value = bound()
+            if type(bound_value) is int:
+                iterable = range(0, bound_value, -1 if bound_value < 0 else 1)
+            else:
+                try:
+                    iterable = iter(bound_value)
+                except TypeError:
+                    raise EvaluatorError(
+                        evaluator.file,
+                        "bound not iterable",
+                        meta_data.line,
+                        meta_data.column_start,
+                        meta_data.column_end,
+                    ) from None
+
+            for i in iterable:
+                store_variable(i)
+                signal = body()
+                if signal is not None:
+                    if signal is _CONTINUE:
+                        continue
+                    if signal is _BREAK:
+                        break
+                    if scoped:
+                        frames.pop()
+                    return signal
+            if scoped:
+                frames.pop()
+
+        return run_for
+
+    def compile_while(self, root):
+        evaluator = self
+        condition = self.compile_expression(root.condition.root_expr)
+        layout = self.resolution.frames[id(root.body)]
+        scoped = layout is not None
+        template = layout.template if scoped else None
+
+        self.compile_loop_depth += 1
+        body = self.compile_block(root.body)
+        self.compile_loop_depth -= 1
+
+        def run_while():
+            frames = evaluator.frames
+            if scoped:
+                frames.append(template[:])
+            while condition():
+                signal = body()
+                if signal is not None:
+                    if signal is _CONTINUE:
+                        continue
+                    if signal is _BREAK:
+                        break
+                    if scoped:
+                        frames.pop()
+                    return signal
+            if scoped:
+                frames.pop()
+
+        return run_while
+
+    # break/continue/return are checked while compiling instead of at run time.
+    # a break inside a function body that isn't inside a loop of that same
+    # function is reported when it executes, it never escapes the call
+
+    def compile_break(self, root):
+        if not self.compile_loop_depth:
+            return self.compile_runtime_error("cannot break outside of loop scope", root.meta_data)
+        return lambda: _BREAK
+
+    def compile_continue(self, root):
+        if not self.compile_loop_depth:
+            return self.compile_runtime_error(
+                "cannot continue outside of loop scope", root.meta_data
+            )
+        return lambda: _CONTINUE
+
+    def compile_return(self, root):
+        if not self.compile_func_depth:
+            return self.compile_runtime_error(
+                "cannot return outside of function scope", root.meta_data
+            )
+        if type(root.expression.root_expr) is self.CALL_NODE_CLASS:
+            return self.compile_tail_call(root.expression.root_expr)
+        expression = self.compile_expression(root.expression.root_expr)
+
+        def run_return():
+            return _Return(expression())
+
+        return run_return
+
+    def compile_tail_call(self, root):
+        RUN_TIME_FUNCTION = self.RUN_TIME_FUNCTION
+        call_cached = self.call_cached
+        site = self.call_site(root)
+        callee_expression, func_name, args = self.compile_call_operands(root)
+
+        def run_tail_call():
+            callee = callee_expression()
+            arg_vals = [arg() for arg in args]
+            if type(callee) is RUN_TIME_FUNCTION:
+                site.hits += 1
+                return _TailCall(callee, arg_vals)
+            return _Return(call_cached(site, callee, func_name, arg_vals, root))
+
+        return run_tail_call
+
+    def compile_runtime_error(self, msg, meta_data):
+        file = self.file
+
+        def run_error():
+            raise EvaluatorError(
+                file, msg, meta_data.line, meta_data.column_start, meta_data.column_end
+            )
+
+        return run_error
+
+    def compile_function(self, root):
+        evaluator = self
+        RUN_TIME_FUNCTION = self.RUN_TIME_FUNCTION
+        args_name = root.arg_list_name
+        block = root.body
+        store_function = self.compile_store(self.resolution.declarations[id(root)])
+
+        # loops outside of the function don't apply inside of it
+        saved_loop_depth = self.compile_loop_depth
+        self.compile_loop_depth = 0
+        self.compile_func_depth += 1
+        self.compiled_bodies[id(block)] = self.compile_block(block)
+        self.compile_func_depth -= 1
+        self.compile_loop_depth = saved_loop_depth
+
+        effects = root.effects
+        memoize = effects is not None and effects.memoize
+        depths = self.resolution.closures[id(root)]
+        closure_frames = self.closure_frames
+
+        def run_function():
+            # same closure semantics as the evaluator, the function sees the
+            # frames that exist at definition time, but only those declaring
+            # a name it refers to
+            function = RUN_TIME_FUNCTION(
+                body=block,
+                params_name=args_name,
+                closure=closure_frames(depths),
+                effects=effects,
+            )
+            store_function(evaluator.memoized(function) if memoize else function)
+
+        return run_function
+
+    def compile_dataclass(self, root):
+        RUN_TIME_DATACLASS = self.RUN_TIME_DATACLASS
+        seen = set()
+        dataclass_fields = [f for f in root.fields if not (f in seen or seen.add(f))]
+        store_dataclass = self.compile_store(self.resolution.declarations[id(root)])
+
+        def run_dataclass():
+            store_dataclass(RUN_TIME_DATACLASS(fields=list(dataclass_fields)))
+
+        return run_dataclass
+
+    def eval_call(self, callee, args, meta_data):
+        # the call shares the frames its function closed over (see enter_call)
+        saved = self.frames, self.shared_depth, self.shared_snapshot
+        try:
+            while True:
+                self.enter_call(callee, args)
+                signal = self.compiled_bodies[id(callee.body)]()
+                if type(signal) is not _TailCall:
+                    break
+                callee, args = signal.callee, signal.args
+        finally:
+            self.frames, self.shared_depth, self.shared_snapshot = saved
+        if signal is not None:
+            return signal.value
+        return 0
+
+    # -------------------------------------------
+    # STATEMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # ASSIGNMENTS START
+    # -------------------------------------------
+
+    def compile_store(self, resolved):
+        # the same as store_var
+        if len(resolved.coordinates) != 1:
+            store_var = self.store_var
+
+            def store_any(value):
+                store_var(resolved, value)
+
+            return store_any
+        evaluator = self
+        ((depth, slot),) = resolved.coordinates
+
+        def store(value):
+            evaluator.frames[depth][slot] = value
+
+        return store
+
+    def compile_assignment(self, root):
+        left_hand = root.left_hand
+        op_type_id = root.op
+        if op_type_id == T_PLUS_ASSIGN_ENUM_VAL and type(left_hand) in (
+            self.IDENTIFIER_NODE_CLASS,
+            self.INDEX_NODE_CLASS,
+            self.FIELD_ACCESS_NODE_CLASS,
+        ):
+            return self.compile_add_assignment(root)
+
+        parallel = self.parallel_assignment(root)
+        if parallel is not None:
+            return self.compile_parallel_assignment(root, *parallel)
+
+        right_hand = self.compile_expression(root.right_hand.root_expr)
+        if op_type_id != T_ASSIGN_ENUM_VAL and type(left_hand) is not self.ARRAY_LITERAL_NODE_CLASS:
+            # x op= y is compiled as x = x op y, the node is built once here
+            # instead of on every execution
+            right_hand = self.compile_expression(
+                self.BIN_OP_NODE_CLASS(
+                    left=left_hand,
+                    op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                    right=root.right_hand.root_expr,
+                    meta_data=root.meta_data,
+                )
+            )
+
+        assign = self.compile_target(left_hand, op_type_id, root)
+
+        def run_assignment():
+            assign(right_hand())
+
+        return run_assignment
+
+    def compile_add_assignment(self, root):
+        # x += y, changing x's array (set, dict) in place when nothing else refers to it,
+        # exactly like the evaluator's eval_add_assignment
+        evaluator = self
+        eval_bin_op_values = self.eval_bin_op_values
+        eval_field_slot = self.eval_field_slot
+        eval_index_chain = self.eval_index_chain
+        index_error = self.index_error
+        left_hand = root.left_hand
+        meta_data = root.meta_data
+        right = self.compile_expression(root.right_hand.root_expr)
+        op_node = self.BIN_OP_NODE_CLASS(
+            left=left_hand, op=T_PLUS_ENUM_VAL, right=root.right_hand.root_expr, meta_data=meta_data
+        )
+        type_left_hand = type(left_hand)
+
+        if type_left_hand is self.IDENTIFIER_NODE_CLASS:
+            load = self.compile_identifier(left_hand, left_hand.meta_data)
+            resolved = self.resolved_names[id(left_hand)]
+            if len(resolved.coordinates) != 1:
+                # the frame it is stored in is only known at runtime (see store_slot)
+                store = self.compile_store(resolved)
+
+                def run_add_any():
+                    left = load()
+                    store(eval_bin_op_values(left, right(), op_node))
+
+                return run_add_any
+
+            ((depth, slot),) = resolved.coordinates
+
+            def run_add_name():
+                left = load()
+                value = right()
+                frame = evaluator.frames[depth]
+                if type(left) in _NUMERIC and type(value) in _NUMERIC:
+                    frame[slot] = left + value
+                    return
+                if frame[slot] is left and add_in_place(left, value):
+                    return
+                frame[slot] = eval_bin_op_values(left, value, op_node)
+
+            return run_add_name
+
+        if type_left_hand is self.FIELD_ACCESS_NODE_CLASS:
+            base = self.compile_expression(left_hand.base)
+            site = self.field_site(left_hand)
+            field_meta_data = left_hand.meta_data
+
+            def run_add_field():
+                values, index = eval_field_slot(site, base(), field_meta_data)
+                left = values[index]
+                value = right()
+                if values[index] is left and add_in_place(left, value):
+                    return
+                values[index] = eval_bin_op_values(left, value, op_node)
+
+            return run_add_field
+
+        base_node = left_hand.base
+        if type(base_node) is self.IDENTIFIER_NODE_CLASS:
+            base = self.compile_identifier(base_node, meta_data)
+        else:
+            base = self.compile_expression(base_node)
+        indexes = tuple(self.compile_expression(i.root_expr) for i in left_hand.index)
+
+        def run_add_index():
+            container = base()
+            keys = [index() for index in indexes]
+            container = eval_index_chain(container, keys[:-1], left_hand)
+            key = keys[-1]
+            try:
+                left = container[key]
+            except (IndexError, TypeError, KeyError):
+                raise index_error(left_hand.meta_data) from None
+            value = right()
+            if type(left) in _NUMERIC and type(value) in _NUMERIC:
+                value = left + value
+            else:
+                try:
+                    unchanged = container[key] is left
+                except (IndexError, TypeError, KeyError):
+                    raise index_error(meta_data) from None
+                if unchanged and add_in_place(left, value):
+                    return
+                value = eval_bin_op_values(left, value, op_node)
+            try:
+                container[key] = value
+            except (IndexError, TypeError, KeyError):
+                raise index_error(meta_data) from None
+
+        return run_add_index
+
+    def compile_target(self, left_hand, op_type_id, root):
+        type_left_hand = type(left_hand)
+        if type_left_hand is self.IDENTIFIER_NODE_CLASS:
+            return self.compile_store(self.resolved_names[id(left_hand)])
+        if type_left_hand is self.INDEX_NODE_CLASS:
+            return self.compile_index_target(left_hand, root)
+        if type_left_hand is self.FIELD_ACCESS_NODE_CLASS:
+            return self.compile_field_target(left_hand)
+        return self.compile_multi_target(left_hand, op_type_id, root)
+
+    def compile_index_target(self, left_hand, root):
+        file = self.file
+        meta_data = root.meta_data
+        base_node = left_hand.base
+        if type(base_node) is self.IDENTIFIER_NODE_CLASS:
+            base = self.compile_identifier(base_node, meta_data)
+        else:
+            base = self.compile_expression(base_node)
+        leading = tuple(self.compile_expression(i.root_expr) for i in left_hand.index[:-1])
+        final = self.compile_expression(left_hand.index[-1].root_expr)
+
+        def out_of_bounds():
+            return EvaluatorError(
+                file,
+                "Index out of bounds",
+                meta_data.line,
+                meta_data.column_start,
+                meta_data.column_end,
+            )
+
+        def assign_index(value):
+            target = base()
+            for idx in leading:
+                try:
+                    target = target[idx()]
+                except (IndexError, TypeError, KeyError):
+                    raise out_of_bounds() from None
+            try:
+                target[final()] = value
+            except (IndexError, TypeError, KeyError):
+                raise out_of_bounds() from None
+
+        return assign_index
+
+    def compile_field_target(self, left_hand):
+        eval_field_slot = self.eval_field_slot
+        site = self.field_site(left_hand)
+        meta_data = left_hand.meta_data
+        base = self.compile_expression(left_hand.base)
+
+        def assign_field(value):
+            values, index = eval_field_slot(site, base(), meta_data)
+            values[index] = value
+
+        return assign_field
+
+    def compile_multi_target(self, left_hand, op_type_id, root):
+        file = self.file
+        meta_data = root.meta_data
+        ARRAY_LITERAL_NODE_CLASS = self.ARRAY_LITERAL_NODE_CLASS
+        ARRAY_TYPES = self.ARRAY_TYPES
+
+        targets = []
+        for element in left_hand.elements:
+            element_node = element.root_expr
+            assign = self.compile_target(element_node, op_type_id, root)
+            if (
+                op_type_id != T_ASSIGN_ENUM_VAL
+                and type(element_node) is not ARRAY_LITERAL_NODE_CLASS
+            ):
+                assign = self.compile_compound_element(element_node, op_type_id, root, assign)
+            targets.append(assign)
+        targets = tuple(targets)
+        len_targets = len(targets)
+
+        def assign_multi(value):
+            if type(value) not in ARRAY_TYPES:
+                raise EvaluatorError(
+                    file,
+                    "multi-variable assignment right hand must be type list",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            if len_targets > len(value):
+                raise EvaluatorError(
+                    file,
+                    "not enough values to unpack",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            for i, assign in enumerate(targets):
+                assign(value[i])
+
+        return assign_multi
+
+    def compile_parallel_assignment(self, root, targets, values):
+        # [a, b] = [x, y] without the right hand list, every value is computed
+        # before the first target is assigned
+        op_type_id = root.op
+        values = [self.compile_expression(value) for value in values]
+        stores = []
+        for target in targets:
+            assign = self.compile_target(target, op_type_id, root)
+            if op_type_id != T_ASSIGN_ENUM_VAL:
+                assign = self.compile_compound_element(target, op_type_id, root, assign)
+            stores.append(assign)
+
+        return self.run_parallel(values, stores)
+
+    def compile_compound_element(self, element_node, op_type_id, root, assign):
+        # [a, b] op= [x, y] applies op between the current value of every
+        # element and its right hand value before assigning
+        current = self.compile_expression(element_node)
+        eval_bin_op_values = self.eval_bin_op_values
+        op_node = self.BIN_OP_NODE_CLASS(
+            left=element_node,
+            op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+            right=None,
+            meta_data=root.meta_data,
+        )
+
+        def assign_compound(value):
+            assign(eval_bin_op_values(current(), value, op_node))
+
+        return assign_compound
+
+    # -------------------------------------------
+    # ASSIGNMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EXPRESSIONS START
+    # -------------------------------------------
+
+    def compile_expression(self, root):
+        type_root = type(root)
+        if type_root is self.EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+            type_root = type(root)
+
+        if type_root in self.LITERALS:
+            value = self.LITERALS[type_root](root.value)
+            return lambda: value
+        if type_root is self.BIN_OP_NODE_CLASS:
+            return self.compile_bin_op(root)
+        if type_root is self.UNARY_OP_NODE_CLASS:
+            return self.compile_unary_op(root)
+        if type_root is self.ARRAY_LITERAL_NODE_CLASS:
+            return self.compile_array_literal(root)
+        if type_root is self.INDEX_NODE_CLASS:
+            return self.compile_index(root)
+        if type_root is self.IDENTIFIER_NODE_CLASS:
+            return self.compile_identifier(root, root.meta_data)
+        if type_root is self.CALL_NODE_CLASS:
+            return self.compile_call(root)
+        if type_root is self.FIELD_ACCESS_NODE_CLASS:
+            return self.compile_field_access(root)
+        if type_root is self.CONSTANT_ARRAY_NODE_CLASS:
+            return root.materialize
+        # anything else evaluates to itself, the same as in eval_expression
+        return lambda: root
+
+    def compile_identifier(self, root, meta_data):
+        evaluator = self
+        load_var = self.load_var
+        resolved = self.resolved_names[id(root)]
+
+        if len(resolved.coordinates) != 1:
+            # a name that may live in several frames (or in none) is
+            # looked for the same way the evaluator does
+            def load_any():
+                return load_var(resolved, meta_data)
+
+            return load_any
+
+        ((depth, slot),) = resolved.coordinates
+
+        def load():
+            value = evaluator.frames[depth][slot]
+            if value is UNSET:
+                # not set yet, load_var raises the error
+                return load_var(resolved, meta_data)
+            return value
+
+        return load
+
+    def compile_bin_op(self, root):
+        if root.op == T_AND_ENUM_VAL or root.op == T_OR_ENUM_VAL:
+            return self.compile_short_circuit(root)
+        bin_op_handler = self.bin_op_handler
+        bin_op_error = self.bin_op_error
+        # the operand types this operation saw last, and their handler
+        cached_left = cached_right = cached_handler = None
+
+        def slow(a, b):
+            nonlocal cached_left, cached_right, cached_handler
+            if type(a) is not cached_left or type(b) is not cached_right:
+                cached_left, cached_right = type(a), type(b)
+                key = (cached_left, cached_right, root.op)
+                cached_handler = BIN_OP_TABLE.get(key) or bin_op_handler(key)
+            try:
+                return cached_handler(a, b)
+            except BinOpError as e:
+                raise bin_op_error(e, root) from None
+
+        return _numeric_fast_path(
+            root.op, self.compile_expression(root.left), self.compile_expression(root.right), slow
+        )
+
+    def compile_short_circuit(self, root):
+        # the right operand only runs when the left one doesn't decide the result
+        left = self.compile_expression(root.left)
+        right = self.compile_expression(root.right)
+
+        if root.op == T_AND_ENUM_VAL:
+
+            def run_and():
+                value = left()
+                return right() if value else value
+
+            return run_and
+
+        def run_or():
+            value = left()
+            return value if value else right()
+
+        return run_or
+
+    def compile_unary_op(self, root):
+        operand = self.compile_expression(root.operand)
+        eval_unary_op_value = self.eval_unary_op_value
+
+        if root.op == T_UMINUS_ENUM_VAL:
+
+            def run_uminus():
+                value = operand()
+                if type(value) is int or type(value) is float:
+                    return -value
+                return eval_unary_op_value(value, root)
+
+            return run_uminus
+
+        def run_unary():
+            return eval_unary_op_value(operand(), root)
+
+        return run_unary
+
+    def compile_array_literal(self, root):
+        elements = tuple(self.compile_expression(i.root_expr) for i in root.elements)
+
+        def run_array_literal():
+            return [element() for element in elements]
+
+        return run_array_literal
+
+    def compile_index(self, root):
+        index_chain = tuple(self.compile_expression(i.root_expr) for i in root.index)
+        base = self.compile_expression(root.base)
+        eval_index_chain = self.eval_index_chain
+
+        if len(index_chain) == 1:
+            (single_index,) = index_chain
+            file = self.file
+            meta_data = root.meta_data
+
+            def run_single_index():
+                idx = single_index()
+                try:
+                    return base()[idx]
+                except (IndexError, TypeError, KeyError):
+                    raise EvaluatorError(
+                        file,
+                        "Index out of bounds",
+                        meta_data.line,
+                        meta_data.column_start,
+                        meta_data.column_end,
+                    ) from None
+
+            return run_single_index
+
+        def run_index():
+            # same order as the evaluator, indexes first and then the base
+            indexes = [idx() for idx in index_chain]
+            return eval_index_chain(base(), indexes, root)
+
+        return run_index
+
+    def compile_call_operands(self, root):
+        root_name = root.name
+        if type(root_name) is self.IDENTIFIER_NODE_CLASS:
+            func_name = root_name.value
+            callee_expression = self.compile_identifier(root_name, root.meta_data)
+        else:
+            func_name = None
+            callee_expression = self.compile_expression(root_name)
+        args = tuple(self.compile_expression(i.root_expr) for i in root.args)
+        return callee_expression, func_name, args
+
+    def compile_call(self, root):
+        evaluator = self
+        RUN_TIME_FUNCTION = self.RUN_TIME_FUNCTION
+        call_cached = self.call_cached
+        site = self.call_site(root)
+        meta_data = root.meta_data
+        callee_expression, func_name, args = self.compile_call_operands(root)
+
+        def run_call():
+            callee = callee_expression()
+            arg_vals = [arg() for arg in args]
+            if type(callee) is RUN_TIME_FUNCTION:
+                site.hits += 1
+                return evaluator.eval_call(callee, arg_vals, meta_data)
+            return call_cached(site, callee, func_name, arg_vals, root)
+
+        return run_call
+
+    def compile_field_access(self, root):
+        base = self.compile_expression(root.base)
+        site = self.field_site(root)
+        meta_data = root.meta_data
+        eval_field_site = self.eval_field_site
+
+        def run_field_access():
+            return eval_field_site(site, base(), meta_data)
+
+        return run_field_access
+
+    # -------------------------------------------
+    # EXPRESSIONS END
+    # -------------------------------------------
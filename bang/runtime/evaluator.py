@@ -7,8 +7,11 @@
 # analyzer because in both we're essentially just
 # tree-walking; in the semantic analyzer we are tree
 # walking for types, and in this we are tree walking for runtime values
+
 import operator
-from copy import deepcopy
+from array import array
+from functools import partial, reduce
+from itertools import compress, repeat
 
 from bang.lexing.lexer_tokens import (
     T_AND_ENUM_VAL,
@@ -69,6 +72,7 @@ from bang.parsing.parser_nodes import (
     BOOLEAN_LITERAL_NODE_CLASS,
     BREAK_NODE_CLASS,
     CALL_NODE_CLASS,
+    CONSTANT_ARRAY_NODE_CLASS,
     CONTINUE_NODE_CLASS,
     DATA_CLASS_NODE_CLASS,
     EXPRESSION_NODE_CLASS,
@@ -86,11 +90,30 @@ from bang.parsing.parser_nodes import (
     UNARY_OP_NODE_CLASS,
     WHILE_NODE_CLASS,
 )
+from bang.runtime.binary_operations import (
+    BIN_OP_TABLE,
+    LAZY_ARRAY_TYPES,
+    BinOpError,
+    add_in_place,
+    resolve_bin_op,
+)
 from bang.runtime.evaluator_nodes import (
+    CALL_SITE,
+    CALL_SITE_ENTRIES,
+    FIELD_SITE,
+    LAZY_RANGE,
+    MEMO_DEFAULT_SIZE,
+    MEMOIZED_FUNCTION,
+    NUMERIC_ARRAY,
+    PACKED_ARRAY,
+    PACKED_TYPECODES,
     RUN_TIME_DATACLASS,
     RUN_TIME_FUNCTION,
     RUN_TIME_INSTANCE,
+    TABLE,
+    UNSET,
 )
+from bang.runtime.resolver import Resolver
 
 
 class EvaluatorError(Exception):
@@ -128,28 +151,133 @@ class EvaluatorError(Exception):
 
 
 # when we encounter a break, return, etc we
-# need to propogate this across potentially every function
-# we have; so instead of returning
-# "break_signal" and adding custom
-# logic to each one, which increases the complexity and
-# decreases readability, we create
-# private exceptions that allow us to control exactly where each signal
-# propogates to
+# need to propogate this across potentially every construct
+# between it and the loop or call it ends. raising and unwinding an
+# exception for that is far more expensive than returning a value, so
+# every statement returns its completion instead: None when execution
+# simply falls through to the next statement, otherwise one of the
+# markers below, which every enclosing block hands up until the loop
+# or call it's meant for consumes it
 
 
-class _ReturnSignal(Exception):
+class _Return:
     __slots__ = ("value",)
 
     def __init__(self, value):
         self.value = value  # carry the result
 
 
-class _BreakSignal(Exception):
-    pass
+class _TailCall:
+    # a function returning the result of calling another function. the call is
+    # made by the eval_call that is already running instead of a nested one, so
+    # tail recursion doesn't grow the python stack
+    __slots__ = ("callee", "args")
+
+    def __init__(self, callee, args):
+        self.callee = callee
+        self.args = args
+
+
+_BREAK = object()
+_CONTINUE = object()
+
+
+# the unary operators only depend on the operator, not on the type of the operand.
+# like the binary operations (see binary_operations.py) they raise BinOpError with
+# just the message, which eval_unary_op_value points at the operation
+
+
+def _negate(operand):
+    return not operand
+
+
+def _uminus(operand):
+    if type(operand) in (int, float):
+        return -operand
+    raise BinOpError(f"unary negation not supported on type {type(operand)}")
+
+
+def _uplus(operand):
+    if type(operand) in (int, float):
+        return +operand
+    raise BinOpError(f"unary plus not supported on type {type(operand)}")
+
 
+UNARY_OP_TABLE = {
+    T_NEGATE_ENUM_VAL: _negate,
+    T_UMINUS_ENUM_VAL: _uminus,
+    T_UPLUS_ENUM_VAL: _uplus,
+}
 
-class _ContinueSignal(Exception):
-    pass
+
+# memo{fn} caches results keyed on the arguments of a call, which is an array and can
+# hold arrays, sets and dicts, so the key is a hashable copy of it. ints and strings
+# stand for themselves, floats and bools carry their type because python considers
+# 1, 1.0 and true the same key while bang can tell them apart (7 / 1 isn't 7). instances
+# and functions can change without being reassigned, so arguments holding one of
+# them make a key of None, and the call isn't cached
+
+
+def memo_key(args):
+    key = []
+    for value in args:
+        type_value = type(value)
+        if type_value is not int and type_value is not str:
+            value = frozen_value(value)
+            if value is None:
+                return None
+        key.append(value)
+    return tuple(key)
+
+
+def frozen_value(value):
+    type_value = type(value)
+    if type_value is int or type_value is str:
+        return value
+    if type_value is float or type_value is bool:
+        return (type_value, value)
+    if type_value is list or type_value in LAZY_ARRAY_TYPES:
+        key = memo_key(value)
+        return None if key is None else (list, key)
+    if type_value is set:
+        return (set, frozenset(frozen_value(element) for element in value))
+    if type_value is dict:
+        key = memo_key(value)
+        items = memo_key(value.values())
+        if key is None or items is None:
+            return None
+        return (dict, key, items)
+    return None
+
+
+# the results automatically memoized functions cache, nothing else can refer to them
+PLAIN_TYPES = frozenset((int, float, str, bool))
+
+
+def copied_value(value):
+    # a cached result is handed out as a copy, so a caller changing the array it got
+    # doesn't change what the next call returns
+    type_value = type(value)
+    if type_value is list:
+        return [copied_value(element) for element in value]
+    if type_value is dict:
+        return {key: copied_value(element) for key, element in value.items()}
+    if type_value is set:
+        return set(value)
+    if type_value in LAZY_ARRAY_TYPES:
+        return value.copy()
+    return value
+
+
+# the comparisons where{} keeps the rows of a table by
+WHERE_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
 
 
 # from our semantic analysis, we don't have to really change anything.
@@ -231,6 +359,7 @@ class Evaluator:
     BOOLEAN_LITERAL_NODE_CLASS = BOOLEAN_LITERAL_NODE_CLASS
     BREAK_NODE_CLASS = BREAK_NODE_CLASS
     CALL_NODE_CLASS = CALL_NODE_CLASS
+    CONSTANT_ARRAY_NODE_CLASS = CONSTANT_ARRAY_NODE_CLASS
     CONTINUE_NODE_CLASS = CONTINUE_NODE_CLASS
     DATA_CLASS_NODE_CLASS = DATA_CLASS_NODE_CLASS
     EXPRESSION_NODE_CLASS = EXPRESSION_NODE_CLASS
@@ -262,6 +391,14 @@ class Evaluator:
         NONE_LITERAL_NODE_CLASS: lambda _: 0,
     }
 
+    VALUE_TYPES = frozenset(
+        (int, bool, str, float, list, set, dict, LAZY_RANGE, NUMERIC_ARRAY, PACKED_ARRAY)
+    )
+
+    # the values arrays can be, see lazy_range, numeric_array and packed_array in
+    # evaluator_nodes.py
+    ARRAY_TYPES = (list, LAZY_RANGE, NUMERIC_ARRAY, PACKED_ARRAY)
+
     ARITH_OPS = {
         T_PLUS_ENUM_VAL,
         T_MINUS_ENUM_VAL,
@@ -294,8 +431,14 @@ class Evaluator:
         self.roots = roots
 
         # same thing as in the semantic pass
-        # we will have a bunch of scopes
+        # we will have a bunch of scopes. every engine runs on the list frames
+        # laid out by the resolver (self.frames), these dict frames are what the
+        # final global variables are published to once a program is done
         self.scope_stack = [{}]
+        self.frames = None
+        self.resolution = None
+
+        ARRAY_TYPES = self.ARRAY_TYPES
 
         # remember args is potentially a list of lists
 
@@ -324,7 +467,7 @@ class Evaluator:
 
         def _built_in_sum(args, meta_data):
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -333,13 +476,22 @@ class Evaluator:
 
             if not args:
                 return 0
+            if type(args) is PACKED_ARRAY and args.items is None:
+                # packed numbers add up without being checked one by one, floats in
+                # order, the way the loop below adds them
+                data = args.data
+                return sum(data) if data.typecode == "q" else reduce(operator.add, data, 0.0)
 
             expected_type = type(args[0])
             if expected_type is int:
                 base = 0
+            elif expected_type is float:
+                base = 0.0
             elif expected_type is str:
                 base = ""
-            elif expected_type is list:
+            elif expected_type in ARRAY_TYPES:
+                # ranges and arrays add up to an array
+                expected_type = list
                 base = []
             elif expected_type is set:
                 base = set()
@@ -347,7 +499,7 @@ class Evaluator:
                 base = {}
 
             for i in args:
-                if type(i) is not expected_type:
+                if (list if type(i) in ARRAY_TYPES else type(i)) is not expected_type:
                     raise EvaluatorError(
                         self.file,
                         "sum function expects argument list of homegenous type",
@@ -363,7 +515,7 @@ class Evaluator:
 
         def _built_in_min(args, meta_data):
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -378,6 +530,9 @@ class Evaluator:
                     meta_data.column_start,
                     meta_data.column_end,
                 )
+            if type(args) is PACKED_ARRAY and args.items is None:
+                # all numbers of the same type, nothing to check
+                return min(args.data)
 
             expected_type = type(args[0])
             base = args[0]
@@ -404,7 +559,7 @@ class Evaluator:
 
         def _built_in_max(args, meta_data):
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -419,6 +574,9 @@ class Evaluator:
                     meta_data.column_start,
                     meta_data.column_end,
                 )
+            if type(args) is PACKED_ARRAY and args.items is None:
+                # all numbers of the same type, nothing to check
+                return max(args.data)
 
             expected_type = type(args[0])
             base = args[0]
@@ -445,7 +603,7 @@ class Evaluator:
 
         def _built_in_sort(args, meta_data):
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -461,6 +619,8 @@ class Evaluator:
                     meta_data.column_end,
                 )
 
+            if type(args) is PACKED_ARRAY and args.items is None:
+                return PACKED_ARRAY(array(args.data.typecode, sorted(args.data)))
             try:
                 return sorted(args)
 
@@ -475,7 +635,7 @@ class Evaluator:
 
         def _built_in_set(args, meta_data):
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -499,7 +659,7 @@ class Evaluator:
             # if empty initialization
 
             if len(args) == 1:
-                if type(args[0]) is list:
+                if type(args[0]) in ARRAY_TYPES:
                     args = args[0]
                 elif type(args[0]) is set:
                     args = list(args[0])
@@ -530,7 +690,7 @@ class Evaluator:
             return expected_return
 
         def _built_in_range(args, meta_data):
-            if len(args) == 1 and type(args[0]) is list:
+            if len(args) == 1 and type(args[0]) in ARRAY_TYPES:
                 args = args[0]
 
             if not args:
@@ -575,7 +735,142 @@ class Evaluator:
                     meta_data.column_end,
                 )
 
-            return [i for i in range(start, end, jmp)]
+            return LAZY_RANGE(range(start, end, jmp))
+
+        def _built_in_memo(args, meta_data):
+            if args and type(args[0]) is MEMOIZED_FUNCTION:
+                # a memoized function gets a cache of its own
+                args = [args[0].function] + args[1:]
+            if not 1 <= len(args) <= 2 or type(args[0]) is not self.RUN_TIME_FUNCTION:
+                raise EvaluatorError(
+                    self.file,
+                    "memo expects a function and optionally a cache size",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            max_size = args[1] if len(args) == 2 else MEMO_DEFAULT_SIZE
+            if type(max_size) is not int or max_size < 1:
+                raise EvaluatorError(
+                    self.file,
+                    "memo cache size must be a positive int",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            return MEMOIZED_FUNCTION(function=args[0], max_size=max_size)
+
+        def _built_in_memo_stats(args, meta_data):
+            if len(args) != 1 or type(args[0]) is not MEMOIZED_FUNCTION:
+                raise EvaluatorError(
+                    self.file,
+                    "memo_stats expects exactly one memoized function",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            memo = args[0]
+            return {
+                "hits": memo.hits,
+                "misses": memo.misses,
+                "evictions": memo.evictions,
+                "uncached": memo.uncached,
+                "size": len(memo.cache),
+                "max_size": memo.max_size,
+            }
+
+        # tables (see table in evaluator_nodes.py). where{} and sort_by{} work a column
+        # out in one go, with python's c loops (map, compress, sorted) doing the
+        # comparing, and build the table of the rows they keep column by column
+
+        def _built_in_table(args, meta_data):
+            if (
+                not 2 <= len(args) <= 3
+                or type(args[0]) is not self.RUN_TIME_DATACLASS
+                or type(args[1]) is not int
+                or args[1] < 0
+            ):
+                raise EvaluatorError(
+                    self.file,
+                    "table expects a dataclass, a number of rows and optionally "
+                    "the value every field starts out as",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            dataclass, rows = args[0], args[1]
+            start = args[2] if len(args) == 3 else 0
+            typecode = PACKED_TYPECODES.get(type(start))
+            columns = []
+            for _ in dataclass.fields:
+                if typecode is not None:
+                    columns.append(PACKED_ARRAY(array(typecode, [start]) * rows))
+                else:
+                    columns.append([start] * rows)
+            return TABLE(dataclass.offsets, columns, rows)
+
+        def table_column(args, name, meta_data):
+            if (
+                len(args) < 2
+                or type(args[0]) is not TABLE
+                or type(args[1]) is not str
+                or args[1] not in args[0].offsets
+            ):
+                raise EvaluatorError(
+                    self.file,
+                    f"{name} expects a table and the name of one of its fields",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            table = args[0]
+            column = table.values[table.offsets[args[1]]]
+            # the numbers of a packed column themselves, handed out without a method call
+            return table, column.values() if type(column) is PACKED_ARRAY else column
+
+        def _built_in_where(args, meta_data):
+            table, column = table_column(args, "where", meta_data)
+            if len(args) != 4 or args[2] not in WHERE_OPS:
+                raise EvaluatorError(
+                    self.file,
+                    "where expects a table, a field name, a comparison "
+                    f"({', '.join(WHERE_OPS)}) and a value",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            try:
+                kept = compress(range(len(table)), map(WHERE_OPS[args[2]], column, repeat(args[3])))
+                return table.taken(list(kept))
+            except TypeError:
+                raise EvaluatorError(
+                    self.file,
+                    f"comparison not supported between the field and type {type(args[3])}",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                ) from None
+
+        def _built_in_sort_by(args, meta_data):
+            table, column = table_column(args, "sort_by", meta_data)
+            if len(args) != 2:
+                raise EvaluatorError(
+                    self.file,
+                    "sort_by expects a table and the name of one of its fields",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            try:
+                return table.taken(sorted(range(len(table)), key=column.__getitem__))
+            except TypeError:
+                raise EvaluatorError(
+                    self.file,
+                    "sort_by expects a field of homogenous, sortable type",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                ) from None
 
         # by name
         self.built_in_functions = {
@@ -588,6 +883,11 @@ class Evaluator:
             "set": _built_in_set,
             "dict": _built_in_dict,
             "range": _built_in_range,
+            "memo": _built_in_memo,
+            "memo_stats": _built_in_memo_stats,
+            "table": _built_in_table,
+            "where": _built_in_where,
+            "sort_by": _built_in_sort_by,
         }
 
         self.construct_to_eval = {
@@ -599,9 +899,9 @@ class Evaluator:
             self.BREAK_NODE_CLASS: self.eval_break,
             self.CONTINUE_NODE_CLASS: self.eval_continue,
             self.RETURN_NODE_CLASS: self.eval_return,
-            self.EXPRESSION_NODE_CLASS: self.eval_expression,
+            self.EXPRESSION_NODE_CLASS: self.eval_expression_statement,
             self.FUNCTION_NODE_CLASS: self.eval_function,
-            self.CALL_NODE_CLASS: self.eval_expression,
+            self.CALL_NODE_CLASS: self.eval_expression_statement,
             self.DATA_CLASS_NODE_CLASS: self.eval_dataclass,
         }
 
@@ -613,10 +913,43 @@ class Evaluator:
         # because if we see a break outside of a loop for example we can throw an error
         self.loop_depth = 0
         self.func_depth = 0
+        # how many frames at the bottom of self.frames the running call shares with
+        # its caller, and a copy of them for the functions it creates (see eval_function)
+        self.shared_depth = 0
+        self.shared_snapshot = None
+        # id(CallNode) -> call_site, the inline cache of every call
+        self.call_sites = {}
+        # id(FieldAccessNode) -> field_site, the inline cache of every field access
+        self.field_sites = {}
+        # (left type, right type, operator) -> handler, for the types of this
+        # program that BIN_OP_TABLE doesn't have (see bin_op_handler)
+        self.bin_op_handlers = {}
+        # id(AssignmentNode) -> the function running it (see assignment_handler)
+        self.assignment_handlers = {}
+        self.assignment_targets = {
+            self.IDENTIFIER_NODE_CLASS: self.assign_name,
+            self.INDEX_NODE_CLASS: self.assign_index,
+            self.ARRAY_LITERAL_NODE_CLASS: self.assign_multi,  # nested
+            self.FIELD_ACCESS_NODE_CLASS: self.assign_field,
+        }
 
     def eval_program(self):
+        self.resolution = Resolver(self.roots, self.built_in_functions).resolve()
+        self.resolved_names = self.resolution.names
+        self.call_sites = self.resolution.calls
+        self.frames = [self.resolution.global_frame.template[:]]
         for construct in self.roots:
             self.eval_construct(construct)
+        self.publish_globals()
+
+    def publish_globals(self):
+        # the outermost frame, so callers can look at the final state by name
+        global_frame = self.frames[0]
+        self.scope_stack[0].update(
+            (name, global_frame[slot])
+            for slot, name in enumerate(self.resolution.global_frame.names)
+            if global_frame[slot] is not UNSET
+        )
 
     # could probably use this eval_construct more
     # typically but its clearer to just call the specific expression
@@ -626,13 +959,13 @@ class Evaluator:
         return handler(root)
 
     def eval_dataclass(self, root):
-        dataclass_name = root.name
         seen = set()
         dataclass_fields = [f for f in root.fields if not (f in seen or seen.add(f))]
-        self.initalize_var(dataclass_name, self.RUN_TIME_DATACLASS(fields=dataclass_fields))
+        self.store_var(
+            self.resolution.declarations[id(root)], self.RUN_TIME_DATACLASS(fields=dataclass_fields)
+        )
 
     def eval_function(self, root):
-        function_name = root.name
         args_name = root.arg_list_name
         # with this, were limiting the number of frames on the scope stack at function creation
         # but were not limiting the contents of those frames.
@@ -641,61 +974,110 @@ class Evaluator:
         # (no new scopes the function can see)
         # but we can add infinitely many new variables to those frozen
         # scopes (because we want the function to be able to, say, call itself)
-        closure = self.scope_stack[:]
-
-        self.initalize_var(
-            function_name,
-            self.RUN_TIME_FUNCTION(body=root.body, params_name=args_name, closure=closure),
+        #
+        # only the frames declaring a name the function refers to are closed over
+        # (see resolver.py), the others are None so the depths stay the same.
+        #
+        function = self.RUN_TIME_FUNCTION(
+            body=root.body,
+            params_name=args_name,
+            closure=self.closure_frames(self.resolution.closures[id(root)]),
+            effects=root.effects,
         )
+        if root.effects is not None and root.effects.memoize:
+            function = self.memoized(function)
+        self.store_var(self.resolution.declarations[id(root)], function)
+
+    def closure_frames(self, depths):
+        # calls share the frames they close over, but a function created inside of a
+        # call has always seen those frames the way they were when the call started,
+        # so it closes over a copy of them, made at most once per frame and call
+        frames = self.frames
+        shared_depth = self.shared_depth
+        closure = [None] * len(frames)
+        for depth in depths:
+            if depth < shared_depth:
+                snapshot = self.shared_snapshot
+                if snapshot is None:
+                    snapshot = self.shared_snapshot = [None] * shared_depth
+                frame = snapshot[depth]
+                if frame is None:
+                    frame = snapshot[depth] = frames[depth][:]
+                closure[depth] = frame
+            else:
+                closure[depth] = frames[depth]
+        return closure
+
+    def eval_expression_statement(self, root):
+        # the value of an expression used as a statement is thrown away,
+        # a statement only returns its completion
+        self.eval_expression(root)
 
     def eval_block(self, root):
-        # A block just evals its children in the current scope
+        # A block just evals its children in the current scope, and stops
+        # at the first one that doesn't complete normally
 
+        construct_to_eval = self.construct_to_eval
         for construct in root.block:
-            self.eval_construct(construct)
+            completion = construct_to_eval[type(construct)](construct)
+            if completion is not None:
+                return completion
+        return None
 
     def eval_if(self, root):
         if self.eval_expression(root.condition.root_expr):
-            self.scope_stack.append({})
-            self.eval_block(root.body)
-            self.scope_stack.pop()
-            return
+            return self.eval_scoped_block(root.body)
         for elif_root in root.elif_branch.block:
             if self.eval_expression(elif_root.condition.root_expr):
-                self.scope_stack.append({})
-                self.eval_block(elif_root.body)
-                self.scope_stack.pop()
-                return
+                return self.eval_scoped_block(elif_root.body)
         for else_root in root.else_branch.block:
-            self.scope_stack.append({})
-            self.eval_block(else_root.body)
-            self.scope_stack.pop()
-            return
+            return self.eval_scoped_block(else_root.body)
+        return None
+
+    def eval_scoped_block(self, root):
+        # the frame is popped on every completion (and on errors), the resolver's
+        # depths assume the frame stack always mirrors the scopes
+        layout = self.resolution.frames[id(root)]
+        if layout is None:
+            # a body declaring nothing runs in the enclosing frame
+            return self.eval_block(root)
+        frames = self.frames
+        frames.append(layout.template[:])
+        try:
+            return self.eval_block(root)
+        finally:
+            frames.pop()
 
     def eval_for(self, root):
         self.loop_depth += 1
-        self.scope_stack.append({})
-        left_hand_name = root.variable.value
+        layout = self.resolution.frames[id(root.body)]
+        if layout is not None:
+            self.frames.append(layout.template[:])
+        variable = self.resolved_names[id(root.variable)]
         right_hand_val = self.eval_expression(root.bound.root_expr)
+        # a return leaving the loop, handed up to the call
+        completion = None
 
         if type(right_hand_val) is int:
             for i in range(0, right_hand_val, -1 if right_hand_val < 0 else 1):
-                self.initalize_var(left_hand_name, i)
-                try:
-                    self.eval_block(root.body)
-                except _ContinueSignal:
-                    continue
-                except _BreakSignal:
+                self.store_var(variable, i)
+                signal = self.eval_block(root.body)
+                if signal is not None:
+                    if signal is _CONTINUE:
+                        continue
+                    if signal is not _BREAK:
+                        completion = signal
                     break
         else:
             try:
                 for i in right_hand_val:
-                    self.initalize_var(left_hand_name, i)
-                    try:
-                        self.eval_block(root.body)
-                    except _ContinueSignal:
-                        continue
-                    except _BreakSignal:
+                    self.store_var(variable, i)
+                    signal = self.eval_block(root.body)
+                    if signal is not None:
+                        if signal is _CONTINUE:
+                            continue
+                        if signal is not _BREAK:
+                            completion = signal
                         break
             except TypeError:
                 raise EvaluatorError(
@@ -706,23 +1088,31 @@ class Evaluator:
                     root.meta_data.column_end,
                 ) from None
 
-        self.scope_stack.pop()
+        if layout is not None:
+            self.frames.pop()
         self.loop_depth -= 1
+        return completion
 
     def eval_while(self, root):
         self.loop_depth += 1
-        self.scope_stack.append({})
+        layout = self.resolution.frames[id(root.body)]
+        if layout is not None:
+            self.frames.append(layout.template[:])
+        completion = None
         try:
             while self.eval_expression(root.condition.root_expr):
-                try:
-                    self.eval_block(root.body)
-                except _BreakSignal:
+                signal = self.eval_block(root.body)
+                if signal is not None:
+                    if signal is _CONTINUE:
+                        continue
+                    if signal is not _BREAK:
+                        completion = signal
                     break
-                except _ContinueSignal:
-                    continue
         finally:
             self.loop_depth -= 1
-            self.scope_stack.pop()
+            if layout is not None:
+                self.frames.pop()
+        return completion
 
     def eval_break(self, root):
         if self.loop_depth == 0:
@@ -733,7 +1123,7 @@ class Evaluator:
                 root.meta_data.column_start,
                 root.meta_data.column_end,
             )
-        raise _BreakSignal()
+        return _BREAK
 
     def eval_continue(self, root):
         if self.loop_depth == 0:
@@ -744,7 +1134,7 @@ class Evaluator:
                 root.meta_data.column_start,
                 root.meta_data.column_end,
             )
-        raise _ContinueSignal()
+        return _CONTINUE
 
     def eval_return(self, root):
         if not self.func_depth:
@@ -755,204 +1145,351 @@ class Evaluator:
                 root.meta_data.column_start,
                 root.meta_data.column_end,
             )
-        value = self.eval_expression(root.expression.root_expr)
-        raise _ReturnSignal(value=value)
-
-    # every time a var is assigned we throw it into our current scope
-    # to let expressions which use the var in the future know that exists in the current scope
-    # with each initalized var being associated with its respective type
-    def initalize_var(self, left_hand, right_hand):
-        for depth in range(len(self.scope_stack) - 1, -1, -1):
-            scope = self.scope_stack[depth]
-            if left_hand in scope:
-                scope[left_hand] = right_hand
-                return
-        # Otherwise define it in the current scope
-        self.scope_stack[-1][left_hand] = right_hand
-
-    def search_for_var(self, name, potential_error):
-        for idx, scope in enumerate(reversed(self.scope_stack)):
-            if name in scope:
-                # converts reversed index to normal index
-                return len(self.scope_stack) - idx - 1
+        expression = root.expression.root_expr
+        if type(expression) is self.CALL_NODE_CLASS:
+            site, callee, func_name, arg_vals = self.eval_call_operands(expression)
+            if type(callee) is self.RUN_TIME_FUNCTION:
+                site.hits += 1
+                return _TailCall(callee, arg_vals)
+            return _Return(self.call_cached(site, callee, func_name, arg_vals, expression))
+        return _Return(self.eval_expression(expression))
+
+    # the resolver already decided which frame slot every name lives in
+    # (see resolver.py), so reading and writing a variable is just indexing
+    def load_var(self, resolved, potential_error):
+        frames = self.frames
+        for depth, slot in resolved.coordinates:
+            value = frames[depth][slot]
+            if value is not UNSET:
+                return value
         raise EvaluatorError(
             self.file,
-            f"Variable {name} not found in current scope",
+            f"Variable {resolved.name} not found in current scope",
             potential_error.line,
             potential_error.column_start,
             potential_error.column_end,
         )
 
+    def store_var(self, resolved, value):
+        coordinates = resolved.coordinates
+        if len(coordinates) == 1:
+            ((depth, slot),) = coordinates
+        else:
+            depth, slot = self.store_slot(resolved)
+        self.frames[depth][slot] = value
+
+    def store_slot(self, resolved):
+        # the slot a write of a name more than one frame may hold goes to: the innermost
+        # one holding it already, like a read, otherwise the one of its own block
+        frames = self.frames
+        for depth, slot in resolved.coordinates:
+            if frames[depth][slot] is not UNSET:
+                return depth, slot
+        return resolved.coordinates[0]
+
+    # every assignment works out what it assigns to, and builds the operation a compound
+    # assignment (x -= y) carries out, the first time it runs (see assignment_handler),
+    # so running it again goes straight to storing the value and allocates nothing
+
     def eval_assignments(self, root):
-        # probably we are going to want to change these if elif blocks into
-        # functions because they are simply meant to differentiate between different types of
-        # left hands which could be arbitrarily large
+        handler = self.assignment_handlers.get(id(root))
+        if handler is None:
+            handler = self.assignment_handlers[id(root)] = self.assignment_handler(root)
+        handler()
+
+    def assignment_handler(self, root):
+        """Return a function running the assignment root."""
+        left_hand = root.left_hand
+        type_left_hand = type(left_hand)
+        right_hand = root.right_hand.root_expr
+        op_type_id = root.op
+        eval_expression = self.eval_expression
+
+        if (
+            op_type_id == T_PLUS_ASSIGN_ENUM_VAL
+            and type_left_hand is not self.ARRAY_LITERAL_NODE_CLASS
+        ):
+            eval_add_assignment = self.eval_add_assignment
+            op_node = self.BIN_OP_NODE_CLASS(
+                left=left_hand, op=T_PLUS_ENUM_VAL, right=right_hand, meta_data=root.meta_data
+            )
 
-        T_ASSIGN_ENUM_VAL = self.T_ASSIGN_ENUM_VAL
-        BIN_OP_NODE_CLASS = self.BIN_OP_NODE_CLASS
-        ASSIGNMENT_TO_NORMAL_OPS = self.ASSIGNMENT_TO_NORMAL_OPS
+            def run_add_assignment():
+                eval_add_assignment(root, op_node)
 
-        def eval_assignment_typical(left_hand, right_hand_value):
-            left_hand_name = left_hand.value
-            try:
-                idx = self.search_for_var(left_hand_name, root.meta_data)
-                self.scope_stack[idx][left_hand_name] = right_hand_value
-            except EvaluatorError:
-                self.initalize_var(left_hand_name, right_hand_value)
-
-        def eval_assignment_index(left_hand, right_hand_value):
-            left_hand_base = left_hand.base
-            if type(left_hand_base) is self.IDENTIFIER_NODE_CLASS:
-                base_location = self.search_for_var(left_hand_base.value, root.meta_data)
-                base_frame = self.scope_stack[base_location]
-                target = base_frame[left_hand.base.value]
-            else:
-                target = self.eval_expression(left_hand_base)
-            for idx in left_hand.index[:-1]:
-                try:
-                    target = target[self.eval_expression(idx.root_expr)]
-                except (IndexError, TypeError, KeyError):
-                    raise EvaluatorError(
-                        self.file,
-                        "Index out of bounds",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    ) from None
-            try:
-                final_idx = self.eval_expression(left_hand.index[-1].root_expr)
-                target[final_idx] = right_hand_value
-            except (IndexError, TypeError, KeyError):
-                raise EvaluatorError(
-                    self.file,
-                    "Index out of bounds",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                ) from None
+            return run_add_assignment
 
-        def eval_assignment_field(left_hand, right_hand_value):
-            base = self.eval_expression(left_hand.base)
-            chain = left_hand.field
+        if op_type_id != T_ASSIGN_ENUM_VAL and type_left_hand is not self.ARRAY_LITERAL_NODE_CLASS:
+            # x op= y is x = x op y
+            right_hand = self.BIN_OP_NODE_CLASS(
+                left=left_hand,
+                op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                right=right_hand,
+                meta_data=root.meta_data,
+            )
 
-            for name in chain[:-1]:
-                if type(base) is not self.RUN_TIME_INSTANCE:
-                    raise EvaluatorError(
-                        self.file,
-                        "field access is only performable on instances of classes",
-                        left_hand.meta_data.line,
-                        left_hand.meta_data.column_start,
-                        left_hand.meta_data.column_end,
-                    )
-                if name not in base.fields:
-                    raise EvaluatorError(
-                        self.file,
-                        "field name wasn't included in the "
-                        "definition of the instance's corresponding class",
-                        left_hand.meta_data.line,
-                        left_hand.meta_data.column_start,
-                        left_hand.meta_data.column_end,
-                    )
-                base = base.fields[name]
+        if type_left_hand is self.IDENTIFIER_NODE_CLASS:
+            store_var = self.store_var
+            resolved = self.resolved_names[id(left_hand)]
 
-            final_name = chain[-1]
+            def run_assignment():
+                store_var(resolved, eval_expression(right_hand))
 
-            if type(base) is not self.RUN_TIME_INSTANCE:
-                raise EvaluatorError(
-                    self.file,
-                    "field access is only performable on instances of classes",
-                    left_hand.meta_data.line,
-                    left_hand.meta_data.column_start,
-                    left_hand.meta_data.column_end,
-                )
-            if final_name not in base.fields:
-                raise EvaluatorError(
-                    self.file,
-                    "field name wasn't included in the definition "
-                    "of the instance's corresponding class",
-                    left_hand.meta_data.line,
-                    left_hand.meta_data.column_start,
-                    left_hand.meta_data.column_end,
-                )
+            return run_assignment
 
-            base.fields[final_name] = right_hand_value
+        parallel = self.parallel_assignment(root)
+        if parallel is not None:
+            return self.parallel_assignment_handler(root, *parallel)
 
-        def eval_assignment_multi(left_hand, right_hand_value):
-            ARRAY_LITERAL_NODE_CLASS = self.ARRAY_LITERAL_NODE_CLASS
+        assign = self.assignment_targets[type_left_hand]
+        if type_left_hand is self.ARRAY_LITERAL_NODE_CLASS and op_type_id != T_ASSIGN_ENUM_VAL:
+            # [a, b] op= [y, z], every target is assigned its value op its element
+            op_node = self.BIN_OP_NODE_CLASS(
+                left=None,
+                op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                right=None,
+                meta_data=root.meta_data,
+            )
+        else:
+            op_node = None
+
+        def run_target_assignment():
+            assign(left_hand, eval_expression(right_hand), root, op_node)
+
+        return run_target_assignment
+
+    @staticmethod
+    def parallel_assignment(root):
+        """Return the targets and values of [a, b] = [x, y] when both sides are array
+        literals and no target is nested, None when it takes the general path."""
+        left_hand = root.left_hand
+        right_hand = root.right_hand.root_expr
+        if (
+            type(left_hand) is not ARRAY_LITERAL_NODE_CLASS
+            or type(right_hand) is not ARRAY_LITERAL_NODE_CLASS
+            or len(left_hand.elements) > len(right_hand.elements)
+        ):
+            return None
+        targets = [element.root_expr for element in left_hand.elements]
+        if any(type(target) is ARRAY_LITERAL_NODE_CLASS for target in targets):
+            return None
+        return targets, [element.root_expr for element in right_hand.elements]
+
+    def parallel_assignment_handler(self, root, targets, values):
+        """Return a function running [a, b] = [x, y] without building the right hand list."""
+        eval_expression = self.eval_expression
+        return self.run_parallel(
+            [partial(eval_expression, value) for value in values],
+            [self.parallel_store(target, root) for target in targets],
+        )
 
-            if type(right_hand_value) not in (list, ARRAY_LITERAL_NODE_CLASS):
-                raise EvaluatorError(
-                    self.file,
-                    "multi-variable assignment right hand must be type list",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
-            if len(left_hand.elements) > len(right_hand_value):
-                raise EvaluatorError(
-                    self.file,
-                    "not enough values to unpack",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
+    @staticmethod
+    def run_parallel(values, stores):
+        """Return a function calling every value, then storing the results in order.
+
+        Every value is computed before the first target is assigned, so swaps and
+        rotations see the old values, exactly like the general path. The closure
+        compiler builds its parallel assignments here too, so both run them in the
+        same order."""
+        if len(stores) == 2 and len(values) == 2:
+            store_a, store_b = stores
+            value_a, value_b = values
+
+            def run_parallel_pair():
+                a = value_a()
+                b = value_b()
+                store_a(a)
+                store_b(b)
+
+            return run_parallel_pair
+
+        if len(stores) == 3 and len(values) == 3:
+            store_a, store_b, store_c = stores
+            value_a, value_b, value_c = values
+
+            def run_parallel_triple():
+                a = value_a()
+                b = value_b()
+                c = value_c()
+                store_a(a)
+                store_b(b)
+                store_c(c)
+
+            return run_parallel_triple
+
+        stores = tuple(stores)
+        values = tuple(values)
+
+        def run_parallel_assignment():
+            # values past the last target are still computed, for their side effects
+            assigned = [value() for value in values]
+            for i, store in enumerate(stores):
+                store(assigned[i])
+
+        return run_parallel_assignment
+
+    def parallel_store(self, target, root):
+        """Return a function storing a value in one target of a parallel assignment."""
+        if type(target) is self.IDENTIFIER_NODE_CLASS:
+            store = partial(self.store_var, self.resolved_names[id(target)])
+        else:
+            store = partial(self.assignment_targets[type(target)], target, root=root, op_node=None)
+        if root.op == T_ASSIGN_ENUM_VAL:
+            return store
+
+        # [a, b] op= [x, y], the current value of the target op its value
+        eval_expression = self.eval_expression
+        eval_bin_op_values = self.eval_bin_op_values
+        op_node = self.BIN_OP_NODE_CLASS(
+            left=target,
+            op=self.ASSIGNMENT_TO_NORMAL_OPS[root.op],
+            right=None,
+            meta_data=root.meta_data,
+        )
 
-            # try and optimize this. maybe turn nexted funcs into methods
-
-            for i, n in enumerate(left_hand.elements):
-                left_hand_side = n.root_expr
-                assignee = right_hand_value[i]
-                if (
-                    op_type_id != T_ASSIGN_ENUM_VAL
-                    and type(left_hand_side) is not ARRAY_LITERAL_NODE_CLASS
-                ):
-                    assignee = self.eval_bin_ops(
-                        BIN_OP_NODE_CLASS(
-                            left=left_hand_side,
-                            op=ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
-                            right=assignee,
-                            meta_data=root.meta_data,
-                        )
-                    )
-                DISPATCH_ASSIGNMENT_TO_FUNC[type(left_hand_side)](
-                    left_hand=left_hand_side, right_hand_value=assignee
-                )
+        def store_compound(value):
+            store(eval_bin_op_values(eval_expression(target), value, op_node))
 
-        right_hand_value = self.eval_expression(root.right_hand.root_expr)
-        op_type_id = root.op
-        type_root_left_hand = type(root.left_hand)
-        if op_type_id != T_ASSIGN_ENUM_VAL and type_root_left_hand is not ARRAY_LITERAL_NODE_CLASS:
-            right_hand_value = self.eval_expression(
-                BIN_OP_NODE_CLASS(
-                    left=root.left_hand,
-                    op=ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
-                    right=root.right_hand.root_expr,
-                    meta_data=root.meta_data,
-                )
+        return store_compound
+
+    # the targets an assignment stores its value in besides a variable, each called
+    # with the target, the value, the assignment and the operation every element of a
+    # multi-assignment is combined with (None for a plain one)
+
+    def assign_name(self, left_hand, value, root, op_node):
+        self.store_var(self.resolved_names[id(left_hand)], value)
+
+    def assign_index(self, left_hand, value, root, op_node):
+        left_hand_base = left_hand.base
+        if type(left_hand_base) is self.IDENTIFIER_NODE_CLASS:
+            target = self.load_var(self.resolved_names[id(left_hand_base)], root.meta_data)
+        else:
+            target = self.eval_expression(left_hand_base)
+        for idx in left_hand.index[:-1]:
+            try:
+                target = target[self.eval_expression(idx.root_expr)]
+            except (IndexError, TypeError, KeyError):
+                raise self.index_error(root.meta_data) from None
+        try:
+            final_idx = self.eval_expression(left_hand.index[-1].root_expr)
+            target[final_idx] = value
+        except (IndexError, TypeError, KeyError):
+            raise self.index_error(root.meta_data) from None
+
+    def assign_field(self, left_hand, value, root, op_node):
+        base = self.eval_expression(left_hand.base)
+        values, index = self.eval_field_slot(self.field_site(left_hand), base, left_hand.meta_data)
+        values[index] = value
+
+    def assign_multi(self, left_hand, value, root, op_node):
+        if type(value) not in self.ARRAY_TYPES and type(value) is not self.ARRAY_LITERAL_NODE_CLASS:
+            raise EvaluatorError(
+                self.file,
+                "multi-variable assignment right hand must be type list",
+                root.meta_data.line,
+                root.meta_data.column_start,
+                root.meta_data.column_end,
+            )
+        if len(left_hand.elements) > len(value):
+            raise EvaluatorError(
+                self.file,
+                "not enough values to unpack",
+                root.meta_data.line,
+                root.meta_data.column_start,
+                root.meta_data.column_end,
             )
 
-        DISPATCH_ASSIGNMENT_TO_FUNC = {
-            self.IDENTIFIER_NODE_CLASS: eval_assignment_typical,
-            self.INDEX_NODE_CLASS: eval_assignment_index,
-            self.ARRAY_LITERAL_NODE_CLASS: eval_assignment_multi,  # nested
-            self.FIELD_ACCESS_NODE_CLASS: eval_assignment_field,
-        }
+        assignment_targets = self.assignment_targets
+        for i, n in enumerate(left_hand.elements):
+            target = n.root_expr
+            assignee = value[i]
+            type_target = type(target)
+            if op_node is not None and type_target is not self.ARRAY_LITERAL_NODE_CLASS:
+                assignee = self.eval_bin_op_values(self.eval_expression(target), assignee, op_node)
+            assignment_targets[type_target](target, assignee, root, op_node)
+
+    def eval_add_assignment(self, root, op_node):
+        # x += y, which changes x's array (set, dict) in place when nothing else refers
+        # to it (see add_in_place in binary_operations.py). the variable, element or field
+        # assigned is worked out once, and read before the right hand is evaluated.
+        # op_node is the x + y carried out otherwise
+        left_hand = root.left_hand
+        type_left_hand = type(left_hand)
+
+        if type_left_hand is self.IDENTIFIER_NODE_CLASS:
+            resolved = self.resolved_names[id(left_hand)]
+            left = self.load_var(resolved, left_hand.meta_data)
+            right = self.eval_expression(root.right_hand.root_expr)
+            depth, slot = self.store_slot(resolved)
+            frame = self.frames[depth]
+            if frame[slot] is left and add_in_place(left, right):
+                return
+            frame[slot] = self.eval_bin_op_values(left, right, op_node)
+            return
+
+        if type_left_hand is self.FIELD_ACCESS_NODE_CLASS:
+            values, index = self.eval_field_slot(
+                self.field_site(left_hand),
+                self.eval_expression(left_hand.base),
+                left_hand.meta_data,
+            )
+            left = values[index]
+            right = self.eval_expression(root.right_hand.root_expr)
+            if values[index] is left and add_in_place(left, right):
+                return
+            values[index] = self.eval_bin_op_values(left, right, op_node)
+            return
 
-        DISPATCH_ASSIGNMENT_TO_FUNC[type_root_left_hand](
-            left_hand=root.left_hand, right_hand_value=right_hand_value
+        base = left_hand.base
+        if type(base) is self.IDENTIFIER_NODE_CLASS:
+            container = self.load_var(self.resolved_names[id(base)], root.meta_data)
+        else:
+            container = self.eval_expression(base)
+        indexes = [self.eval_expression(i.root_expr) for i in left_hand.index]
+        # reading the element fails like reading it anywhere else would
+        container = self.eval_index_chain(container, indexes[:-1], left_hand)
+        key = indexes[-1]
+        try:
+            left = container[key]
+        except (IndexError, TypeError, KeyError):
+            raise self.index_error(left_hand.meta_data) from None
+        right = self.eval_expression(root.right_hand.root_expr)
+        try:
+            unchanged = container[key] is left
+        except (IndexError, TypeError, KeyError):
+            raise self.index_error(root.meta_data) from None
+        if unchanged and add_in_place(left, right):
+            return
+        value = self.eval_bin_op_values(left, right, op_node)
+        try:
+            container[key] = value
+        except (IndexError, TypeError, KeyError):
+            raise self.index_error(root.meta_data) from None
+
+    def index_error(self, meta_data):
+        return EvaluatorError(
+            self.file,
+            "Index out of bounds",
+            meta_data.line,
+            meta_data.column_start,
+            meta_data.column_end,
         )
 
     # this function handles all expression level contructs such as literals, binary ops,
     # unary ops, and function calls
     def eval_expression(self, root):
         type_root = type(root)
-        if type_root in (int, bool, str, float, list, set, dict):
-            return root
-
         if type_root is self.EXPRESSION_NODE_CLASS:
             root = root.root_expr
             type_root = type(root)
 
+        if type_root in self.VALUE_TYPES:
+            # values already (the constant folder's, or operands made up at runtime)
+            return root
+
+        if type_root is self.CONSTANT_ARRAY_NODE_CLASS:
+            return root.materialize()
+
         if type_root in self.LITERALS:
             # converting bang literals to python literals
             actual_value_function = self.LITERALS[type_root]
@@ -974,446 +1511,309 @@ class Evaluator:
         elif type_root is self.INDEX_NODE_CLASS:
             # converting bang index into python literal
             index_chain = [self.eval_expression(i.root_expr) for i in root.index]
-            base = self.eval_expression(root.base)
-            for i in index_chain:
-                try:
-                    base = base[i]
-                except (IndexError, TypeError, KeyError):
-                    raise EvaluatorError(
-                        self.file,
-                        "Index out of bounds",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    ) from None
-            return base
+            return self.eval_index_chain(self.eval_expression(root.base), index_chain, root)
 
         elif type_root is self.IDENTIFIER_NODE_CLASS:
             # converting every bang identifier into a python literal
-            return self.scope_stack[self.search_for_var(root.value, root.meta_data)][root.value]
+            return self.load_var(self.resolved_names[id(root)], root.meta_data)
 
         elif type_root is self.CALL_NODE_CLASS:
             # executing a bang block
-
-            # calling dynamic value?
-            root_name = root.name
-            if type(root_name) is self.IDENTIFIER_NODE_CLASS:
-                func_name = root.name.value
-                callee = self.scope_stack[self.search_for_var(func_name, root.meta_data)][func_name]
-            else:
-                func_name = None
-                callee = self.eval_expression(root_name)
-
-            arg_vals = [self.eval_expression(i.root_expr) for i in root.args]
-
-            # calling dataclass
-            type_callee = type(callee)
-            if type_callee is self.RUN_TIME_DATACLASS:
-                fields = {}
-                for idx, field in enumerate(callee.fields):
-                    fields[field] = 0
-                    if len(root.args) > idx:
-                        fields[field] = arg_vals[idx]
-
-                return self.RUN_TIME_INSTANCE(of=root_name.value, fields=fields)
-
-            # calling function value?
-            if type_callee is self.RUN_TIME_FUNCTION:
-                return self.eval_call(callee, arg_vals, root.meta_data)
-
-            if not callable(callee):
-                raise EvaluatorError(
-                    self.file,
-                    f"attempt to call non-function (type {type_callee})",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
-
-            # has to be last due to dict access throwing error on non-func-name
-            if func_name in self.built_in_functions:
-                return self.built_in_functions[func_name](arg_vals, root.meta_data)
-
-            # this is required because, for ex., callee the case of bar{}{1,2},
-            # where bar returns a function signature, is a raw function object
-            if callee in self.built_in_function_objects:
-                return callee(arg_vals, root.meta_data)
-
-            raise EvaluatorError(
-                self.file,
-                f"'{root.name}' is not callable",
-                root.meta_data.line,
-                root.meta_data.column_start,
-                root.meta_data.column_end,
-            )
+            site, callee, func_name, arg_vals = self.eval_call_operands(root)
+            return self.call_cached(site, callee, func_name, arg_vals, root)
 
         elif type_root is self.FIELD_ACCESS_NODE_CLASS:
             base = self.eval_expression(root.base)
-            for name in root.field:
-                if type(base) is not self.RUN_TIME_INSTANCE:
-                    raise EvaluatorError(
-                        self.file,
-                        "field access is only performable on instances of classes",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    )
-                if name not in base.fields:
-                    raise EvaluatorError(
-                        self.file,
-                        "field name wasn't included in the definition of "
-                        "the instance's corresponding class",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    )
-                base = base.fields[name]
-            return base
-
-    # -------------------------------------------
-    # BINARY OPERATIONS START
-    # -------------------------------------------
-
-    def eval_bin_ops(self, root):
-        T_PLUS_ENUM_VAL = self.T_PLUS_ENUM_VAL
-        T_MINUS_ENUM_VAL = self.T_MINUS_ENUM_VAL
-        T_ASTERISK_ENUM_VAL = self.T_ASTERISK_ENUM_VAL
-        T_SLASH_ENUM_VAL = self.T_SLASH_ENUM_VAL
-        T_DSLASH_ENUM_VAL = self.T_DSLASH_ENUM_VAL
-        T_EXPO_ENUM_VAL = self.T_EXPO_ENUM_VAL
-        T_EQ_ENUM_VAL = self.T_EQ_ENUM_VAL
-        T_NEQ_ENUM_VAL = self.T_NEQ_ENUM_VAL
-        T_LT_ENUM_VAL = self.T_LT_ENUM_VAL
-        T_LEQ_ENUM_VAL = self.T_LEQ_ENUM_VAL
-        T_GT_ENUM_VAL = self.T_GT_ENUM_VAL
-        T_GTEQ_ENUM_VAL = self.T_GTEQ_ENUM_VAL
-        T_AND_ENUM_VAL = self.T_AND_ENUM_VAL
-        T_OR_ENUM_VAL = self.T_OR_ENUM_VAL
-        T_IN_ENUM_VAL = self.T_IN_ENUM_VAL
-
-        op = root.op
-        left = self.eval_expression(root.left)
-        right = self.eval_expression(root.right)
-        type_left = type(left)
-        type_right = type(right)
-
-        # -------------------------------------------
-        # INT OPERATIONS START
-        # -------------------------------------------
-
-        def eval_int_bin_op(left, op_type_id, right):
-            # every supported operation between two ints in bang
-
-            supported_types = {
-                T_PLUS_ENUM_VAL: operator.add,
-                T_MINUS_ENUM_VAL: operator.sub,
-                T_ASTERISK_ENUM_VAL: operator.mul,
-                T_SLASH_ENUM_VAL: operator.truediv,
-                T_DSLASH_ENUM_VAL: operator.floordiv,
-                T_EXPO_ENUM_VAL: operator.pow,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_LT_ENUM_VAL: operator.lt,
-                T_LEQ_ENUM_VAL: operator.le,
-                T_GT_ENUM_VAL: operator.gt,
-                T_GTEQ_ENUM_VAL: operator.ge,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-            }
-
-            if op_type_id in (T_SLASH_ENUM_VAL, T_DSLASH_ENUM_VAL) and right == 0:
-                raise EvaluatorError(
-                    self.file,
-                    "division by zero",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
-
-            if op_type_id not in supported_types:
-                raise EvaluatorError(
-                    self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
+            return self.eval_field_site(self.field_site(root), base, root.meta_data)
+
+    # the value-level halves of indexing, calling and field access. the tree walker
+    # evaluates the operands and hands them over, and the alternate engines
+    # (see closure_compiler.py) share them so every engine agrees on semantics
+
+    def eval_call_operands(self, root):
+        site = self.call_sites[id(root)]
+        # calling dynamic value?
+        if site.name is not None:
+            func_name = site.name.name
+            callee = self.load_var(site.name, root.meta_data)
+        else:
+            func_name = None
+            callee = self.eval_expression(root.name)
 
-            return supported_types[op](left, right)
-
-        # -------------------------------------------
-        # INT OPERATIONS END
-        # -------------------------------------------
-
-        # -------------------------------------------
-        # STRING OPERATIONS START
-        # -------------------------------------------
-
-        def eval_str_bin_op(left, op, right):
-            def str_sub(a, b):
-                return a.replace(b, "")
-
-            def str_div(a, b):
-                if b == "":
-                    return list(a)
-                return a.split(b)
-
-            supported_types = {
-                T_PLUS_ENUM_VAL: operator.add,
-                T_MINUS_ENUM_VAL: str_sub,
-                T_SLASH_ENUM_VAL: str_div,
-                T_LT_ENUM_VAL: operator.lt,
-                T_LEQ_ENUM_VAL: operator.le,
-                T_GT_ENUM_VAL: operator.gt,
-                T_GTEQ_ENUM_VAL: operator.ge,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-                T_IN_ENUM_VAL: lambda a, b: a in b,
-            }
+        arg_vals = [self.eval_expression(i.root_expr) for i in root.args]
+        return site, callee, func_name, arg_vals
 
-            if op not in supported_types:
+    def eval_index_chain(self, base, index_chain, root):
+        for i in index_chain:
+            try:
+                base = base[i]
+            except (IndexError, TypeError, KeyError):
                 raise EvaluatorError(
                     self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
+                    "Index out of bounds",
                     root.meta_data.line,
                     root.meta_data.column_start,
                     root.meta_data.column_end,
-                )
-
-            return supported_types[op](left, right)
-
-        # -------------------------------------------
-        # STRING OPERATIONS END
-        # -------------------------------------------
-
-        # -------------------------------------------
-        # LIST OPERATIONS START
-        # -------------------------------------------
-
-        def eval_list_bin_op(left, op, right):
-            def list_div_helper(a, b, div_type):
-                if b == 0:
+                ) from None
+        return base
+
+    # every field access and field assignment in the program has an inline cache (see
+    # field_site), so following its chain through instances of the dataclasses it saw
+    # last time is an identity check and an index per field
+
+    def field_site(self, root):
+        site = self.field_sites.get(id(root))
+        if site is None:
+            site = self.field_sites[id(root)] = FIELD_SITE(tuple(root.field))
+        return site
+
+    def eval_field_site(self, site, base, meta_data):
+        """Return the value the chain of fields of site leads to from base."""
+        value = base
+        for shape, index in site.links:
+            if type(value) is not RUN_TIME_INSTANCE or value.offsets is not shape:
+                holder = self.resolve_field_site(site, base, meta_data)
+                return holder.values[site.links[-1][1]]
+            value = value.values[index]
+        site.hits += 1
+        return value
+
+    def eval_field_slot(self, site, base, meta_data):
+        """Return the values of the instance holding the last field of the chain of
+        site (followed from base) and the index of the field in them."""
+        holder = value = base
+        for shape, index in site.links:
+            if type(value) is not RUN_TIME_INSTANCE or value.offsets is not shape:
+                holder = self.resolve_field_site(site, base, meta_data)
+                if type(holder) is TABLE:
                     raise EvaluatorError(
                         self.file,
-                        "attempted divison by zero",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
+                        "the columns of a table can't be assigned, only the fields of its rows",
+                        meta_data.line,
+                        meta_data.column_start,
+                        meta_data.column_end,
                     )
-                return a / b if div_type == "true" else a // b
-
-            def list_sub(a, b):
-                to_remove = set(b)
-                return [x for x in a if x not in to_remove]
-
-            def list_mul(a, b):
-                if type(a) is list and type(b) is list:
-                    if len(a) != len(b):
-                        if 1 not in (len(a), len(b)):
-                            raise EvaluatorError(
-                                self.file,
-                                "list element-wise multiplication is not "
-                                "supported between lists of different lengths where"
-                                "multiplicand length is not one",
-                                root.meta_data.line,
-                                root.meta_data.column_start,
-                                root.meta_data.column_end,
-                            )
-                        multiplier = b[0] if len(b) == 1 else a[0]
-                        base = a if len(a) != 1 else b
-                        return [x * multiplier for x in base]
-                    else:
-                        return [i * j for i, j in zip(a, b, strict=False)]
-                else:
-                    # this will be where operations such as [1] * 3
-                    # go which we will need to change semantic pass to allow
-                    pass
-
-            def list_div(a, b):
-                if type(a) is list and type(b) is list:
-                    if len(a) != len(b):
-                        if 1 not in (len(a), len(b)):
-                            raise EvaluatorError(
-                                self.file,
-                                "list element-wise divsion is not supported "
-                                "between lists of different lengths where"
-                                "divisor length is not one",
-                                root.meta_data.line,
-                                root.meta_data.column_start,
-                                root.meta_data.column_end,
-                            )
-                        divisor = b[0] if len(b) == 1 else a[0]
-                        base = a if len(a) != 1 else b
-                        return [list_div_helper(x, divisor, "true") for x in base]
-                    else:
-                        return [list_div_helper(i, j, "true") for i, j in zip(a, b, strict=False)]
-
-            def list_floor_div(a, b):
-                if type(a) is list and type(b) is list:
-                    if len(a) != len(b):
-                        if 1 not in (len(a), len(b)):
-                            raise EvaluatorError(
-                                self.file,
-                                "list element-wise divsion is not supported "
-                                "between lists of different lengths where"
-                                "divisor length is not one",
-                                root.meta_data.line,
-                                root.meta_data.column_start,
-                                root.meta_data.column_end,
-                            )
-                        divisor = b[0] if len(b) == 1 else a[0]
-                        base = a if len(a) != 1 else b
-                        return [list_div_helper(x, divisor, "floor") for x in base]
-                    else:
-                        return [list_div_helper(i, j, "floor") for i, j in zip(a, b, strict=False)]
-
-            supported_types = {
-                T_PLUS_ENUM_VAL: operator.add,
-                T_MINUS_ENUM_VAL: list_sub,
-                T_ASTERISK_ENUM_VAL: list_mul,
-                T_SLASH_ENUM_VAL: list_div,
-                T_DSLASH_ENUM_VAL: list_floor_div,
-                T_LT_ENUM_VAL: operator.lt,
-                T_LEQ_ENUM_VAL: operator.le,
-                T_GT_ENUM_VAL: operator.gt,
-                T_GTEQ_ENUM_VAL: operator.ge,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-                T_IN_ENUM_VAL: lambda a, b: a in b,
-            }
-
-            if op not in supported_types:
+                return holder.values, site.links[-1][1]
+            holder = value
+            value = value.values[index]
+        site.hits += 1
+        return holder.values, index
+
+    def resolve_field_site(self, site, base, meta_data):
+        # follows the chain checking every field, remembers the layout each one was
+        # found in, and returns the instance holding the last one
+        site.misses += 1
+        links = []
+        for name in site.chain:
+            # a table has the fields of its dataclass too, its columns (see table)
+            if type(base) is not RUN_TIME_INSTANCE and type(base) is not TABLE:
                 raise EvaluatorError(
                     self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
+                    "field access is only performable on instances of classes",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
                 )
-
-            return supported_types[op](left, right)
-
-        # -------------------------------------------
-        # LIST OPERATIONS END
-        # -------------------------------------------
-
-        def eval_set_bin_op(left, op, right):
-            def set_add(a, b):
-                return a | b
-
-            supported_types = {
-                T_PLUS_ENUM_VAL: set_add,
-                T_MINUS_ENUM_VAL: operator.sub,
-                T_LT_ENUM_VAL: operator.lt,
-                T_LEQ_ENUM_VAL: operator.le,
-                T_GT_ENUM_VAL: operator.gt,
-                T_GTEQ_ENUM_VAL: operator.ge,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-            }
-
-            if op not in supported_types:
+            offset = base.offsets.get(name)
+            if offset is None:
                 raise EvaluatorError(
                     self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
+                    "field name wasn't included in the definition of "
+                    "the instance's corresponding class",
+                    meta_data.line,
+                    meta_data.column_start,
+                    meta_data.column_end,
+                )
+            links.append((base.offsets, offset))
+            holder = base
+            base = base.values[offset]
+        site.links = links
+        return holder
+
+    # every call in the program has an inline cache (see call_site), so working out
+    # what calling a builtin or a dataclass means is only done the first time a call
+    # sees it, and calling it again is an identity check
+
+    def call_site(self, root):
+        site = self.call_sites.get(id(root))
+        if site is None:
+            site = self.call_sites[id(root)] = CALL_SITE()
+        return site
+
+    def eval_call_value(self, callee, func_name, arg_vals, root):
+        return self.call_cached(self.call_site(root), callee, func_name, arg_vals, root)
+
+    def call_cached(self, site, callee, func_name, arg_vals, root):
+        if type(callee) is self.RUN_TIME_FUNCTION:
+            site.hits += 1
+            return self.eval_call(callee, arg_vals, root.meta_data)
+        if callee is site.callee:
+            site.hits += 1
+            return site.target(arg_vals, root.meta_data)
+        for cached, target in site.entries:
+            if cached is callee:
+                site.hits += 1
+                return target(arg_vals, root.meta_data)
+
+        site.misses += 1
+        target = self.call_target(callee, func_name, root)
+        if site.callee is None:
+            site.callee, site.target = callee, target
+        elif len(site.entries) < CALL_SITE_ENTRIES:
+            site.entries.append((callee, target))
+        return target(arg_vals, root.meta_data)
+
+    def call_target(self, callee, func_name, root):
+        """Return what calling callee at root means, as a function of the argument
+        values and the call's meta data."""
+        # calling dataclass
+        if type(callee) is self.RUN_TIME_DATACLASS:
+            offsets = callee.offsets
+            field_count = len(offsets)
+            of = root.name.value
+            RUN_TIME_INSTANCE = self.RUN_TIME_INSTANCE
+
+            def construct(arg_vals, meta_data):
+                # every call makes a list of argument values of its own, which
+                # becomes the values of the instance
+                if len(arg_vals) == field_count:
+                    return RUN_TIME_INSTANCE(of, offsets, arg_vals)
+                if len(arg_vals) > field_count:
+                    return RUN_TIME_INSTANCE(of, offsets, arg_vals[:field_count])
+                # fields without an argument start out as 0
+                return RUN_TIME_INSTANCE(
+                    of, offsets, arg_vals + [0] * (field_count - len(arg_vals))
                 )
 
-            return supported_types[op](left, right)
-
-        def eval_dict_bin_op(left, op, right):
-            def dict_add(a, b):
-                return a | b
+            return construct
 
-            def dict_sub(a, b):
-                return {k: v for k, v in a.items() if k not in b}
+        if type(callee) is MEMOIZED_FUNCTION:
 
-            supported_types = {
-                T_PLUS_ENUM_VAL: dict_add,
-                T_MINUS_ENUM_VAL: dict_sub,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-            }
+            def call_memoized(arg_vals, meta_data):
+                return self.call_memoized(callee, arg_vals, meta_data)
 
-            if op not in supported_types:
-                raise EvaluatorError(
-                    self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
+            return call_memoized
 
-            return supported_types[op](left, right)
+        if not callable(callee):
+            raise EvaluatorError(
+                self.file,
+                f"attempt to call non-function (type {type(callee)})",
+                root.meta_data.line,
+                root.meta_data.column_start,
+                root.meta_data.column_end,
+            )
 
-        def eval_different_bin_op(left, op, right):
-            def eval_different_in(a, b):
-                try:
-                    return a in b
-                except TypeError:
-                    raise EvaluatorError(
-                        self.file,
-                        f"in binary operation not supported between {type(a)} and {type(b)}",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    ) from None
+        # a builtin is called by its name first
+        if func_name in self.built_in_functions:
+            return self.built_in_functions[func_name]
 
-            supported_types = {
-                (list, int, T_ASTERISK_ENUM_VAL): lambda a, b: [
-                    deepcopy(i) for i in a for _ in range(b)
-                ],
-                (int, list, T_ASTERISK_ENUM_VAL): lambda a, b: [
-                    deepcopy(i) for i in b for _ in range(a)
-                ],
-                (str, int, T_ASTERISK_ENUM_VAL): operator.mul,
-                (int, str, T_ASTERISK_ENUM_VAL): operator.mul,
-                T_EQ_ENUM_VAL: operator.eq,
-                T_NEQ_ENUM_VAL: operator.ne,
-                T_AND_ENUM_VAL: lambda a, b: a and b,
-                T_OR_ENUM_VAL: lambda a, b: a or b,
-                T_IN_ENUM_VAL: eval_different_in,
-            }
+        # this is required because, for ex., callee the case of bar{}{1,2},
+        # where bar returns a function signature, is a raw function object
+        if callee in self.built_in_function_objects:
+            return callee
 
-            if op not in supported_types and (type(left), type(right), op) not in supported_types:
-                raise EvaluatorError(
-                    self.file,
-                    f"operation '{op}' not supported between {type(left)} and {type(right)}",
-                    root.meta_data.line,
-                    root.meta_data.column_start,
-                    root.meta_data.column_end,
-                )
+        raise EvaluatorError(
+            self.file,
+            f"'{root.name}' is not callable",
+            root.meta_data.line,
+            root.meta_data.column_start,
+            root.meta_data.column_end,
+        )
 
-            return (
-                supported_types[op](left, right)
-                if op in supported_types
-                else supported_types[(type(left), type(right), op)](left, right)
-            )
+    def memoized(self, function):
+        # the semantic pass found the function pure and calling itself more than
+        # once, so its calls are cached as if it had been memo{}'d
+        return MEMOIZED_FUNCTION(function=function, max_size=MEMO_DEFAULT_SIZE, automatic=True)
+
+    def call_memoized(self, memo, args, meta_data):
+        key = memo_key(args)
+        if key is None:
+            memo.uncached += 1
+            return self.eval_call(memo.function, args, meta_data)
+
+        cache = memo.cache
+        if key in cache:
+            memo.hits += 1
+            cache.move_to_end(key)
+            return copied_value(cache[key])
+
+        result = self.eval_call(memo.function, args, meta_data)
+        if memo.automatic and type(result) not in PLAIN_TYPES:
+            memo.uncached += 1
+            return result
+        memo.misses += 1
+        cache[key] = copied_value(result)
+        if len(cache) > memo.max_size:
+            cache.popitem(last=False)
+            memo.evictions += 1
+        return result
+
+    def field_site_stats(self):
+        """Hit and miss counts of the inline caches of every field access and field
+        assignment run so far."""
+        sites = [site for site in self.field_sites.values() if site.hits or site.misses]
+        return {
+            "sites": len(sites),
+            "hits": sum(site.hits for site in sites),
+            "misses": sum(site.misses for site in sites),
+            # sites that have seen instances of more than one layout
+            "polymorphic": sum(site.misses > 1 for site in sites),
+        }
 
-        type_dispatch = {
-            int: eval_int_bin_op,
-            float: eval_int_bin_op,
-            bool: eval_int_bin_op,
-            str: eval_str_bin_op,
-            list: eval_list_bin_op,
-            set: eval_set_bin_op,
-            dict: eval_dict_bin_op,
+    def call_site_stats(self):
+        """Hit and miss counts of the inline caches of every call made so far."""
+        sites = [site for site in self.call_sites.values() if site.hits or site.misses]
+        return {
+            "sites": len(sites),
+            "hits": sum(site.hits for site in sites),
+            "misses": sum(site.misses for site in sites),
+            # calls that have seen more than one builtin or dataclass
+            "polymorphic": sum(bool(site.entries) for site in sites),
         }
-        same_type = (int, float, bool)
-        dispatcher = eval_different_bin_op
-        if type_left is type_right or (type_left in same_type and type_right in same_type):
-            dispatcher = type_dispatch[type_left]
-        return dispatcher(left, op, right)
+
+    # -------------------------------------------
+    # BINARY OPERATIONS START
+    # -------------------------------------------
+
+    def eval_bin_ops(self, root):
+        left = self.eval_expression(root.left)
+        op = root.op
+        # && and || only evaluate their right operand when the left one doesn't decide
+        # the result, which is the operand that decided it (like a and b in python)
+        if op == T_AND_ENUM_VAL:
+            return self.eval_expression(root.right) if left else left
+        if op == T_OR_ENUM_VAL:
+            return left if left else self.eval_expression(root.right)
+        return self.eval_bin_op_values(left, self.eval_expression(root.right), root)
+
+    def eval_bin_op_values(self, left, right, root):
+        # the handler of every combination of the builtin types and operator is
+        # worked out once, at import (see binary_operations.py)
+        key = (type(left), type(right), root.op)
+        handler = BIN_OP_TABLE.get(key)
+        if handler is None:
+            handler = self.bin_op_handler(key)
+        try:
+            return handler(left, right)
+        except BinOpError as e:
+            raise self.bin_op_error(e, root) from None
+
+    def bin_op_handler(self, key):
+        # functions, dataclasses and instances are types of the program being run,
+        # so their handlers are kept by its engine, never in the shared table
+        handler = self.bin_op_handlers.get(key)
+        if handler is None:
+            handler = self.bin_op_handlers[key] = resolve_bin_op(*key)
+        return handler
+
+    def bin_op_error(self, error, root):
+        return EvaluatorError(
+            self.file,
+            error.msg,
+            root.meta_data.line,
+            root.meta_data.column_start,
+            root.meta_data.column_end,
+        )
 
     # -------------------------------------------
     # BINARY OPERATIONS END
@@ -1424,59 +1824,56 @@ class Evaluator:
     # -------------------------------------------
 
     def eval_unary_ops(self, root):
+        return self.eval_unary_op_value(self.eval_expression(root.operand), root)
+
+    def eval_unary_op_value(self, operand, root):
         # since each unary operation is pretty clear on what it does
         # we will dispatch based on unary operator not type
-
-        def eval_negate(operand):
-            return not operand
-
-        def eval_uminus(operand):
-            if type(operand) in (int, float):
-                return -operand
-            raise EvaluatorError(
-                self.file,
-                f"unary negation not supported on type {type(operand)}",
-                root.meta_data.line,
-                root.meta_data.column_start,
-                root.meta_data.column_end,
-            )
-
-        def eval_uplus(operand):
-            if type(operand) in (int, float):
-                return +operand
-            raise EvaluatorError(
-                self.file,
-                f"unary plus not supported on type {type(operand)}",
-                root.meta_data.line,
-                root.meta_data.column_start,
-                root.meta_data.column_end,
-            )
-
-        operator_dispatch = {
-            T_NEGATE_ENUM_VAL: eval_negate,
-            T_UMINUS_ENUM_VAL: eval_uminus,
-            T_UPLUS_ENUM_VAL: eval_uplus,
-        }
-        op_id = root.op
-        operand = self.eval_expression(root.operand)
-
-        return operator_dispatch[op_id](operand)
+        try:
+            return UNARY_OP_TABLE[root.op](operand)
+        except BinOpError as e:
+            raise self.bin_op_error(e, root) from None
 
     # -------------------------------------------
     # UNARY OPERATIONS END
     # -------------------------------------------
 
+    def enter_call(self, callee, args):
+        # the frames the function closes over are shared with the call, not copied.
+        # the resolver gave every enclosing variable the body writes to a slot in the
+        # call's own frame, so those writes still never leave the call. the caller
+        # saves (frames, shared_depth, shared_snapshot) and restores them after
+        layout = self.resolution.frames[id(callee.body)]
+        closure = callee.closure
+        frame = layout.template[:]
+        for slot, depth, outer_slot in layout.captures:
+            frame[slot] = closure[depth][outer_slot]
+
+        self.frames = closure + [frame]
+        self.shared_depth = len(closure)
+        self.shared_snapshot = None
+        self.store_var(layout.params, args)
+
     def eval_call(self, callee, args, meta_data):
-        saved_stack = self.scope_stack
-        self.scope_stack = [i.copy() for i in callee.closure] + [{}]
+        saved = self.frames, self.shared_depth, self.shared_snapshot
+        # the loops around the call aren't the body's loops, a break or continue
+        # outside of the body's own loops is an error like in the other engines
+        saved_loop_depth = self.loop_depth
+        self.loop_depth = 0
         self.func_depth += 1
         try:
-            self.initalize_var(callee.params_name, args)
-            try:
-                self.eval_block(callee.body)
-            except _ReturnSignal as sig:
-                return sig.value
+            while True:
+                self.enter_call(callee, args)
+                completion = self.eval_block(callee.body)
+                if type(completion) is _TailCall:
+                    # nothing of this call is needed anymore, the called
+                    # function simply runs in its place
+                    callee, args = completion.callee, completion.args
+                    continue
+                if completion is not None:
+                    return completion.value
+                return 0
         finally:
-            self.scope_stack = saved_stack
+            self.frames, self.shared_depth, self.shared_snapshot = saved
+            self.loop_depth = saved_loop_depth
             self.func_depth -= 1
-        return 0
@@ -1,4 +1,9 @@
-from dataclasses import dataclass
+import operator
+from array import array
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Any
 
 from bang.parsing.parser_nodes import BlockNode
 
@@ -8,6 +13,8 @@ class runtime_function:
     body: BlockNode
     params_name: str
     closure: list
+    # the EffectSummary of the function's declaration
+    effects: Any = None
 
     def __repr__(self) -> str:
         return f"<fn {id(self)}>"
@@ -16,6 +23,12 @@ class runtime_function:
 @dataclass(slots=True)
 class runtime_dataclass:
     fields: list[str]
+    # field_name -> index of the field's value in the values of an instance, one
+    # dict every instance of the dataclass shares
+    offsets: dict = field(init=False)
+
+    def __post_init__(self):
+        self.offsets = {name: index for index, name in enumerate(self.fields)}
 
     def __repr__(self) -> str:
         return f"<data {id(self)}>"
@@ -24,12 +37,397 @@ class runtime_dataclass:
 @dataclass(slots=True)
 class runtime_instance:
     of: str
-    fields: dict  # field_name -> value
+    offsets: dict  # the offsets of its dataclass
+    values: list  # the values of its fields, in the order of the dataclass's fields
+
+    def __deepcopy__(self, memo):
+        # a copy has the layout of its dataclass too
+        copy = memo[id(self)] = runtime_instance(self.of, self.offsets, [])
+        copy.values.extend([deepcopy(value, memo) for value in self.values])
+        return copy
 
     def __repr__(self) -> str:
         return f"<instance {id(self)}>"
 
 
+# the typecodes of the array.array a packed array keeps its numbers in, 8 bytes each
+PACKED_TYPECODES = {int: "q", float: "d"}
+# arrays shorter than this aren't worth packing, what they save is less than what
+# handing out their elements costs
+PACKED_MIN_LENGTH = 64
+
+
+# the value every slot of a frame holds until its variable is first assigned
+class _Unset:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<unset>"
+
+
+UNSET = _Unset()
+
+
+@dataclass(slots=True)
+class resolved_name:
+    name: str
+    # (depth, slot) of the frame slot holding the variable, depth being the
+    # index of the frame on the frame stack. names the resolver can't place
+    # statically list every slot they could live in, nearest first
+    coordinates: tuple
+
+
+@dataclass(slots=True)
+class frame_layout:
+    names: list[str]  # slot -> variable name
+    template: list  # copied to create a fresh frame
+    params: resolved_name | None = None  # the arguments array of a function body
+    # (slot, depth, outer slot) of the enclosing variables a function body writes to,
+    # copied into the call's own frame when the call starts
+    captures: list = field(default_factory=list)
+
+
+# how many different callees one call site remembers besides its first, a site seeing
+# more than that (a call through a variable holding many different callees) keeps
+# working out every call of the ones it doesn't remember
+CALL_SITE_ENTRIES = 3
+
+
+@dataclass(slots=True)
+class call_site:
+    # the inline cache of one call in the program. the first builtin or dataclass it
+    # calls is remembered together with what calling it means (a function of the
+    # argument values and the call's meta data), so calling it again is one identity
+    # check, and the next few go in entries as (callee, target) pairs. bang functions
+    # need no entry, their type alone says how to call them
+    name: resolved_name | None = None  # the callee's variable, when called by name
+    callee: Any = None
+    target: Any = None
+    entries: list = field(default_factory=list)
+    hits: int = 0
+    misses: int = 0
+
+
+@dataclass(slots=True)
+class field_site:
+    # the inline cache of one field access (a.b.c) or field assignment in the program.
+    # for every name of chain it keeps the layout (the offsets of a runtime_dataclass)
+    # of the instance the name was last read from and the name's index in it, so
+    # following the chain through instances of the same dataclasses again is an
+    # identity check and an index per name. links start out matching no layout
+    chain: tuple
+    links: list = field(init=False)
+    hits: int = 0
+    misses: int = 0
+
+    def __post_init__(self):
+        self.links = [(None, 0)] * len(self.chain)
+
+
+# how many results memo{fn} remembers when it isn't given a size
+MEMO_DEFAULT_SIZE = 1024
+
+
+@dataclass(slots=True)
+class memoized_function:
+    # what memo{fn} returns. calling it calls function unless the same arguments were
+    # seen before, the results of the max_size most recently used argument lists
+    # are kept in cache (hashable form of the args -> result), oldest first.
+    # function calls itself by its name, so its recursive calls only go through the
+    # cache when that name is rebound to it (fib = memo{fib}). fast = memo{fib}
+    # caches the calls made to fast, not the ones fib makes
+    function: runtime_function
+    max_size: int
+    cache: OrderedDict = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # calls whose arguments hold an instance or a function, which are never cached
+    uncached: int = 0
+    # created by the engines for a function the semantic pass found pure (see
+    # effect_analysis.py), instead of by memo{fn}. only results that are plain
+    # values are cached, so an array a call returns is still the one it built
+    automatic: bool = False
+
+    def __repr__(self) -> str:
+        if self.automatic:
+            return repr(self.function)
+        return f"<memo {id(self)}>"
+
+
+@dataclass(slots=True)
+class lazy_range:
+    # what range{} returns. the numbers of span are only worked out as they are used,
+    # so range{0, 10000000} takes as little memory as range{3}. it goes everywhere an
+    # array goes (indexing, iterating, len{}, in, which is answered without looking at
+    # the numbers), and the first time one of its elements is assigned it becomes the
+    # array the numbers make (packed, see packed_array), kept in items, so every
+    # variable holding it sees the change. operations that build a new array (+, -, *)
+    # build a plain array
+    span: range
+    items: "list | packed_array | None" = None
+
+    def values(self):
+        return self.span if self.items is None else self.items
+
+    def materialize(self):
+        if self.items is None:
+            self.items = packed(self.span)
+        return self.items
+
+    def copy(self):
+        return lazy_range(self.span, None if self.items is None else self.items.copy())
+
+    def __len__(self) -> int:
+        return len(self.span if self.items is None else self.items)
+
+    def __iter__(self):
+        return iter(self.span if self.items is None else self.items)
+
+    def __getitem__(self, index):
+        return (self.span if self.items is None else self.items)[index]
+
+    def __setitem__(self, index, value):
+        self.materialize()[index] = value
+
+    def __contains__(self, value) -> bool:
+        if self.items is not None:
+            return value in self.items
+        # nothing but a number can equal one of the numbers
+        type_value = type(value)
+        if type_value is float:
+            return value.is_integer() and int(value) in self.span
+        return (type_value is int or type_value is bool) and value in self.span
+
+    def __eq__(self, other) -> bool:
+        type_other = type(other)
+        if type_other is lazy_range:
+            other = other.values()
+        elif type_other is not list:
+            return NotImplemented
+        values = self.values()
+        if type(values) is type(other):
+            return values == other
+        return len(values) == len(other) and all(map(operator.eq, values, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self.values()))
+
+
+@dataclass(slots=True)
+class numeric_array:
+    # what an element-wise operation numpy carried out returns (see VECTORIZED
+    # OPERATIONS in binary_operations.py): an array of only ints or only floats, kept
+    # as the numpy array the operation made, so the next element-wise operation on it
+    # has nothing to convert. its elements are handed out as python numbers, and like
+    # a lazy range, it becomes the array its numbers make, kept in items, the first
+    # time one of its elements is assigned. data itself is never changed
+    data: Any
+    items: list | None = None
+
+    def values(self) -> list:
+        return self.data.tolist() if self.items is None else self.items
+
+    def materialize(self) -> list:
+        if self.items is None:
+            self.items = self.data.tolist()
+        return self.items
+
+    def copy(self):
+        return numeric_array(self.data, None if self.items is None else self.items[:])
+
+    def __len__(self) -> int:
+        return len(self.data if self.items is None else self.items)
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __getitem__(self, index):
+        if self.items is None and type(index) is int:
+            return self.data[index].item()
+        return self.values()[index]
+
+    def __setitem__(self, index, value):
+        self.materialize()[index] = value
+
+    def __contains__(self, value) -> bool:
+        return value in self.values()
+
+    def __eq__(self, other) -> bool:
+        type_other = type(other)
+        if type_other is numeric_array or type_other is lazy_range:
+            other = list(other.values())
+        elif type_other is not list:
+            return NotImplemented
+        return self.values() == other
+
+    def __repr__(self) -> str:
+        return repr(self.values())
+
+
+@dataclass(slots=True)
+class packed_array:
+    # an array of only ints or only floats, kept in an array.array: 8 bytes a number
+    # instead of a pointer to a python number of its own, a quarter of the memory of
+    # a list of different numbers. [0] * n, [0.0] * n and a range{} one of whose
+    # elements is assigned are packed (see packed below), and stay packed while
+    # their elements are assigned numbers of the same type. assigning anything else
+    # turns it into the array of python values its numbers make, kept in items, so
+    # every variable holding it sees the change
+    data: array
+    items: list | None = None
+
+    def values(self):
+        return self.data if self.items is None else self.items
+
+    def copy(self):
+        if self.items is None:
+            return packed_array(self.data[:])
+        return packed_array(self.data, self.items[:])
+
+    def __len__(self) -> int:
+        return len(self.data if self.items is None else self.items)
+
+    def __iter__(self):
+        return iter(self.data if self.items is None else self.items)
+
+    def __getitem__(self, index):
+        return (self.data if self.items is None else self.items)[index]
+
+    def __setitem__(self, index, value):
+        if self.items is None:
+            if PACKED_TYPECODES.get(type(value)) == self.data.typecode:
+                try:
+                    self.data[index] = value
+                    return
+                except OverflowError:
+                    # an int too big for 64 bits
+                    pass
+            self.items = self.data.tolist()
+        self.items[index] = value
+
+    def __contains__(self, value) -> bool:
+        return value in (self.data if self.items is None else self.items)
+
+    def __eq__(self, other) -> bool:
+        type_other = type(other)
+        if type_other is packed_array or type_other is lazy_range or type_other is numeric_array:
+            other = other.values()
+        elif type_other is not list:
+            return NotImplemented
+        values = self.values()
+        if type(values) is type(other):
+            return values == other
+        return len(values) == len(other) and all(map(operator.eq, values, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self.values()))
+
+
+def packed(values):
+    """values as a packed array when they are at least PACKED_MIN_LENGTH ints (that
+    fit in 64 bits) or floats, otherwise as a list."""
+    if len(values) >= PACKED_MIN_LENGTH:
+        if type(values) is range:
+            typecode = "q"
+        else:
+            types = set(map(type, values))
+            typecode = PACKED_TYPECODES.get(types.pop()) if len(types) == 1 else None
+        if typecode is not None:
+            try:
+                return packed_array(array(typecode, values))
+            except OverflowError:
+                pass
+    return list(values)
+
+
+@dataclass(slots=True, eq=False)
+class table_row:
+    # the values of a row view of a table (a runtime_instance of the table's layout
+    # whose values are these), so reading or assigning a field of the row reads or
+    # assigns the row's element of the field's column
+    columns: list
+    row: int
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __iter__(self):
+        row = self.row
+        return (column[row] for column in self.columns)
+
+    def __getitem__(self, index):
+        return self.columns[index][self.row]
+
+    def __setitem__(self, index, value):
+        self.columns[index][self.row] = value
+
+    def __eq__(self, other) -> bool:
+        if type(other) is table_row or type(other) is list:
+            return list(self) == list(other)
+        return NotImplemented
+
+
+@dataclass(slots=True)
+class table:
+    # what table{P, n} returns: n rows of the fields of dataclass P kept column by
+    # column, a field's values of every row next to each other in one array (packed
+    # while they are numbers of one type, see packed_array), instead of an instance
+    # per row. t[i] is a row view, an instance of P reading and assigning the row's
+    # elements of the columns, and like the fields of an instance, t.x is the column
+    # of field x itself, which sum{}, sort{}, min{} and max{} go through in one go
+    offsets: dict  # the offsets of its dataclass
+    values: list  # one column per field, in the order of the dataclass's fields
+    length: int
+
+    def taken(self, rows) -> "table":
+        """The table of the given rows of this one, in that order."""
+        columns = []
+        for column in self.values:
+            if type(column) is packed_array and column.items is None:
+                data = column.data
+                columns.append(packed_array(array(data.typecode, map(data.__getitem__, rows))))
+            else:
+                columns.append(list(map(column.__getitem__, rows)))
+        return table(self.offsets, columns, len(rows))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self.length))
+
+    def __getitem__(self, index):
+        if type(index) is not int:
+            raise TypeError("table index must be an int")
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("table index out of range")
+        # a row has no dataclass name of its own
+        return runtime_instance(None, self.offsets, table_row(self.values, index))
+
+    def __setitem__(self, index, value):
+        # assigning a row copies the fields of an instance of the table's layout into it
+        if type(value) is not runtime_instance or value.offsets is not self.offsets:
+            raise TypeError("a table row can only be assigned an instance of its dataclass")
+        row = self[index].values.row
+        for column, field_value in zip(self.values, list(value.values), strict=True):
+            column[row] = field_value
+
+    def __repr__(self) -> str:
+        return f"<table {id(self)}>"
+
+
 RUN_TIME_INSTANCE = runtime_instance
 RUN_TIME_DATACLASS = runtime_dataclass
 RUN_TIME_FUNCTION = runtime_function
+RESOLVED_NAME = resolved_name
+FRAME_LAYOUT = frame_layout
+CALL_SITE = call_site
+FIELD_SITE = field_site
+MEMOIZED_FUNCTION = memoized_function
+LAZY_RANGE = lazy_range
+NUMERIC_ARRAY = numeric_array
+PACKED_ARRAY = packed_array
+TABLE = table
@@ -0,0 +1,437 @@
+# a static pass run right before evaluation that gives every variable a fixed
+# place to live. the evaluator keeps one frame per scope, just like the semantic
+# pass keeps one dict per scope, so instead of searching the frames for a name on
+# every read and write, each name is resolved here to a (depth, slot) coordinate:
+# the index of its frame on the frame stack, and its index inside of that frame.
+# frames become plain lists and every variable access becomes two list indexes.
+#
+# a write goes to the closest scope that already declared the name, otherwise it
+# declares the name in the innermost scope. the scopes mirror the frames the evaluator
+# creates (which, unlike the semantic pass, includes one per while loop). that is
+# the order the names appear in the source, the frames are filled in the order the
+# program runs: once a loop runs a block again, a name the block declares may already
+# be set in a frame enclosing it, by a declaration further down. every read and write
+# of such a name lists the slots of those frames too, and goes to the innermost one
+# that is set (see Evaluator.store_var), exactly like a write to a frame at runtime.
+#
+# a function only closes over the enclosing frames that declare a name it (or a
+# function nested in it) refers to, the other frames aren't kept alive by it.
+#
+# an if/elif/else body or loop body that declares nothing would only ever get an
+# empty frame, so it gets no scope at all and runs in the frame enclosing it. every
+# engine skips the frame (or dict scope) of those blocks
+
+from bang.parsing.parser_nodes import (
+    ARRAY_LITERAL_NODE_CLASS,
+    ASSIGNMENT_NODE_CLASS,
+    BIN_OP_NODE_CLASS,
+    BLOCK_NODE_CLASS,
+    BREAK_NODE_CLASS,
+    CALL_NODE_CLASS,
+    CONTINUE_NODE_CLASS,
+    DATA_CLASS_NODE_CLASS,
+    EXPRESSION_NODE_CLASS,
+    FIELD_ACCESS_NODE_CLASS,
+    FOR_NODE_CLASS,
+    FUNCTION_NODE_CLASS,
+    IDENTIFIER_NODE_CLASS,
+    IF_NODE_CLASS,
+    INDEX_NODE_CLASS,
+    RETURN_NODE_CLASS,
+    UNARY_OP_NODE_CLASS,
+    WHILE_NODE_CLASS,
+)
+from bang.runtime.evaluator_nodes import CALL_SITE, FRAME_LAYOUT, RESOLVED_NAME, UNSET
+
+
+class _Scope:
+    __slots__ = ("names", "depth", "enclosing", "function_depth", "outer_loops", "loops")
+
+    def __init__(self, depth, enclosing, function_depth, outer_loops, loops):
+        self.names = {}  # name -> slot
+        self.depth = depth
+        self.enclosing = enclosing
+        # the depth of the body of the function the scope is in, 0 outside of any
+        self.function_depth = function_depth
+        # the loops of that function running around the scope, and around its
+        # statements (its own loop included when it is a loop body)
+        self.outer_loops = outer_loops
+        self.loops = loops
+
+
+class Resolution:
+    def __init__(self):
+        # id(IdentifierNode) -> resolved_name, for every identifier the evaluator reads
+        # or assigns (call names and for loop variables included)
+        self.names = {}
+        # id(FunctionNode / DataClassNode) -> resolved_name of the name they declare
+        self.declarations = {}
+        # id(BlockNode) -> frame_layout of every block that runs in a frame of its own,
+        # None for the if/elif/else and loop bodies that run in the enclosing frame
+        self.frames = {}
+        # id(FunctionNode) -> depths of the enclosing frames the function closes over
+        self.closures = {}
+        # id(CallNode) -> call_site, the inline cache of every call
+        self.calls = {}
+        self.global_frame = None
+
+
+class Resolver:
+    def __init__(self, roots, built_in_functions):
+        self.roots = roots
+        self.built_in_functions = built_in_functions
+        self.resolution = Resolution()
+        self.scopes = []
+        # (resolved_name, scope chain) of the names that couldn't be placed while
+        # walking, they are finished once every scope knows all of its names
+        self.unresolved = []
+        # (layout, scope) pairs whose templates are built at the end
+        self.layouts = []
+        # the names referred to inside of every function being resolved, innermost last
+        self.references = []
+        # (function, enclosing scopes, names it refers to), its closure is worked out
+        # at the end, a global it calls may only be declared after it
+        self.functions = []
+        # (resolved_name, scope) of the names placed in a scope while walking, which
+        # may still get the slots of enclosing scopes declaring them later on
+        self.placed = []
+        self.function_depth = 0
+        # the loops running in the function being resolved
+        self.loops = 0
+
+        self.construct_to_resolve = {
+            ASSIGNMENT_NODE_CLASS: self.resolve_assignment,
+            IF_NODE_CLASS: self.resolve_if,
+            FOR_NODE_CLASS: self.resolve_for,
+            WHILE_NODE_CLASS: self.resolve_while,
+            BLOCK_NODE_CLASS: self.resolve_block,
+            BREAK_NODE_CLASS: self.resolve_nothing,
+            CONTINUE_NODE_CLASS: self.resolve_nothing,
+            RETURN_NODE_CLASS: self.resolve_return,
+            EXPRESSION_NODE_CLASS: self.resolve_expression,
+            FUNCTION_NODE_CLASS: self.resolve_function,
+            CALL_NODE_CLASS: self.resolve_expression,
+            DATA_CLASS_NODE_CLASS: self.resolve_dataclass,
+        }
+
+    def resolve(self):
+        global_scope = self.push_scope()
+        for name in self.built_in_functions:
+            self.declare(name)
+        global_frame = self.new_layout(global_scope)
+        for construct in self.roots:
+            self.resolve_construct(construct)
+        self.scopes.pop()
+
+        self.finish()
+        for slot, name in enumerate(global_frame.names):
+            if name in self.built_in_functions:
+                global_frame.template[slot] = self.built_in_functions[name]
+        self.resolution.global_frame = global_frame
+        return self.resolution
+
+    def finish(self):
+        for layout, scope in self.layouts:
+            layout.names.extend(scope.names)
+            layout.template.extend([UNSET] * len(scope.names))
+
+        for root, enclosing, names in self.functions:
+            self.resolution.closures[id(root)] = tuple(
+                scope.depth for scope in enclosing if not names.isdisjoint(scope.names)
+            )
+
+        # a scope of the same function declaring the name further down only holds it
+        # by the time the scope runs again when a loop around both does that
+        for resolved, scope in self.placed:
+            name = resolved.name
+            resolved.coordinates += tuple(
+                (outer.depth, outer.names[name])
+                for outer in reversed(scope.enclosing)
+                if outer.depth >= scope.function_depth
+                and outer.outer_loops < scope.loops
+                and name in outer.names
+            )
+
+        # a name that was never declared where it is read can still exist at runtime
+        # (a for loop bound names a variable created later on in an enclosing loop,
+        # or a name created inside of a while loop is read after it), so it is looked
+        # for in every enclosing frame that may hold it, and is an error if none do
+        for resolved, chain in self.unresolved:
+            resolved.coordinates = tuple(
+                (scope.depth, scope.names[resolved.name])
+                for scope in reversed(chain)
+                if resolved.name in scope.names
+            )
+
+    # -------------------------------------------
+    # SCOPES START
+    # -------------------------------------------
+
+    def push_scope(self, loop=False):
+        scope = _Scope(
+            len(self.scopes),
+            tuple(self.scopes),
+            self.function_depth,
+            self.loops,
+            self.loops + loop,
+        )
+        self.scopes.append(scope)
+        return scope
+
+    def new_layout(self, scope):
+        layout = FRAME_LAYOUT(names=[], template=[])
+        self.layouts.append((layout, scope))
+        return layout
+
+    def scoped_block(self, root, loop=False):
+        # every block the evaluator runs in a fresh frame
+        scope = self.push_scope(loop)
+        self.resolution.frames[id(root)] = layout = self.new_layout(scope)
+        return layout
+
+    def optional_block(self, root, variable=None, loop=False):
+        # an if/elif/else or loop body only gets a frame when it declares a name of
+        # its own, variable being the name a for loop assigns every iteration
+        for name in self.block_writes(root, variable):
+            if self.visible(name) is None:
+                return self.scoped_block(root, loop)
+        self.resolution.frames[id(root)] = None
+        return None
+
+    def placed_name(self, name, scope):
+        resolved = RESOLVED_NAME(name=name, coordinates=((scope.depth, scope.names[name]),))
+        self.placed.append((resolved, scope))
+        return resolved
+
+    def declare(self, name):
+        scope = self.scopes[-1]
+        scope.names[name] = len(scope.names)
+        return self.placed_name(name, scope)
+
+    def lookup(self, name):
+        if self.references:
+            self.references[-1].add(name)
+        for scope in reversed(self.scopes):
+            if name in scope.names:
+                return self.placed_name(name, scope)
+        resolved = RESOLVED_NAME(name=name, coordinates=())
+        self.unresolved.append((resolved, tuple(self.scopes)))
+        return resolved
+
+    def visible(self, name):
+        for scope in reversed(self.scopes):
+            slot = scope.names.get(name)
+            if slot is not None:
+                return scope.depth, slot
+        return None
+
+    def activation_writes(self, root):
+        # every name a call of the function may write to, nested functions aside
+        # (their writes stay inside of their own calls)
+        names = {root.arg_list_name: None}
+        pending = list(root.body.block)
+        while pending:
+            construct = pending.pop()
+            type_construct = type(construct)
+            if type_construct is ASSIGNMENT_NODE_CLASS:
+                targets = [construct.left_hand]
+                while targets:
+                    target = targets.pop()
+                    if type(target) is IDENTIFIER_NODE_CLASS:
+                        names[target.value] = None
+                    elif type(target) is ARRAY_LITERAL_NODE_CLASS:
+                        targets.extend(element.root_expr for element in target.elements)
+            elif type_construct is FUNCTION_NODE_CLASS or type_construct is DATA_CLASS_NODE_CLASS:
+                names[construct.name] = None
+            elif type_construct is FOR_NODE_CLASS:
+                names[construct.variable.value] = None
+                pending.extend(construct.body.block)
+            elif type_construct is WHILE_NODE_CLASS:
+                pending.extend(construct.body.block)
+            elif type_construct is IF_NODE_CLASS:
+                pending.extend(construct.body.block)
+                for branch in construct.elif_branch.block + construct.else_branch.block:
+                    pending.extend(branch.body.block)
+        return names
+
+    def block_writes(self, root, variable):
+        # every name the block itself writes to. the names of the blocks nested in it
+        # go to frames of their own, and while it runs nothing but the block itself
+        # can declare a name that is visible from it
+        names = [] if variable is None else [variable]
+        for construct in root.block:
+            type_construct = type(construct)
+            if type_construct is ASSIGNMENT_NODE_CLASS:
+                targets = [construct.left_hand]
+                while targets:
+                    target = targets.pop()
+                    if type(target) is IDENTIFIER_NODE_CLASS:
+                        names.append(target.value)
+                    elif type(target) is ARRAY_LITERAL_NODE_CLASS:
+                        targets.extend(element.root_expr for element in target.elements)
+            elif type_construct is FUNCTION_NODE_CLASS or type_construct is DATA_CLASS_NODE_CLASS:
+                names.append(construct.name)
+        return names
+
+    def write(self, name):
+        if self.references:
+            self.references[-1].add(name)
+        for scope in reversed(self.scopes):
+            if name in scope.names:
+                return self.placed_name(name, scope)
+        return self.declare(name)
+
+    # -------------------------------------------
+    # SCOPES END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # STATEMENTS START
+    # -------------------------------------------
+
+    def resolve_construct(self, root):
+        self.construct_to_resolve[type(root)](root)
+
+    def resolve_nothing(self, root):
+        pass
+
+    def resolve_block(self, root):
+        for construct in root.block:
+            self.resolve_construct(construct)
+
+    def resolve_scoped_block(self, root):
+        layout = self.optional_block(root)
+        self.resolve_block(root)
+        if layout is not None:
+            self.scopes.pop()
+
+    def resolve_if(self, root):
+        self.resolve_expression(root.condition)
+        self.resolve_scoped_block(root.body)
+        for elif_root in root.elif_branch.block:
+            self.resolve_expression(elif_root.condition)
+            self.resolve_scoped_block(elif_root.body)
+        for else_root in root.else_branch.block:
+            self.resolve_scoped_block(else_root.body)
+
+    def resolve_for(self, root):
+        # the loop frame is created before the bound is evaluated
+        layout = self.optional_block(root.body, root.variable.value, loop=True)
+        self.loops += 1
+        self.resolve_expression(root.bound)
+        self.resolution.names[id(root.variable)] = self.write(root.variable.value)
+        self.resolve_block(root.body)
+        self.loops -= 1
+        if layout is not None:
+            self.scopes.pop()
+
+    def resolve_while(self, root):
+        layout = self.optional_block(root.body, loop=True)
+        self.loops += 1
+        self.resolve_expression(root.condition)
+        self.resolve_block(root.body)
+        self.loops -= 1
+        if layout is not None:
+            self.scopes.pop()
+
+    def resolve_return(self, root):
+        self.resolve_expression(root.expression)
+
+    def resolve_function(self, root):
+        # the function is declared outside of its body's scope, so it can call itself
+        self.resolution.declarations[id(root)] = self.write(root.name)
+
+        # a call shares the frames it closes over instead of copying them, so a write
+        # to a variable of an enclosing scope has to stay inside of the call. every
+        # such variable gets a slot of its own in the call's frame (filled in from the
+        # enclosing one when the call starts), which every read and write in the body
+        # then resolves to
+        enclosing = tuple(self.scopes)
+        names = set()
+        self.references.append(names)
+        outer = []
+        for name in self.activation_writes(root):
+            coordinate = self.visible(name)
+            if coordinate is not None:
+                outer.append((name, coordinate))
+        saved = self.function_depth, self.loops
+        self.function_depth, self.loops = len(self.scopes), 0
+        layout = self.scoped_block(root.body)
+        for name, (depth, slot) in outer:
+            local = self.declare(name)
+            layout.captures.append((local.coordinates[0][1], depth, slot))
+        layout.params = self.write(root.arg_list_name)
+        self.resolve_block(root.body)
+        self.scopes.pop()
+        self.function_depth, self.loops = saved
+
+        self.references.pop()
+        if self.references:
+            # what a nested function refers to its enclosing one has to keep too
+            self.references[-1].update(names)
+        self.functions.append((root, enclosing, names))
+
+    def resolve_dataclass(self, root):
+        self.resolution.declarations[id(root)] = self.write(root.name)
+
+    def resolve_assignment(self, root):
+        # in the order the evaluator runs it: the right hand, then the target
+        self.resolve_expression(root.right_hand)
+        self.resolve_target(root.left_hand)
+
+    def resolve_target(self, left_hand):
+        type_left_hand = type(left_hand)
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            self.resolution.names[id(left_hand)] = self.write(left_hand.value)
+        elif type_left_hand is INDEX_NODE_CLASS:
+            self.resolve_expression(left_hand.base)
+            for index in left_hand.index:
+                self.resolve_expression(index)
+        elif type_left_hand is FIELD_ACCESS_NODE_CLASS:
+            self.resolve_expression(left_hand.base)
+        else:
+            for element in left_hand.elements:
+                self.resolve_target(element.root_expr)
+
+    # -------------------------------------------
+    # STATEMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EXPRESSIONS START
+    # -------------------------------------------
+
+    def resolve_expression(self, root):
+        type_root = type(root)
+        if type_root is EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+            type_root = type(root)
+
+        if type_root is IDENTIFIER_NODE_CLASS:
+            self.resolution.names[id(root)] = self.lookup(root.value)
+        elif type_root is BIN_OP_NODE_CLASS:
+            self.resolve_expression(root.left)
+            self.resolve_expression(root.right)
+        elif type_root is UNARY_OP_NODE_CLASS:
+            self.resolve_expression(root.operand)
+        elif type_root is ARRAY_LITERAL_NODE_CLASS:
+            for element in root.elements:
+                self.resolve_expression(element)
+        elif type_root is INDEX_NODE_CLASS:
+            for index in root.index:
+                self.resolve_expression(index)
+            self.resolve_expression(root.base)
+        elif type_root is CALL_NODE_CLASS:
+            self.resolve_expression(root.name)
+            site = CALL_SITE()
+            if type(root.name) is IDENTIFIER_NODE_CLASS:
+                site.name = self.resolution.names[id(root.name)]
+            self.resolution.calls[id(root)] = site
+            for arg in root.args:
+                self.resolve_expression(arg)
+        elif type_root is FIELD_ACCESS_NODE_CLASS:
+            self.resolve_expression(root.base)
+
+    # -------------------------------------------
+    # EXPRESSIONS END
+    # -------------------------------------------
@@ -0,0 +1,347 @@
+# bench_bang_engines.py
+# eval phase of every execution engine on the bang programs in workloads/. the programs
+# are grouped in cases, one per thing being measured, and every case prints a table of
+# its own. a program is a template: $size (and whatever else its case works out from
+# the size) is filled in before it runs, so the same program can be timed at several
+# sizes to see how its cost grows.
+#
+#   python -m bang.runtime.tests_evaluator.test_engines_speed_performance --cases calls
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import io
+import statistics as stats
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from string import Template
+
+WORKLOADS = Path(__file__).parent / "workloads"
+
+
+def call_site_counts(engine, text, roots) -> str:
+    counts = engine.call_site_stats() if hasattr(engine, "call_site_stats") else {}
+    return f"{counts.get('hits', '-')} hits, {counts.get('misses', '-')} misses"
+
+
+def field_site_counts(engine, text, roots) -> str:
+    counts = engine.field_site_stats() if hasattr(engine, "field_site_stats") else {}
+    return f"{counts.get('hits', '-')} hits, {counts.get('misses', '-')} misses"
+
+
+def frame_counts(engine, text, roots) -> str:
+    from bang.runtime.evaluator import Evaluator
+    from bang.runtime.resolver import Resolver
+
+    frames = Resolver(roots, Evaluator(text, roots).built_in_functions).resolve().frames
+    # the blocks that still get a frame out of every function, if/elif/else and loop body
+    return f"{sum(layout is not None for layout in frames.values())}/{len(frames)} frames"
+
+
+@dataclass
+class Case:
+    about: str
+    # the programs in workloads/<case>/, run in this order
+    programs: list[str]
+    # None for programs that don't take a size
+    sizes: list[int] | None = None
+    # what the per column divides the time by, None for no per column
+    unit: str | None = "iteration"
+    ops: Callable[[int], int] = lambda size: size
+    # the values filled into a program of a given size
+    params: Callable[[int], dict[str, object]] = lambda size: {"size": size}
+    # "peak" memory while running, or what is still "retained" once done
+    memory: str | None = None
+    counters: Callable | None = None
+    # programs only run when asked for with --programs
+    optional: list[str] = field(default_factory=list)
+
+
+ITERATIONS = 20000
+CALLS = 20000
+
+CASES = {
+    "engines": Case(
+        "the same checked tree run by every engine",
+        ["fib", "two_sum", "loops"],
+        unit=None,
+    ),
+    "resolver": Case(
+        "a fixed amount of variable reads and writes under 1..24 nested loops. with every name "
+        "resolved to a (depth, slot) the time per iteration stays flat as the depth grows",
+        ["nested_loops"],
+        sizes=[1, 2, 4, 8, 16, 24],
+        ops=lambda depth: ITERATIONS,
+        params=lambda depth: {
+            "open": "".join(f"for i{level} 1\n" for level in range(depth - 1)),
+            "close": "end\n" * (depth - 1),
+            "iterations": ITERATIONS,
+        },
+    ),
+    "calls": Case(
+        "the same calls with 0..5000 globals defined. calls share the frames they close over "
+        "instead of copying them, so the time per call stays flat as the globals grow",
+        ["many_globals"],
+        sizes=[0, 10, 100, 1000, 5000],
+        unit="call",
+        ops=lambda globals_count: CALLS // 7 * 7,
+        params=lambda globals_count: {
+            "globals": "".join(f"g{i} = {i}\n" for i in range(globals_count)),
+            "iterations": CALLS // 7,
+        },
+    ),
+    "control_flow": Case(
+        "break, continue and return ending nearly every block that runs early",
+        ["continue", "while_continue", "early_return"],
+        sizes=[50000],
+        params=lambda size: {"size": size, "calls": size // 5},
+    ),
+    "call_sites": Case(
+        "calls to builtins, dataclasses and bang functions, and one call site seeing two "
+        "builtins, with the hits and misses of the call site caches",
+        ["builtin", "dataclass", "function", "polymorphic"],
+        sizes=[50000],
+        unit="call",
+        counters=call_site_counts,
+    ),
+    "range": Case(
+        "range{} hands out a lazy range, so only assigning an element costs memory",
+        ["loop", "len", "in", "assign"],
+        sizes=[1000, 1000000],
+        memory="peak",
+    ),
+    "inplace": Case(
+        "building a value one element at a time with +=, which adds to it in place when "
+        "nothing else refers to it. shared keeps a second reference, so it takes quadratic time",
+        ["array", "set", "dict", "element", "field", "shared"],
+        sizes=[10000, 100000, 1000000],
+        unit="element",
+        optional=["shared"],
+    ),
+    "repeat": Case(
+        "array * n building arrays of about size numbers, without a deepcopy per element",
+        ["row", "grid", "cube", "records"],
+        sizes=[10000, 1000000],
+        unit="element",
+        params=lambda size: {
+            "size": size,
+            "side": round(size**0.5),
+            "edge": round(size ** (1 / 3)),
+            "records": size // 4,
+        },
+        memory="peak",
+    ),
+    "vectorized": Case(
+        "element-wise *, / and // between arrays, numpy kernels when numpy is installed",
+        ["multiply", "divide", "chain", "lists"],
+        sizes=[10000, 1000000],
+        unit="element",
+        memory="peak",
+    ),
+    "packed": Case(
+        "arrays of numbers packed 8 bytes a number, promoted turns one into a list",
+        ["ints", "floats", "range", "builtins", "promoted"],
+        sizes=[10000, 1000000],
+        unit="element",
+        memory="peak",
+    ),
+    "instances": Case(
+        "many dataclass instances, each a small list of field values",
+        ["list", "walk", "points", "update"],
+        sizes=[10000, 100000],
+        unit="instance",
+        memory="peak",
+    ),
+    "field_sites": Case(
+        "reading and assigning fields and chains of them, and a chain seeing two dataclasses, "
+        "with the hits and misses of the field site caches",
+        ["field", "chain", "assign", "add", "polymorphic"],
+        sizes=[50000],
+        unit="access",
+        counters=field_site_counts,
+    ),
+    "tables": Case(
+        "records kept as an array of instances and as a table of columns",
+        ["array", "table", "array_sum", "table_sum", "array_filter", "table_filter", "table_sort"],
+        sizes=[10000, 100000],
+        unit="record",
+        memory="peak",
+    ),
+    "short_circuit": Case(
+        "loops guarded by && and ||, whose right operand only runs when the left one doesn't "
+        "decide the result",
+        ["and_skipped", "or_skipped", "and_run", "bounds"],
+        sizes=[50000],
+    ),
+    "assignments": Case(
+        "loops made of one assignment, x += 1 and the other compound assignments among them",
+        ["add", "sub", "mul", "assign", "index", "field"],
+        sizes=[1000000],
+    ),
+    "multi_assignments": Case(
+        "swap heavy loops, [a, b] = [b, c] runs as a parallel assignment. nested destructures "
+        "into an array literal and takes the general path",
+        ["swap", "fib", "rotate", "compound", "nested"],
+        sizes=[300000],
+    ),
+    "scopes": Case(
+        "loops around ifs, a body only gets a frame of its own when it declares a variable. "
+        "declaring keeps one for its if body",
+        ["if", "if_else", "nested", "while", "declaring"],
+        sizes=[300000],
+        counters=frame_counts,
+    ),
+    "closures": Case(
+        "creating functions, which only close over the frames declaring a name they refer to. "
+        "counter refers to a variable of the call making it and keeps that call's frame",
+        ["create", "in_calls", "in_loop", "counter"],
+        sizes=[10000],
+        unit="function",
+        memory="retained",
+    ),
+}
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+def build_tree(bang_file: Path):
+    from bang.lexing.lexer import Lexer
+    from bang.parsing.control_flow_parser import ControlFlowParser
+    from bang.parsing.expression_parser import ExpressionParser
+    from bang.semantic.semantic_analysis import SemanticAnalysis
+
+    lex = Lexer(str(bang_file))
+    tokens = lex.tokenizer()
+    ex = ExpressionParser(tokens, lex.text)
+    ex.split()
+    ex.loading_into_algos()
+    roots = ControlFlowParser(lex.text, ex.post_SYA).blockenize()
+    SemanticAnalysis(lex.text, roots).walk_program()
+    return lex.text, roots
+
+
+def run_eval(engine_class, bang_file: Path, memory: str | None):
+    # every run gets a tree of its own, the engines keep state on its nodes
+    text, roots = build_tree(bang_file)
+    # the engines print, which we don't want to time against the terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        if memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        engine = engine_class(text, roots)
+        engine.eval_program()
+        t1 = time.perf_counter()
+        used = 0
+        if memory:
+            # the engine, and so everything the program kept, is still alive
+            current, peak = tracemalloc.get_traced_memory()
+            used = peak if memory == "peak" else current
+            tracemalloc.stop()
+    return t1 - t0, used, engine, text, roots
+
+
+def measure(engine_class, bang_file: Path, iters: int, warmup: int, memory: str | None):
+    for _ in range(warmup):
+        run_eval(engine_class, bang_file, None)
+    gc.disable()
+    try:
+        runs = [run_eval(engine_class, bang_file, None) for _ in range(iters)]
+    finally:
+        gc.enable()
+    times = [run[0] for run in runs]
+    if not memory:
+        return times, 0, runs[-1][2:]
+    # traced separately, tracemalloc slows everything it watches down
+    traced = run_eval(engine_class, bang_file, memory)
+    return times, traced[1], traced[2:]
+
+
+def fmt_seconds(s: float) -> str:
+    if s < 1e-3:
+        return f"{s * 1e6:.2f} µs"
+    if s < 1.0:
+        return f"{s * 1e3:.3f} ms"
+    return f"{s:.3f} s"
+
+
+def fmt_bytes(b: int) -> str:
+    if b < 1024:
+        return f"{b} B"
+    if b < 1024 * 1024:
+        return f"{b / 1024:.1f} KiB"
+    return f"{b / (1024 * 1024):.1f} MiB"
+
+
+# ----------------------------
+# Printing
+# ----------------------------
+def run_case(name: str, case: Case, args, td: Path):
+    from bang.cli import ENGINES
+
+    programs = [
+        p
+        for p in case.programs
+        if (p in args.programs if args.programs else p not in case.optional)
+    ]
+    sizes = (args.sizes or case.sizes) if case.sizes else [None]
+
+    print(f"\n{name}: {case.about}\n")
+    header = f"{'engine':>8}  {'program':>14}  {'size':>9}  {'min':>12}  {'median':>12}"
+    if case.unit:
+        header += f"  {'per ' + case.unit:>13}"
+    if case.memory:
+        header += f"  {case.memory:>12}"
+    print(header)
+    print("-" * len(header))
+
+    for engine_name in args.engines:
+        for program in programs:
+            template = Template((WORKLOADS / name / f"{program}.bang").read_text(encoding="utf-8"))
+            for size in sizes:
+                bang_file = td / f"{name}_{program}.bang"
+                source = (
+                    template.template if size is None else template.substitute(case.params(size))
+                )
+                bang_file.write_text(source, encoding="utf-8")
+                times, used, (engine, text, roots) = measure(
+                    ENGINES[engine_name], bang_file, args.iters, args.warmup, case.memory
+                )
+                row = (
+                    f"{engine_name:>8}  {program:>14}  {'-' if size is None else size:>9}  "
+                    f"{fmt_seconds(min(times)):>12}  {fmt_seconds(stats.median(times)):>12}"
+                )
+                if case.unit:
+                    row += f"  {fmt_seconds(min(times) / case.ops(size)):>13}"
+                if case.memory:
+                    row += f"  {fmt_bytes(used):>12}"
+                if case.counters:
+                    row += f"  {case.counters(engine, text, roots)}"
+                print(row)
+
+
+def main():
+    from bang.cli import ENGINES
+
+    ap = argparse.ArgumentParser(description="Bang execution engine benchmark (eval phase only).")
+    ap.add_argument("--cases", nargs="+", choices=tuple(CASES), default=["engines"])
+    ap.add_argument("--engines", nargs="+", choices=tuple(ENGINES), default=list(ENGINES))
+    ap.add_argument("--programs", nargs="+", default=[], help="programs of the cases to run")
+    ap.add_argument("--sizes", nargs="+", type=int, default=[], help="in place of the cases' own")
+    ap.add_argument("--iters", type=int, default=3, help="timed iterations per program and size")
+    ap.add_argument("--warmup", type=int, default=1, help="warmup iterations per program and size")
+    args = ap.parse_args()
+
+    print(f"\nBang engine benchmark | iters={args.iters} | warmup={args.warmup}")
+    with tempfile.TemporaryDirectory() as td:
+        for name in args.cases:
+            run_case(name, CASES[name], args, Path(td))
+
+
+if __name__ == "__main__":
+    main()
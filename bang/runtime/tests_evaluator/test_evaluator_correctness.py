@@ -1,13 +1,29 @@
 import pytest
 
 from bang.lexing.lexer import Lexer
+from bang.lexing.lexer_tokens import (
+    T_ASTERISK_ENUM_VAL,
+    T_DSLASH_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_IN_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+    T_SLASH_ENUM_VAL,
+)
 from bang.parsing.control_flow_parser import ControlFlowParser
 from bang.parsing.expression_parser import ExpressionParser
+from bang.runtime import binary_operations
+from bang.runtime.binary_operations import BIN_OP_TABLE, add_in_place
+from bang.runtime.closure_compiler import ClosureCompiler
 from bang.runtime.evaluator import Evaluator, EvaluatorError
 from bang.semantic.semantic_analysis import SemanticAnalysis
+from bang.transpiler.python_engine import PythonEngine
+from bang.vm.vm import VirtualMachine
+
+# every execution engine has to agree with the tree walking evaluator
+ENGINES = [Evaluator, ClosureCompiler, VirtualMachine, PythonEngine]
 
 
-def evaluate(code: str, tmp_path):
+def evaluate(code: str, tmp_path, engine=Evaluator):
     """Tokenises, parses, semantically analyses **and** executes a small Bang
     program.  Any *EvaluatorError* raised at run-time will bubble up to the test
     layer just like *SemanticError* does in the compile-time suite.
@@ -31,7 +47,7 @@ def evaluate(code: str, tmp_path):
     sema.walk_program()  # will raise on failure
 
     # ---------- EVALUATION (unit under test) ----------
-    runner = Evaluator(lexer.text, roots)
+    runner = engine(lexer.text, roots)
     runner.eval_program()  # may raise EvaluatorError
     return runner  # returned so tests can poke at state if they wish
 
@@ -317,9 +333,10 @@ def evaluate(code: str, tmp_path):
         "data P [x]; p = P{}; [[1,2][0], p.x] = [9, 8]; print{p.x}\n",
     ],
 )
-def test_evaluator_valid(program, tmp_path):
+@pytest.mark.parametrize("engine", ENGINES)
+def test_evaluator_valid(program, engine, tmp_path):
     """Programs here should *run to completion* with **no EvaluatorError**."""
-    evaluate(program, tmp_path)  # will raise on failure
+    evaluate(program, tmp_path, engine)  # will raise on failure
 
 
 # ----------------------------
@@ -490,7 +507,789 @@ def test_evaluator_valid(program, tmp_path):
         "data P [x]; fn foo args; return P{1}; end; foo{}{}\n",
     ],
 )
-def test_evaluator_invalid(program, tmp_path):
+@pytest.mark.parametrize("engine", ENGINES)
+def test_evaluator_invalid(program, engine, tmp_path):
     """Each program here is expected to raise *EvaluatorError*."""
     with pytest.raises(EvaluatorError):
+        evaluate(program, tmp_path, engine)
+
+
+# ----------------------------
+# Engine agreement (every engine prints exactly what the evaluator prints)
+# ----------------------------
+@pytest.mark.parametrize(
+    "program",
+    [
+        "fn fib n; if n[0] < 2; return n[0]; end; return fib{n[0]-1} + fib{n[0]-2}; end\n"
+        "print{fib{15}}\n",
+        "x = 0\nfor i 10\nif i == 3\ncontinue\nend\nif i == 7\nbreak\nend\nx += i\nend\nprint{x}\n",
+        "i = 0\nwhile true\ni += 1\nif i > 4\nbreak\nend\nend\nprint{i}\n",
+        "fn mk args; c = args[0]; fn inc a; c += 1; return c; end; return inc; end\n"
+        "f = mk{5}\nprint{f{}, f{}}\n",
+        "[a, [b, c]] = [1, [2, 3]]\n[a, b] += [10, 20]\nprint{a, b, c}\n",
+        'd = dict{}\nd["k"] = [1, 2]\nd["k"][1] *= 5\nprint{d}\n',
+        "data P [x, y]; p = P{1}; p.y = P{2, 3}; p.y.x += 1; print{p.x, p.y.x, p.y.y}\n",
+        's = "ab" * 2\nprint{s, s - "b", 1.5 // 1, 7 / 2, !0, -(3), [1, 2] in [[1, 2]]}\n',
+        "fn f args; x = 1; fn g a; return x; end; x = 2; return g{}; end\nprint{f{}}\n",
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES[1:])
+def test_engines_agree(program, engine, tmp_path, capsys):
+    evaluate(program, tmp_path)
+    expected = capsys.readouterr().out
+    evaluate(program, tmp_path, engine)
+    assert capsys.readouterr().out == expected
+
+
+# ----------------------------
+# Resolved frames
+# ----------------------------
+def test_variables_are_resolved_to_slots(tmp_path):
+    runner = evaluate("x = 1\nfor i 3\nif i > 0\nx += i\nend\nend\n", tmp_path)
+    resolved = runner.resolution.names
+    # every x lives in the same slot of the outermost frame, the loop
+    # variable in the loop's frame one level up
+    x_coordinates = {r.coordinates for r in resolved.values() if r.name == "x"}
+    assert len(x_coordinates) == 1
+    ((depth, _),) = x_coordinates.pop()
+    assert depth == 0
+    assert {r.coordinates[0][0] for r in resolved.values() if r.name == "i"} == {1}
+    assert runner.scope_stack[0]["x"] == 1 + 1 + 2
+
+
+@pytest.mark.parametrize(
+    "program, expected",
+    [
+        # a bound naming a variable created later on in the enclosing loop
+        ("r = 0\nfor i 2\nif i == 1\nfor j y\nr += j\nend\nend\ny = 3\nend\n", 0 + 1 + 2),
+        # break and continue out of an if leave the frame stack balanced
+        ("r = 0\nfor i 5\nif i == 1\ncontinue\nend\nif i == 3\nbreak\nend\nr += i\nend\nr += 10\n", 12),
+        # a function writing a name its caller only creates later
+        ("fn f a; y = 1; return y; end\ny = 5\nr = [f{}, y]\n", [1, 5]),
+        # writes to enclosing variables stay inside of the call, even when recursing
+        ("x = 0\nfn f a; n = a[0]; if n == 0; return x; end; x = n; return f{n - 1} + x; end\n"
+         "r = [f{3}, x]\n", [6, 0]),
+        ("z = 3\nfn g a; for z 2; end; z += 10; return z; end\nr = [g{}, g{}, z]\n", [11, 11, 3]),
+        # functions created by a call see the enclosing frames as they were when it started
+        ("x = 1\nfn o a; fn i b; return x; end; return i; end\nh = o{}\nx = 100\nr = h{}\n", 1),
+    ],
+)
+def test_resolved_frames_keep_runtime_semantics(program, expected, tmp_path):
+    assert evaluate(program, tmp_path).scope_stack[0]["r"] == expected
+
+
+# a block run again by a loop writes to the variable a declaration further down in an
+# enclosing block already set, the way the frames are searched at runtime
+@pytest.mark.parametrize(
+    "program, expected",
+    [
+        (
+            "r = []\nfor i 3\nif i == 2\nx = 3\nend\nif i > 0\nfor j x\nr += [j]\nend\nend\n"
+            "x = 1\nend\n",
+            [0, 0, 1, 2],
+        ),
+        (
+            "r = []\nn = 0\nwhile n < 3\nif n == 2\nx = 5\nend\nif n > 0\nfor j x\nr += [j]\n"
+            "end\nend\nx = 1\nn += 1\nend\n",
+            [0, 0, 1, 2, 3, 4],
+        ),
+        (
+            "fn g a\ns = 0\nfor i 3\nif i == 2\n[x, y] = [4, 2]\nend\nif i > 0\nfor j x\ns += j\n"
+            "end\nend\nx = 1\nend\nreturn s\nend\nr = [g{}, g{}]\n",
+            [6, 6],
+        ),
+        (
+            "r = []\nfor i 4\nif i == 3\nw = [1]\nw += [2]\nend\nif i > 1\nfor j w\nr += [j]\n"
+            "end\nend\nw = [0]\nend\n",
+            [0, 1, 2],
+        ),
+        # the loop variable too, once the enclosing loop's body declared it
+        (
+            "r = []\nfor k 2\nfor i 2\nr += [i]\nend\nif k == 1\nfor j i\nr += [j]\nend\nend\n"
+            "i = 5\nend\n",
+            [0, 1, 0, 1, 0],
+        ),
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_writes_find_names_declared_further_down(program, expected, engine, tmp_path):
+    assert evaluate(program, tmp_path, engine).scope_stack[0]["r"] == expected
+
+
+def test_only_names_a_loop_runs_again_get_more_slots(tmp_path):
+    # the second x is declared further down than the first, but no loop runs the
+    # if again once it is set, so the if's x keeps its one slot
+    code = "if 1\nx = 1\nend\nx = 2\nfor i 2\nif i\ny = 1\nend\ny = 2\nend\n"
+    runner = evaluate(code, tmp_path)
+    coordinates = {}
+    for resolved in runner.resolution.names.values():
+        coordinates.setdefault(resolved.name, set()).add(len(resolved.coordinates))
+    assert coordinates["x"] == {1}
+    assert coordinates["y"] == {1, 2}
+
+
+# the engines running on the resolver's frames, the python engine runs on python locals
+@pytest.mark.parametrize("engine", ENGINES[:3])
+def test_calls_share_the_frames_they_close_over(engine, tmp_path):
+    code = "a = 1\nb = 2\nfn f args; c = a; b = c; return b; end\nr = f{}\n"
+    runner = evaluate(code, tmp_path, engine)
+    function = runner.scope_stack[0]["f"]
+    layout = runner.resolution.frames[id(function.body)]
+    # only b, which the body writes to, is copied into the call's frame
+    assert [layout.names[slot] for slot, _, _ in layout.captures] == ["b"]
+    assert runner.scope_stack[0]["r"] == 1
+    assert runner.scope_stack[0]["b"] == 2
+
+
+# a function body inside of a loop passes the semantic pass, but the loop isn't the body's
+@pytest.mark.parametrize(
+    ("program", "msg"),
+    [
+        ("for i 3\nfn f a\nbreak\nend\nf{}\nend\n", "cannot break outside of loop scope"),
+        (
+            "i = 0\nwhile i < 3\nfn f a\ncontinue\nend\ni += 1\nf{}\nend\n",
+            "cannot continue outside of loop scope",
+        ),
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_break_and_continue_dont_leave_a_call(program, msg, engine, tmp_path):
+    with pytest.raises(EvaluatorError) as error:
+        evaluate(program, tmp_path, engine)
+    assert error.value.msg == msg
+
+
+def test_only_blocks_that_declare_names_get_frames(tmp_path):
+    runner = evaluate("x = 0\nfor i 3\nif i == 1\nx += i\nend\nif i == 2\ny = i\nend\nend\n", tmp_path)
+    loop = runner.roots[1]
+    quiet, declaring = loop.body.block
+    frames = runner.resolution.frames
+    assert frames[id(loop.body)].names == ["i"]
+    assert frames[id(quiet.body)] is None
+    assert frames[id(declaring.body)].names == ["y"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_blocks_declaring_nothing_keep_runtime_semantics(engine, tmp_path):
+    code = (
+        "x = 0\ni = 7\nfor i 4\nif i > 1\nx += i\nelse\nx -= 1\nend\nend\nend\n"
+        "n = 0\nwhile n < 3\nn += 1\nif n == 2\nm = n\nx += m\nend\nend\n"
+        "fn f a; for i a[0]; if i == 2; return i * 10; end; end; return 0; end\n"
+        "r = [x, i, n, f{5}]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["r"] == [5, 3, 3, 20]
+
+
+def test_functions_close_over_the_frames_they_refer_to(tmp_path):
+    code = (
+        "fs = []\nfor k 3\ntmp = [k] * 100\nfn g a; return a[0]; end\n"
+        "fn h a; return tmp; end\nfs += [g, h]\nend\n"
+    )
+    g, h = evaluate(code, tmp_path).scope_stack[0]["fs"][:2]
+    # g refers to nothing outside of itself, h only to the loop's tmp
+    assert g.closure == [None, None]
+    assert [frame is not None for frame in h.closure] == [False, True]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_closures_still_see_what_they_refer_to(engine, tmp_path):
+    code = (
+        "fn g a; if a[0] < 1; return 0; end; return a[0] + g{a[0] - 1}; end\n"
+        "x = 5\nfn o a; y = 2; fn i b; return x * y; end; return i; end\nh = o{}\nx = 7\n"
+        "fs = []\nfor k 3\ntmp = k * 10\nfn c a; return tmp + a[0]; end\nfs += [c]\nend\n"
+        "r = [g{4}, h{}, fs[0]{1}, fs[2]{1}]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["r"] == [10, 10, 21, 21]
+
+
+def test_while_variables_do_not_outlive_the_loop(tmp_path):
+    with pytest.raises(EvaluatorError):
+        evaluate("i = 0\nwhile i < 2\nw = i\ni += 1\nend\nprint{w}\n", tmp_path)
+
+
+# ----------------------------
+# Binary operation table
+# ----------------------------
+@pytest.mark.parametrize(
+    "program, msg",
+    [
+        ("fn g a; return 0; end; x = 1 / g{}\n", "division by zero"),
+        ("fn g a; return [0]; end; x = [1, 2] // g{}\n", "attempted divison by zero"),
+        (
+            "fn g a; return 1; end; x = 2 in g{}\n",
+            f"operation '{T_IN_ENUM_VAL}' not supported between {int} and {int}",
+        ),
+        (
+            "fn g a; return set{1}; end; x = g{} * g{}\n",
+            f"operation '{T_ASTERISK_ENUM_VAL}' not supported between {set} and {set}",
+        ),
+        (
+            "fn g a; return [1, 2, 3]; end; x = [1, 2] * g{}\n",
+            "list element-wise multiplication is not supported between lists of "
+            "different lengths wheremultiplicand length is not one",
+        ),
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bin_op_errors(program, msg, engine, tmp_path):
+    with pytest.raises(EvaluatorError) as error:
+        evaluate(program, tmp_path, engine)
+    assert error.value.msg == msg
+
+
+def test_bin_op_table_is_built_ahead_of_time():
+    assert BIN_OP_TABLE[(int, float, T_PLUS_ENUM_VAL)](1, 0.5) == 1.5
+    assert BIN_OP_TABLE[(str, int, T_ASTERISK_ENUM_VAL)]("ab", 2) == "abab"
+    assert BIN_OP_TABLE[(list, set, T_EQ_ENUM_VAL)]([1], {1}) is False
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_program_types_stay_out_of_the_bin_op_table(engine, tmp_path):
+    size = len(BIN_OP_TABLE)
+    code = "fn f a; return 1; end\ndata P [x]\nr = [f == f, P{1} != P{1}]\n"
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [True, False]
+    assert len(BIN_OP_TABLE) == size
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_repeated_arrays_are_independent_copies(engine, tmp_path):
+    # every repetition is a deep copy, but an array appearing twice inside of
+    # the repeated element stays one array inside of each copy
+    code = (
+        "g = [[0] * 3] * 2\ng[0][1] = 7\nx = [1]\ny = [x, x]\nz = 2 * [y]\nz[0][0][0] = 9\n"
+        "data P [f]\np = P{[1]}\nq = [p] * 2\nq[0].f[0] = 5\n"
+        "r = [[0, [set{1}]]] * 2\nr[1][1][0] += set{2}\n"
+        "w = [g, z, x, p.f, q[1].f, r]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["w"] == [
+        [[0, 7, 0], [0, 0, 0]],
+        [[[9], [9]], [[1], [1]]],
+        [1],
+        [1],
+        [1],
+        [[0, [{1}]], [0, [{1, 2}]]],
+    ]
+
+
+def test_values_without_operations_of_their_own_compare(tmp_path):
+    runner = evaluate("fn f a; end\nr = [f == f, f != f]\n", tmp_path)
+    assert runner.scope_stack[0]["r"] == [True, False]
+
+
+# ----------------------------
+# Tail calls
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tail_calls_run_in_constant_stack(engine, tmp_path):
+    # far deeper than python's recursion limit
+    code = (
+        "fn count args; n = args[0]; if n == 0; return args[1]; end; "
+        "return count{n - 1, args[1] + 2}; end\n"
+        "fn even args; if args[0] == 0; return 1; end; return args[1]{args[0] - 1}; end\n"
+        "fn odd args; if args[0] == 0; return 0; end; return even{args[0] - 1, odd}; end\n"
+        "r = [count{20000, 0}, odd{20001}, odd{20000}]\n"
+    )
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [40000, 1, 0]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tail_calls_to_other_callables(engine, tmp_path):
+    code = (
+        "data P [a, b]\nfn mk args; return P{args[0]}; end\n"
+        "fn size args; return len{args}; end\n"
+        "fn twice args; return args[0]{args[1]}; end\n"
+        "r = [mk{3}.a, size{1, 2, 3}, twice{size, 4}]\n"
+    )
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [3, 3, 1]
+
+
+# ----------------------------
+# Call sites
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_call_sites_cache_their_callee(engine, tmp_path):
+    runner = evaluate("a = [1, 2]\nfor i 10\nx = len{a}\nend\n", tmp_path, engine)
+    assert runner.call_site_stats() == {"sites": 1, "hits": 9, "misses": 1, "polymorphic": 0}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rebinding_a_callee_is_seen_by_the_call_site(engine, tmp_path):
+    code = (
+        "data P [a, b]\ndata Q [a]\nfs = [min, max, P, Q]\nr = []\n"
+        "for i 8\nf = fs[i // 2]\nv = f{3, 5}\nif i >= 4\nv = v.a\nend\nr += [v]\nend\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["r"] == [3, 3, 5, 5, 3, 3, 3, 3]
+    stats = runner.call_site_stats()
+    assert (stats["misses"], stats["polymorphic"]) == (4, 1)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cached_dataclasses_default_missing_fields(engine, tmp_path):
+    code = "data P [a, b]\nr = []\nfor i 3\np = P{i}\nr += [[p.a, p.b]]\nend\n"
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [[0, 0], [1, 0], [2, 0]]
+
+
+# ----------------------------
+# Field sites
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_field_sites_cache_the_layouts_of_a_chain(engine, tmp_path):
+    code = "data P [a, b]\nc = P{P{1, 2}, 3}\nx = 0\nfor i 10\nx = c.a.b\nend\n"
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["x"] == 2
+    assert runner.field_site_stats() == {"sites": 1, "hits": 9, "misses": 1, "polymorphic": 0}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_field_sites_follow_instances_of_other_layouts(engine, tmp_path):
+    code = (
+        "data P [a, b]\ndata Q [b, a]\ncs = [P{P{1, 2}}, Q{0, Q{3, 4}}, P{Q{5, 6}}, P{P{7, 8}}]\n"
+        "r = []\nfor c cs\nc.a.b += 10\nr += [c.a.b]\nend\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["r"] == [12, 13, 15, 18]
+    assert runner.field_site_stats()["polymorphic"] >= 1
+
+
+# ----------------------------
+# Memoization
+# ----------------------------
+FIB = "fn fib args; n = args[0]; if n < 2; return n; end; return fib{n - 1} + fib{n - 2}; end\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_memo_caches_recursive_calls(engine, tmp_path):
+    code = FIB + "fib = memo{fib}\nr = [fib{60}, memo_stats{fib}]\n"
+    value, stats = evaluate(code, tmp_path, engine).scope_stack[0]["r"]
+    assert value == 1548008755920
+    assert (stats["misses"], stats["hits"], stats["evictions"]) == (61, 58, 0)
+
+
+# counting its calls keeps it from being memoized automatically
+COUNTED_FIB = (
+    "calls = [0]\nfn fib args; calls[0] += 1; n = args[0]; if n < 2; return n; end; "
+    "return fib{n - 1} + fib{n - 2}; end\n"
+)
+
+
+@pytest.mark.parametrize(
+    ("binding", "calls", "misses"),
+    [
+        # the recursive calls go through the cache once the name is rebound
+        ("fib = memo{fib}\nf = fib\n", 21, 21),
+        # they still call the function itself otherwise
+        ("f = memo{fib}\n", 21891, 1),
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_memo_caches_recursion_through_the_rebound_name(engine, binding, calls, misses, tmp_path):
+    code = COUNTED_FIB + binding + 'r = [f{20}, calls[0], memo_stats{f}["misses"]]\n'
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [6765, calls, misses]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_memo_evicts_the_least_recently_used(engine, tmp_path):
+    code = (
+        "fn sq args; return args[0] * args[0]; end\nf = memo{sq, 2}\n"
+        "r = [f{1}, f{2}, f{1}, f{3}, f{2}, f{1}, memo_stats{f}]\n"
+    )
+    *values, stats = evaluate(code, tmp_path, engine).scope_stack[0]["r"]
+    assert values == [1, 4, 1, 9, 4, 1]
+    assert stats == {
+        "hits": 1,
+        "misses": 5,
+        "evictions": 3,
+        "uncached": 0,
+        "size": 2,
+        "max_size": 2,
+    }
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_memo_handles_unhashable_arguments(engine, tmp_path):
+    code = (
+        "data P [x]\nfn f args; return [args[0], len{args}]; end\ng = memo{f}\n"
+        "a = g{[1, [2]]}\na[0][1][0] = 5\np = P{1}\nq = g{p}\np.x = 2\n"
+        "r = [g{[1, [2]]}, g{dict{1, [2]}}, g{set{1, 2}}, g{7}, g{7.0}, g{p}[0].x, "
+        "memo_stats{g}]\n"
+    )
+    *values, stats = evaluate(code, tmp_path, engine).scope_stack[0]["r"]
+    assert values == [[[1, [2]], 1], [{1: [2]}, 1], [{1, 2}, 1], [7, 1], [7.0, 1], 2]
+    assert type(values[4][0]) is float
+    assert (stats["hits"], stats["misses"], stats["uncached"]) == (1, 5, 2)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_pure_functions_are_memoized_automatically(engine, tmp_path):
+    code = FIB + "r = [fib{60}, memo_stats{fib}, memo_stats{memo{fib}}]\n"
+    value, stats, fresh = evaluate(code, tmp_path, engine).scope_stack[0]["r"]
+    assert value == 1548008755920
+    assert (stats["misses"], stats["hits"]) == (61, 58)
+    # memo{} of a memoized function caches its calls on its own
+    assert fresh["size"] == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_automatic_memoization_keeps_arrays_apart(engine, tmp_path):
+    # only plain values are cached, every call still builds arrays of its own
+    code = (
+        "fn f a; if a[0] == 0; return [0]; end; return f{a[0] - 1} + f{a[0] - 1}; end\n"
+        "x = f{2}\ny = f{2}\nx[0] = 5\nr = [x, y, memo_stats{f}[\"hits\"]]\n"
+    )
+    assert evaluate(code, tmp_path, engine).scope_stack[0]["r"] == [[5, 0, 0, 0], [0, 0, 0, 0], 0]
+
+
+@pytest.mark.parametrize(
+    "program, msg",
+    [
+        ("x = memo{len}\n","memo expects a function and optionally a cache size"),
+        (FIB + "x = memo{fib, 0}\n", "memo cache size must be a positive int"),
+        ("fn f a; return 1; end\nx = memo_stats{f}\n", "memo_stats expects exactly one memoized function"),
+    ],
+)
+def test_memo_errors(program, msg, tmp_path):
+    with pytest.raises(EvaluatorError) as error:
         evaluate(program, tmp_path)
+    assert error.value.msg == msg
+
+
+# ----------------------------
+# Completions
+# ----------------------------
+def test_returns_out_of_loops_leave_no_state_behind(tmp_path):
+    code = (
+        "fn f a; for i 3; while 1; if i == a[0]; return i; end; break; end; end; return -1; end\n"
+        "r = []\nfor j 4\nif j == 1\ncontinue\nend\nr += [f{j}]\nend\n"
+    )
+    runner = evaluate(code, tmp_path)
+    assert runner.scope_stack[0]["r"] == [0, 2, -1]
+    assert (runner.loop_depth, runner.func_depth, len(runner.frames)) == (0, 0, 1)
+
+
+def test_expression_statements_complete_normally(tmp_path):
+    # a value left over by an expression statement is never mistaken for a completion
+    code = "fn f a; 1; [2]; a; return 3; end\nr = f{}\n"
+    assert evaluate(code, tmp_path).scope_stack[0]["r"] == 3
+
+
+# ----------------------------
+# Ranges
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_ranges_stay_lazy(engine, tmp_path):
+    code = (
+        "r = range{0, 100000000, 2}\n"
+        "x = [len{r}, r[3], r[-1], 99999998 in r, 7 in r, 4.0 in r, r == range{0, 100000000, 2}]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["x"] == [50000000, 6, 99999998, True, False, True, True]
+    assert runner.scope_stack[0]["r"].items is None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_ranges_behave_like_arrays(engine, tmp_path, capsys):
+    code = (
+        "r = range{2, 10, 3}\ns = r\n[a, b] = r\n"
+        "x = [r + [1], r * 2, r - [5], sum{r}, max{r}, sort{range{3, 0, -1}}, set{range{2}}]\n"
+        "y = 0\nfor i r\ny += i\nend\nprint{r, [range{2}]}\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    scope = runner.scope_stack[0]
+    assert [scope["a"], scope["b"], scope["y"]] == [2, 5, 15]
+    assert scope["x"] == [[2, 5, 8, 1], [2, 2, 5, 5, 8, 8], [2, 8], 15, 8, [1, 2, 3], {0, 1}]
+    assert type(scope["x"][0]) is list
+    assert capsys.readouterr().out == "[2, 5, 8] [[0, 1]]\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_assigning_an_element_materializes_a_range(engine, tmp_path):
+    # every variable holding the range sees the assignment, like with any array
+    code = "r = range{3}\ns = r\nr[0] = 9\nx = [s, 9 in r, 0 in s, len{r}]\n"
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["x"] == [[9, 1, 2], True, False, 3]
+    assert runner.scope_stack[0]["r"].items == [9, 1, 2]
+
+
+# ----------------------------
+# Vectorized operations
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_elementwise_operations_on_long_arrays(engine, tmp_path, capsys):
+    # the same with numpy installed (vectorized) or not (python lists)
+    code = (
+        "a = range{1, 201}\nb = a * a\nc = b / [3]\nd = b // [7]\ne = [2] / a\nf = c * [1.5]\n"
+        "g = b\ng[0] = 99\nh = range{-50, 50} // [-7]\n"
+        "x = [b[1], b[-1], c[2], d[10], e[1], f[199], max{c}, 40000 in b, g == b, h[0]]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    x = runner.scope_stack[0]["x"]
+    assert x == [4, 40000, 3.0, 17, 1.0, 20000.0, 40000 / 3, True, True, 7]
+    assert [type(v) for v in x[:6]] == [int, int, float, int, float, float]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_vectorized_division_by_zero(engine, tmp_path):
+    with pytest.raises(EvaluatorError) as error:
+        evaluate("a = range{100}\nb = range{1, 101} / a\n", tmp_path, engine)
+    assert error.value.msg == "attempted divison by zero"
+
+
+def test_vectorized_results_match_list_results():
+    numpy = pytest.importorskip("numpy")
+    from bang.runtime.binary_operations import elementwise, list_div, list_floor_div, list_mul
+    from bang.runtime.evaluator_nodes import NUMERIC_ARRAY
+
+    ints = list(range(-100, 100))
+    floats = [i * 0.37 + 0.01 for i in range(200)]
+    handlers = {
+        T_ASTERISK_ENUM_VAL: list_mul,
+        T_SLASH_ENUM_VAL: list_div,
+        T_DSLASH_ENUM_VAL: list_floor_div,
+    }
+    for left in (ints, floats):
+        for right in (floats, [3], [-2.5]):
+            packed = NUMERIC_ARRAY(numpy.array(left))
+            for op, handler in handlers.items():
+                result = elementwise(packed, right, op)
+                assert type(result) is NUMERIC_ARRAY
+                assert result == handler(left, right)
+                assert list(map(type, result)) == list(map(type, handler(left, right)))
+    # ints that could overflow int64 are multiplied as python ints
+    big = NUMERIC_ARRAY(numpy.array([2**40] * 100))
+    assert elementwise(big, [2**40], T_ASTERISK_ENUM_VAL) is None
+
+
+# ----------------------------
+# Packed arrays
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_packed_arrays_behave_like_lists(engine, tmp_path):
+    code = (
+        "a = [0] * 100\nfor i 100\na[i] = i * 3\nend\nf = [0.5] * 80\nf[1] = -2.25\n"
+        "r = range{100}\nr[0] = 7\ns = sort{r}\nalias = a\na[2] = \"x\"\n"
+        "x = [a[99], sum{r}, min{f}, max{f}, s[1], alias[2], f == f * [1], r[-1]]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    x = runner.scope_stack[0]["x"]
+    assert x == [297, 4957, -2.25, 0.5, 2, "x", True, 99]
+    assert type(x[0]) is int and type(x[2]) is float
+
+
+def test_packed_arrays_promote_on_other_values():
+    from bang.runtime.binary_operations import list_times_int
+    from bang.runtime.evaluator_nodes import PACKED_ARRAY
+
+    for value in (True, 2.5, "x", 2**70):
+        packed = list_times_int([0], 100)
+        assert type(packed) is PACKED_ARRAY
+        packed[1] = 5
+        assert packed.items is None
+        packed[2] = value
+        assert packed.items is not None
+        assert list(packed)[:3] == [0, 5, value] and type(packed[2]) is type(value)
+    floats = list_times_int([0.0, 1.0], 50)
+    floats[99] = 3.5
+    assert floats.items is None and floats == [0.0] * 50 + [1.0] * 49 + [3.5]
+    floats[0] = 1
+    assert type(floats[0]) is int
+    # short arrays and arrays of anything else stay lists
+    assert type(list_times_int([0], 10)) is list
+    assert type(list_times_int([False], 100)) is list
+
+
+# ----------------------------
+# In place addition
+# ----------------------------
+def test_add_in_place_only_changes_unshared_values():
+    held = [[1]]
+    value = held[0]
+    changed = add_in_place(value, [2])
+    assert changed
+    assert held == [[1, 2]]
+    alias = value
+    changed = add_in_place(value, [3])
+    assert not changed
+    assert alias == [1, 2]
+
+
+
+def test_add_in_place_needs_reference_counts(monkeypatch):
+    # without counts it can trust, nothing is changed in place
+    monkeypatch.setattr(binary_operations, "UNSHARED_REFERENCES", -1)
+    held = [[1]]
+    value = held[0]
+    assert not add_in_place(value, [2])
+    assert held == [[1]]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_add_assignment_grows_unshared_values_in_place(engine, tmp_path):
+    code = (
+        "x = []\nfor i 1000\nx += [i]\nend\ns = set{}\nfor i 3\ns += set{i}\nend\n"
+        "d = dict{}\nfor i 3\nd += dict{i, i * i}\nend\nr = [range{2}]\nr[0] += [7]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    scope = runner.scope_stack[0]
+    assert scope["x"] == list(range(1000))
+    assert scope["s"] == {0, 1, 2}
+    assert scope["d"] == {0: 0, 1: 1, 2: 4}
+    assert scope["r"] == [[0, 1, 7]]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_add_assignment_leaves_aliases_alone(engine, tmp_path):
+    code = (
+        "x = [1]\ny = x\nx += [2]\ns = set{1}\nt = s\ns += set{2}\n"
+        "a = [[1]]\nb = a[0]\na[0] += [3]\n"
+        "data P [f]\np = P{[4]}\nq = p.f\np.f += [5]\n"
+        "z = [x, y, s, t, a, b, p.f, q]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    z = runner.scope_stack[0]["z"]
+    assert z == [[1, 2], [1], {1, 2}, {1}, [[1, 3]], [1], [4, 5], [4]]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_add_assignment_leaves_shared_values_alone(engine, tmp_path):
+    # values held by an argument, a closure, another element or a dict
+    code = (
+        "fn f a; v = a[0]; v += [2]; return v; end\nw = [1]\nfw = f{w}\n"
+        "c = [3]\nfn g a; c += [4]; return c; end\ngc = g{}\n"
+        "e = [5]\nl = [e, e]\nl[0] += [6]\n"
+        "d = dict{1, [7]}\nk = d[1]\nk += [8]\n"
+        "z = [w, fw, c, gc, l, e, d[1], k]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    z = runner.scope_stack[0]["z"]
+    assert z == [[1], [1, 2], [3], [3, 4], [[5, 6], [5]], [5], [7], [7, 8]]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_add_assignment_evaluates_right_hand_once(engine, tmp_path, capsys):
+    # the target is read before the right hand runs, and the right hand only runs once
+    code = (
+        "x = [1]\nfn f args\nprint{x}\nreturn [9]\nend\n"
+        "x += f{}\na = [[0]]\na[0] += f{}\nprint{x, a}\n"
+    )
+    evaluate(code, tmp_path, engine)
+    assert capsys.readouterr().out == "[1]\n[1, 9]\n[1, 9] [[0, 9]]\n"
+
+
+# ----------------------------
+# Instances
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_instances_share_the_layout_of_their_dataclass(engine, tmp_path):
+    code = (
+        "data P [x, y, x]\na = P{1}\nb = P{2, [3]}\nb.x = 4\nb.y += [5]\n"
+        "rows = [b] * 2\nrows[0].y += [6]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    scope = runner.scope_stack[0]
+    a, b, rows = scope["a"], scope["b"], scope["rows"]
+    assert a.offsets is b.offsets and a.offsets == {"x": 0, "y": 1}
+    assert a.values == [1, 0] and b.values == [4, [3, 5]]
+    # copies keep the layout and get arrays of their own
+    assert rows[0].offsets is b.offsets
+    assert rows[0].values == [4, [3, 5, 6]] and rows[1].values == [4, [3, 5]]
+
+
+# ----------------------------
+# Tables
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tables_keep_rows_column_by_column(engine, tmp_path):
+    code = (
+        "data P [x, y]\nt = table{P, 100}\nfor i 100\nt[i].x = 100 - i\nt[i].y += i * 2\nend\n"
+        "t[0] = P{-1, 5}\nrow = t[1]\nrow.y = 7\nn = 0\nfor r t\nn += r.x\nend\n"
+        "x = [len{t}, t[-1].x, t[1].y, sum{t.x}, max{t.y}, n, t[0].y]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    scope = runner.scope_stack[0]
+    assert scope["x"] == [100, 1, 7, 4949, 198, 4949, 5]
+    # every column is packed, and a row is an instance of the table's layout
+    assert all(column.items is None for column in scope["t"].values)
+    assert scope["row"].offsets is scope["t"].offsets
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tables_filter_and_sort_by_a_field(engine, tmp_path):
+    code = (
+        'data P [x, name]\nt = table{P, 5}\nnames = ["e", "b", "d", "a", "c"]\n'
+        "for i 5\nt[i].x = i * 10\nt[i].name = names[i]\nend\n"
+        'w = where{t, "x", ">=", 20}\ns = sort_by{t, "name"}\nf = table{P, 3, 0.5}\n'
+        "x = [w.x, w.name, s.x, s.name, sum{f.x}]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["x"] == [
+        [20, 30, 40],
+        ["d", "a", "c"],
+        [30, 10, 40, 20, 0],
+        ["a", "b", "c", "d", "e"],
+        1.5,
+    ]
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        "data P [x]\nt = table{P, 2}\nt.x = [1, 2]\n",
+        "data P [x]\nt = table{P, 2}\nprint{t[2].x}\n",
+        "data P [x]\ndata Q [x]\nt = table{P, 2}\nt[0] = Q{1}\n",
+        "data P [x]\nt = table{P, -1}\n",
+        'data P [x]\nt = table{P, 2}\nw = where{t, "x", "<>", 1}\n',
+        'data P [x]\nt = table{P, 2}\nw = where{t, "x", "<", "a"}\n',
+        'data P [x]\nt = table{P, 2}\ns = sort_by{t, "y"}\n',
+    ],
+)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_table_errors(program, engine, tmp_path):
+    with pytest.raises(EvaluatorError):
+        evaluate(program, tmp_path, engine)
+
+
+# ----------------------------
+# Short circuits
+# ----------------------------
+@pytest.mark.parametrize("engine", ENGINES)
+def test_and_or_skip_their_right_operand(engine, tmp_path):
+    code = (
+        "calls = [0]\nfn f args; calls[0] += 1; return args[0]; end\n"
+        "a = 0 && f{1}\nb = 2 && f{3}\nc = 4 || f{5}\nd = 0 || f{6}\ne = [] || [] && f{7}\n"
+        "vals = [3, 4, 0, 5]\ni = 0\nwhile i < len{vals} && vals[i] != 0\ni += 1\nend\n"
+        "guarded = i >= len{vals} || vals[i] + 1\nx = [a, b, c, d, e, calls[0], i, guarded]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["x"] == [0, 3, 4, 6, [], 2, 2, 1]
+
+
+# ----------------------------
+# Assignments
+# ----------------------------
+def test_assignments_are_worked_out_once(tmp_path):
+    code = (
+        "x = 0\ny = 0\na = [1, [2]]\nfor i 10\nx += i\nx -= 1\na[1][0] *= 2\n"
+        "[x, [y]] -= [1, [i]]\nend\nr = [x, y, a]\n"
+    )
+    runner = evaluate(code, tmp_path)
+    assert runner.scope_stack[0]["r"] == [25, -45, [1, [2048]]]
+    # one handler per assignment in the program, however often it ran
+    assert len(runner.assignment_handlers) == 8
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_literal_multi_assignments_see_the_old_values(engine, tmp_path):
+    # [a, b] = [x, y] is planned without the right hand list, every value is
+    # evaluated before the first target is assigned
+    code = (
+        "a = 1\nb = 2\nc = 3\nxs = [0, 0]\nfor i 5\n[a, b] = [b, a + b]\nend\n"
+        "[a, b, c] = [c, a, b]\n[xs[0], xs[1]] = [xs[1] + 1, xs[0] + 2]\n"
+        "[a, b] *= [2, b]\n[c, [a]] = [a, [c]]\n[b, b] = [b, 9, c]\n"
+        "r = [a, b, c, xs]\n"
+    )
+    runner = evaluate(code, tmp_path, engine)
+    assert runner.scope_stack[0]["r"] == [21, 9, 6, [1, 2]]
@@ -0,0 +1,429 @@
+# run at the end of the semantic pass, works out for every function in the program
+# what calling it can do besides working out its result (see EffectSummary), and puts
+# that on the FunctionNode, where the engines find it when they create the function.
+#
+# everything here is conservative, a function is only pure when it can be shown that
+# nothing a call does is seen outside of it and nothing but its arguments decides what
+# it returns. so it doesn't print, doesn't assign variables of enclosing scopes, only
+# changes (through index or field assignments) arrays and instances it created itself,
+# only reads enclosing variables that are never reassigned (functions, dataclasses
+# and builtins declared once, at the top level), and only calls pure functions and
+# builtins. calls through anything else (args[0]{}, a variable holding a function)
+# could be calling anything, and make the caller impure.
+#
+# a pure function that calls itself more than once (fib, most divide and conquer
+# solutions) recomputes the same calls over and over, those are memoized by the
+# engines. functions with calls in tail position are left alone, tail calls to them
+# couldn't run in constant stack anymore
+
+from bang.lexing.lexer_tokens import T_AND_ENUM_VAL, T_ASSIGN_ENUM_VAL, T_OR_ENUM_VAL
+from bang.parsing.parser_nodes import (
+    ARRAY_LITERAL_NODE_CLASS,
+    ASSIGNMENT_NODE_CLASS,
+    BIN_OP_NODE_CLASS,
+    BOOLEAN_LITERAL_NODE_CLASS,
+    CALL_NODE_CLASS,
+    DATA_CLASS_NODE_CLASS,
+    EXPRESSION_NODE_CLASS,
+    FIELD_ACCESS_NODE_CLASS,
+    FLOAT_LITERAL_NODE_CLASS,
+    FOR_NODE_CLASS,
+    FUNCTION_NODE_CLASS,
+    IDENTIFIER_NODE_CLASS,
+    IF_NODE_CLASS,
+    INDEX_NODE_CLASS,
+    INTEGER_LITERAL_NODE_CLASS,
+    NONE_LITERAL_NODE_CLASS,
+    RETURN_NODE_CLASS,
+    STRING_LITERAL_NODE_CLASS,
+    UNARY_OP_NODE_CLASS,
+    WHILE_NODE_CLASS,
+)
+from bang.semantic.semantic_nodes import DYNAMIC_EFFECT, EFFECT_SUMMARY_CLASS
+
+# builtins whose calls only depend on their arguments and change nothing
+PURE_BUILT_INS = frozenset(
+    ("len", "sum", "min", "max", "sort", "set", "dict", "range", "table", "where", "sort_by")
+)
+# builtins that always return a value nothing else refers to
+FRESH_BUILT_INS = frozenset(("set", "dict", "range", "table", "where", "sort_by"))
+IO_BUILT_INS = frozenset(("print",))
+
+FRESH_NODES = frozenset(
+    (
+        INTEGER_LITERAL_NODE_CLASS,
+        FLOAT_LITERAL_NODE_CLASS,
+        STRING_LITERAL_NODE_CLASS,
+        BOOLEAN_LITERAL_NODE_CLASS,
+        NONE_LITERAL_NODE_CLASS,
+        ARRAY_LITERAL_NODE_CLASS,
+        UNARY_OP_NODE_CLASS,
+    )
+)
+# && and || evaluate to one of their operands, every other operation to a new value
+ALIASING_OPS = frozenset((T_AND_ENUM_VAL, T_OR_ENUM_VAL))
+
+
+def own_statements(block):
+    """Every statement of block, those inside of ifs and loops included, but not
+    those of the functions it declares."""
+    pending = list(block.block)
+    while pending:
+        construct = pending.pop()
+        yield construct
+        type_construct = type(construct)
+        if type_construct is IF_NODE_CLASS:
+            pending.extend(construct.body.block)
+            for branch in construct.elif_branch.block + construct.else_branch.block:
+                pending.extend(branch.body.block)
+        elif type_construct is FOR_NODE_CLASS or type_construct is WHILE_NODE_CLASS:
+            pending.extend(construct.body.block)
+
+
+def target_names(left_hand):
+    """The variables an assignment target binds."""
+    type_left_hand = type(left_hand)
+    if type_left_hand is IDENTIFIER_NODE_CLASS:
+        return [left_hand.value]
+    if type_left_hand is ARRAY_LITERAL_NODE_CLASS:
+        names = []
+        for element in left_hand.elements:
+            names.extend(target_names(element.root_expr))
+        return names
+    return []
+
+
+def activation_names(root):
+    """Every variable a call of the function binds."""
+    names = {root.arg_list_name}
+    for construct in own_statements(root.body):
+        type_construct = type(construct)
+        if type_construct is ASSIGNMENT_NODE_CLASS:
+            names.update(target_names(construct.left_hand))
+        elif type_construct is FOR_NODE_CLASS:
+            names.add(construct.variable.value)
+        elif type_construct is FUNCTION_NODE_CLASS or type_construct is DATA_CLASS_NODE_CLASS:
+            names.add(construct.name)
+    return names
+
+
+class EffectAnalysis:
+    def __init__(self, roots, built_in_names):
+        self.roots = roots
+        self.built_in_names = frozenset(built_in_names)
+        # name -> how many places in the program bind it
+        self.binding_count = {}
+        # name -> the FunctionNode / DataClassNode declaring it at the top level
+        self.declared = {}
+        # (FunctionNode, enclosing FunctionNodes) of every function
+        self.functions = []
+        # every variable bound outside of the functions
+        self.global_names = set()
+        # id(FunctionNode) -> EffectSummary
+        self.effects = {}
+        # id(FunctionNode) -> {id: FunctionNode} of the functions it calls by a name
+        # that always refers to them
+        self.callees = {}
+
+    def analyze(self):
+        self.collect(self.roots, (), top_level=True)
+        for root, enclosing in self.functions:
+            self.effects[id(root)] = self.summarize(root, enclosing)
+        self.propagate()
+
+        for root, _ in self.functions:
+            summary = self.effects[id(root)]
+            summary.memoize = (
+                summary.cacheable and not summary.tail_calls and summary.self_calls > 1
+            )
+            root.effects = summary
+        return self.effects
+
+    # -------------------------------------------
+    # BINDINGS START
+    # -------------------------------------------
+
+    def bind(self, name, enclosing):
+        self.binding_count[name] = self.binding_count.get(name, 0) + 1
+        if not enclosing:
+            self.global_names.add(name)
+
+    def collect(self, constructs, enclosing, top_level):
+        # top_level is true for the statements run at most once, outside of any
+        # function or loop
+        for construct in constructs:
+            type_construct = type(construct)
+            if type_construct is ASSIGNMENT_NODE_CLASS:
+                for name in target_names(construct.left_hand):
+                    self.bind(name, enclosing)
+            elif type_construct is IF_NODE_CLASS:
+                self.collect(construct.body.block, enclosing, top_level)
+                for branch in construct.elif_branch.block + construct.else_branch.block:
+                    self.collect(branch.body.block, enclosing, top_level)
+            elif type_construct is FOR_NODE_CLASS:
+                self.bind(construct.variable.value, enclosing)
+                self.collect(construct.body.block, enclosing, False)
+            elif type_construct is WHILE_NODE_CLASS:
+                self.collect(construct.body.block, enclosing, False)
+            elif type_construct is FUNCTION_NODE_CLASS:
+                self.bind(construct.name, enclosing)
+                if top_level:
+                    self.declared[construct.name] = construct
+                self.functions.append((construct, enclosing))
+                inner = enclosing + (construct,)
+                self.bind(construct.arg_list_name, inner)
+                self.collect(construct.body.block, inner, False)
+            elif type_construct is DATA_CLASS_NODE_CLASS:
+                self.bind(construct.name, enclosing)
+                if top_level:
+                    self.declared[construct.name] = construct
+
+    def stable(self, name):
+        """What name always refers to: the FunctionNode or DataClassNode declaring it,
+        the name itself for a builtin, None when it can refer to different values."""
+        count = self.binding_count.get(name, 0)
+        if count == 0 and name in self.built_in_names:
+            return name
+        if count == 1:
+            return self.declared.get(name)
+        return None
+
+    # -------------------------------------------
+    # BINDINGS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # SUMMARIES START
+    # -------------------------------------------
+
+    def summarize(self, root, enclosing):
+        summary = EFFECT_SUMMARY_CLASS(name=root.name)
+        self.callees[id(root)] = callees = {}
+
+        # a function assigning a variable of an enclosing scope writes to that
+        # variable, not to one of its own. whether a global exists yet when the
+        # function is called isn't known here, so every global counts
+        outer = self.global_names | self.built_in_names
+        for function in enclosing:
+            outer |= activation_names(function)
+        own = activation_names(root)
+        summary.writes_captured = sorted(own & outer)
+        local_names = own - outer
+
+        # locals only ever bound to a new value, which the function may change as it pleases
+        fresh = dict.fromkeys(local_names, True)
+        fresh[root.arg_list_name] = False
+        for construct in own_statements(root.body):
+            type_construct = type(construct)
+            if type_construct is ASSIGNMENT_NODE_CLASS:
+                left_hand = construct.left_hand
+                if type(left_hand) is IDENTIFIER_NODE_CLASS:
+                    if construct.op == T_ASSIGN_ENUM_VAL and not self.is_fresh(
+                        construct.right_hand
+                    ):
+                        fresh[left_hand.value] = False
+                else:
+                    for name in target_names(left_hand):
+                        fresh[name] = False
+            elif type_construct is FOR_NODE_CLASS:
+                fresh[construct.variable.value] = False
+
+        walker = _BodyWalker(self, root, summary, local_names, fresh, callees)
+        for construct in own_statements(root.body):
+            walker.walk_statement(construct)
+        return summary
+
+    def is_fresh(self, root):
+        if type(root) is EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+        type_root = type(root)
+        if type_root in FRESH_NODES:
+            return True
+        if type_root is BIN_OP_NODE_CLASS:
+            return root.op not in ALIASING_OPS
+        if type_root is CALL_NODE_CLASS and type(root.name) is IDENTIFIER_NODE_CLASS:
+            target = self.stable(root.name.value)
+            if type(target) is str:
+                return target in FRESH_BUILT_INS
+            return type(target) is DATA_CLASS_NODE_CLASS
+        return False
+
+    def propagate(self):
+        # calling an impure function is impure, and returning what a function that
+        # allocates returned may return a new identity, until nothing changes
+        changed = True
+        while changed:
+            changed = False
+            for root, _ in self.functions:
+                summary = self.effects[id(root)]
+                for callee in self.callees[id(root)].values():
+                    callee_summary = self.effects[id(callee)]
+                    if not callee_summary.pure and callee.name not in summary.calls_impure:
+                        summary.calls_impure.append(callee.name)
+                        changed = True
+                    if callee_summary.allocates and not summary.allocates:
+                        summary.allocates = True
+                        changed = True
+
+    # -------------------------------------------
+    # SUMMARIES END
+    # -------------------------------------------
+
+
+class _BodyWalker:
+    # the walk over the statements of one function body that fills in its summary
+    def __init__(self, analysis, root, summary, local_names, fresh, callees):
+        self.analysis = analysis
+        self.root = root
+        self.summary = summary
+        self.local_names = local_names
+        self.fresh = fresh
+        self.callees = callees
+
+    def walk_statement(self, construct):
+        type_construct = type(construct)
+        if type_construct is ASSIGNMENT_NODE_CLASS:
+            self.walk_expression(construct.right_hand)
+            self.walk_target(construct.left_hand, construct.op != T_ASSIGN_ENUM_VAL)
+        elif type_construct is IF_NODE_CLASS:
+            self.walk_expression(construct.condition)
+            for branch in construct.elif_branch.block:
+                self.walk_expression(branch.condition)
+        elif type_construct is FOR_NODE_CLASS:
+            self.walk_expression(construct.bound)
+        elif type_construct is WHILE_NODE_CLASS:
+            self.walk_expression(construct.condition)
+        elif type_construct is RETURN_NODE_CLASS:
+            self.walk_expression(construct.expression, tail=True)
+        elif type_construct is FUNCTION_NODE_CLASS or type_construct is DATA_CLASS_NODE_CLASS:
+            self.summary.allocates = True
+        elif type_construct is EXPRESSION_NODE_CLASS or type_construct is CALL_NODE_CLASS:
+            self.walk_expression(construct)
+
+    def walk_target(self, left_hand, compound):
+        type_left_hand = type(left_hand)
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            # x += 1 reads x first
+            if compound:
+                self.read(left_hand.value)
+        elif type_left_hand is ARRAY_LITERAL_NODE_CLASS:
+            for element in left_hand.elements:
+                self.walk_target(element.root_expr, compound)
+        else:
+            # down to the variable holding what is changed, a[0].x = 1 changes a[0]
+            base = left_hand
+            depth = 0
+            while True:
+                type_base = type(base)
+                if type_base is EXPRESSION_NODE_CLASS:
+                    base = base.root_expr
+                elif type_base is INDEX_NODE_CLASS:
+                    for index in base.index:
+                        self.walk_expression(index)
+                    depth += len(base.index)
+                    base = base.base
+                elif type_base is FIELD_ACCESS_NODE_CLASS:
+                    depth += len(base.field)
+                    base = base.base
+                else:
+                    break
+            if type_base is not IDENTIFIER_NODE_CLASS:
+                self.walk_expression(base)
+                self.mutates(DYNAMIC_EFFECT)
+                return
+            name = base.value
+            self.read(name)
+            # a[0][1] = 1 changes a[0], which may be anything
+            if depth != 1 or name not in self.local_names or not self.fresh.get(name):
+                self.mutates(name)
+
+    def walk_expression(self, root, tail=False):
+        type_root = type(root)
+        if type_root is EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+            type_root = type(root)
+
+        if type_root is IDENTIFIER_NODE_CLASS:
+            self.read(root.value)
+        elif type_root is BIN_OP_NODE_CLASS:
+            self.walk_expression(root.left)
+            self.walk_expression(root.right)
+        elif type_root is UNARY_OP_NODE_CLASS:
+            self.walk_expression(root.operand)
+        elif type_root is ARRAY_LITERAL_NODE_CLASS:
+            for element in root.elements:
+                self.walk_expression(element)
+        elif type_root is INDEX_NODE_CLASS:
+            for index in root.index:
+                self.walk_expression(index)
+            self.walk_expression(root.base)
+        elif type_root is FIELD_ACCESS_NODE_CLASS:
+            self.walk_expression(root.base)
+        elif type_root is CALL_NODE_CLASS:
+            if type(root.name) is IDENTIFIER_NODE_CLASS:
+                self.call(root.name.value, tail)
+            else:
+                self.walk_expression(root.name)
+                self.calls_impure(DYNAMIC_EFFECT)
+                self.summary.tail_calls |= tail
+            for arg in root.args:
+                self.walk_expression(arg)
+
+    def read(self, name):
+        if name in self.local_names or self.analysis.stable(name) is not None:
+            return
+        if name not in self.summary.reads_mutable:
+            self.summary.reads_mutable.append(name)
+
+    def call(self, name, tail):
+        summary = self.summary
+        target = None if name in self.local_names else self.analysis.stable(name)
+        if target is None:
+            self.calls_impure(name)
+            summary.tail_calls |= tail
+        elif type(target) is str:
+            if target in IO_BUILT_INS:
+                summary.io = True
+            elif target not in PURE_BUILT_INS:
+                self.calls_impure(name)
+        elif type(target) is DATA_CLASS_NODE_CLASS:
+            summary.allocates = True
+        else:
+            if tail:
+                summary.tail_calls = True
+            elif target is self.root:
+                summary.self_calls += 1
+            if target is not self.root:
+                self.callees[id(target)] = target
+
+    def calls_impure(self, name):
+        if name not in self.summary.calls_impure:
+            self.summary.calls_impure.append(name)
+
+    def mutates(self, name):
+        if name not in self.summary.mutates:
+            self.summary.mutates.append(name)
+
+
+def describe(summary):
+    """One line saying what calling the function can do, as printed by --effects."""
+    if summary.pure:
+        # calls of a pure function don't depend on each other, so they could also
+        # run in any order, or at the same time
+        kinds = ["pure", "parallelizable"]
+        if summary.cacheable:
+            kinds.append("cacheable")
+        if summary.memoize:
+            kinds.append("memoized")
+        return f"{summary.name}: {', '.join(kinds)}"
+
+    reasons = ["prints"] if summary.io else []
+    for label, names in (
+        ("writes", summary.writes_captured),
+        ("mutates", summary.mutates),
+        ("reads", summary.reads_mutable),
+        ("calls", summary.calls_impure),
+    ):
+        if names:
+            reasons.append(f"{label} {', '.join(names)}")
+    return f"{summary.name}: impure ({'; '.join(reasons)})"
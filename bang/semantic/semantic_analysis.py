@@ -84,6 +84,7 @@ from bang.parsing.parser_nodes import (
     UNARY_OP_NODE_CLASS,
     WHILE_NODE_CLASS,
 )
+from bang.semantic.effect_analysis import EffectAnalysis
 from bang.semantic.semantic_nodes import (
     ARRAY_TYPE_CLASS,
     BOOL_TYPE_CLASS,
@@ -254,6 +255,11 @@ class SemanticAnalysis:
         "set": SET_TYPE_CLASS,
         "dict": DICT_TYPE_CLASS,
         "range": FUNCTION_TYPE_CLASS,
+        "memo": FUNCTION_TYPE_CLASS,
+        "memo_stats": FUNCTION_TYPE_CLASS,
+        "table": FUNCTION_TYPE_CLASS,
+        "where": FUNCTION_TYPE_CLASS,
+        "sort_by": FUNCTION_TYPE_CLASS,
     }
 
     LITERALS = {
@@ -264,6 +270,37 @@ class SemanticAnalysis:
         NONE_LITERAL_NODE_CLASS: NONE_TYPE_CLASS,
     }
 
+    # the types && and || keep when both their operands have it
+    SHORT_CIRCUIT_TYPES = frozenset(
+        (
+            NUMBER_TYPE_CLASS,
+            BOOL_TYPE_CLASS,
+            STRING_TYPE_CLASS,
+            ARRAY_TYPE_CLASS,
+            SET_TYPE_CLASS,
+            DICT_TYPE_CLASS,
+        )
+    )
+
+    # the comparison that holds when a comparison fails, a < b fails when a >= b holds
+    NEGATED_COMPARISONS = {
+        T_EQ_ENUM_VAL: T_NEQ_ENUM_VAL,
+        T_NEQ_ENUM_VAL: T_EQ_ENUM_VAL,
+        T_LT_ENUM_VAL: T_GTEQ_ENUM_VAL,
+        T_LEQ_ENUM_VAL: T_GT_ENUM_VAL,
+        T_GT_ENUM_VAL: T_LEQ_ENUM_VAL,
+        T_GTEQ_ENUM_VAL: T_LT_ENUM_VAL,
+    }
+    # the same comparison with its operands swapped, a < b is b > a
+    MIRRORED_COMPARISONS = {
+        T_EQ_ENUM_VAL: T_EQ_ENUM_VAL,
+        T_NEQ_ENUM_VAL: T_NEQ_ENUM_VAL,
+        T_LT_ENUM_VAL: T_GT_ENUM_VAL,
+        T_LEQ_ENUM_VAL: T_GTEQ_ENUM_VAL,
+        T_GT_ENUM_VAL: T_LT_ENUM_VAL,
+        T_GTEQ_ENUM_VAL: T_LEQ_ENUM_VAL,
+    }
+
     ARITH_OPS = {
         T_PLUS_ENUM_VAL,
         T_MINUS_ENUM_VAL,
@@ -350,10 +387,19 @@ class SemanticAnalysis:
         # because if we see a break outside of a loop for example we can throw an error
         self.loop_depth = 0
         self.func_depth = 0
+        # (left operand, whether it held) of the && and || whose right operand we are
+        # in. the right operand of && only runs once its left one held, the one of ||
+        # once it failed, so an index out of bounds in it may be just what the left
+        # operand guards against (i < len{a} && a[i], see index_guarded)
+        self.guards = []
+        # id(FunctionNode) -> EffectSummary, once the program is walked
+        self.effects = {}
 
     def walk_program(self):
         for construct in self.roots:
             self.walk_construct(construct)
+        # what every function's calls can do, see effect_analysis.py
+        self.effects = EffectAnalysis(self.roots, self.BUILT_IN_FUNCTIONS).analyze()
 
     # could probably use this walk_construct more
     # typically but its clearer to just call the specific expression
@@ -683,43 +729,43 @@ class SemanticAnalysis:
             right_hand_value = right_hand.value
             left_hand_elements = left_hand.elements
             len_left_hand_elements = len(left_hand_elements)
-            if type_right_hand is not DYNAMIC_TYPE_CLASS:
-                if type_right_hand is not ARRAY_TYPE_CLASS:
-                    raise SemanticError(
-                        self.file,
-                        "multi-initialization requires right hand"
-                        " to be dynamic type or static array type",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    )
-                if len_left_hand_elements > len(right_hand_value):
-                    raise SemanticError(
-                        self.file,
-                        "multi-initialization requires right hand length "
-                        "to be equal to or greater than left hand length",
-                        root.meta_data.line,
-                        root.meta_data.column_start,
-                        root.meta_data.column_end,
-                    )
-
-                rhs_types = (
-                    right_hand_value
-                    if type_right_hand is ARRAY_TYPE_CLASS
-                    else [DYNAMIC_TYPE_CLASS()] * len_left_hand_elements
+            if type_right_hand not in (DYNAMIC_TYPE_CLASS, ARRAY_TYPE_CLASS):
+                raise SemanticError(
+                    self.file,
+                    "multi-initialization requires right hand"
+                    " to be dynamic type or static array type",
+                    root.meta_data.line,
+                    root.meta_data.column_start,
+                    root.meta_data.column_end,
+                )
+            # an array whose elements aren't known statically (a range, or the
+            # result of an operation) is as good as a dynamic value here
+            known = type_right_hand is ARRAY_TYPE_CLASS and right_hand_value is not None
+            if known and len_left_hand_elements > len(right_hand_value):
+                raise SemanticError(
+                    self.file,
+                    "multi-initialization requires right hand length "
+                    "to be equal to or greater than left hand length",
+                    root.meta_data.line,
+                    root.meta_data.column_start,
+                    root.meta_data.column_end,
                 )
 
-                dispatch = {
-                    IDENTIFIER_NODE_CLASS: walk_assignment_typical,
-                    INDEX_NODE_CLASS: walk_assignment_index,
-                    ARRAY_LITERAL_NODE_CLASS: walk_assignment_multi,  # nested destructuring
-                    FIELD_ACCESS_NODE_CLASS: walk_assignment_field_access,
-                }
+            rhs_types = (
+                right_hand_value if known else [DYNAMIC_TYPE_CLASS()] * len_left_hand_elements
+            )
 
-                for i, n in enumerate(left_hand_elements):
-                    left_hand_node = n.root_expr
-                    rhs_type = rhs_types[i] if i < len(rhs_types) else DYNAMIC_TYPE_CLASS
-                    dispatch[type(left_hand_node)](left_hand_node, op_type_id, rhs_type)
+            dispatch = {
+                IDENTIFIER_NODE_CLASS: walk_assignment_typical,
+                INDEX_NODE_CLASS: walk_assignment_index,
+                ARRAY_LITERAL_NODE_CLASS: walk_assignment_multi,  # nested destructuring
+                FIELD_ACCESS_NODE_CLASS: walk_assignment_field_access,
+            }
+
+            for i, n in enumerate(left_hand_elements):
+                left_hand_node = n.root_expr
+                rhs_type = rhs_types[i] if i < len(rhs_types) else DYNAMIC_TYPE_CLASS
+                dispatch[type(left_hand_node)](left_hand_node, op_type_id, rhs_type)
 
         find_assignment_type = {
             IDENTIFIER_NODE_CLASS: walk_assignment_typical,
@@ -732,6 +778,93 @@ class SemanticAnalysis:
             root_left_hand, root.op, self.walk_expression(root.right_hand.root_expr)
         )
 
+    def index_guarded(self, index, index_value):
+        # an index is only left to be checked at runtime when the left operand of an
+        # enclosing && or || keeps it in bounds whenever the right operand runs
+        return any(
+            self.keeps_in_bounds(guard, held, index, index_value) for guard, held in self.guards
+        )
+
+    def keeps_in_bounds(self, root, held, index, index_value):
+        # whether root evaluating to held means index is in bounds: it limits the
+        # index from above (or from below when it's negative), or a length from below
+        if type(root) is self.EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+        if type(root) is self.UNARY_OP_NODE_CLASS:
+            if root.op != self.T_NEGATE_ENUM_VAL:
+                return False
+            return self.keeps_in_bounds(root.operand, not held, index, index_value)
+        if type(root) is not self.BIN_OP_NODE_CLASS:
+            return False
+
+        op = root.op
+        if op == self.T_AND_ENUM_VAL or op == self.T_OR_ENUM_VAL:
+            left = self.keeps_in_bounds(root.left, held, index, index_value)
+            right = self.keeps_in_bounds(root.right, held, index, index_value)
+            # a held && and a failed || tell both operands did the same,
+            # the other two only that one of them did
+            if (op == self.T_AND_ENUM_VAL) == held:
+                return left or right
+            return left and right
+        if op not in self.NEGATED_COMPARISONS:
+            return False
+
+        if not held:
+            op = self.NEGATED_COMPARISONS[op]
+        return self.limits_index(root.left, op, index, index_value) or self.limits_index(
+            root.right, self.MIRRORED_COMPARISONS[op], index, index_value
+        )
+
+    def limits_index(self, side, op, index, index_value):
+        # whether "side op <anything>" holding limits the index
+        if self.is_len_call(side):
+            return op in (self.T_GT_ENUM_VAL, self.T_GTEQ_ENUM_VAL, self.T_EQ_ENUM_VAL)
+        if not self.same_expression(side, index):
+            return False
+        if op in (self.T_LT_ENUM_VAL, self.T_LEQ_ENUM_VAL, self.T_EQ_ENUM_VAL):
+            return True
+        return (
+            op in (self.T_GT_ENUM_VAL, self.T_GTEQ_ENUM_VAL)
+            and type(index_value) is int
+            and index_value < 0
+        )
+
+    def is_len_call(self, root):
+        if type(root) is self.EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+        return (
+            type(root) is self.CALL_NODE_CLASS
+            and type(root.name) is self.IDENTIFIER_NODE_CLASS
+            and root.name.value == "len"
+        )
+
+    def same_expression(self, a, b):
+        # the same source expression, wherever in the program it is written
+        if type(a) is self.EXPRESSION_NODE_CLASS:
+            a = a.root_expr
+        if type(b) is self.EXPRESSION_NODE_CLASS:
+            b = b.root_expr
+        type_a = type(a)
+        if type_a is not type(b):
+            return False
+        if type_a is self.IDENTIFIER_NODE_CLASS or type_a in self.LITERALS:
+            return a.value == b.value
+        if type_a is self.BIN_OP_NODE_CLASS:
+            return (
+                a.op == b.op
+                and self.same_expression(a.left, b.left)
+                and self.same_expression(a.right, b.right)
+            )
+        if type_a is self.UNARY_OP_NODE_CLASS:
+            return a.op == b.op and self.same_expression(a.operand, b.operand)
+        if type_a is self.INDEX_NODE_CLASS:
+            return (
+                len(a.index) == len(b.index)
+                and self.same_expression(a.base, b.base)
+                and all(map(self.same_expression, a.index, b.index))
+            )
+        return False
+
     def walk_expression(self, root):
         DYNAMIC_TYPE_CLASS = self.DYNAMIC_TYPE_CLASS
 
@@ -748,11 +881,21 @@ class SemanticAnalysis:
             return DYNAMIC_TYPE_CLASS()
 
         elif type_root is self.BIN_OP_NODE_CLASS:
+            root_type_id = root.op
             left = self.walk_expression(root.left)
+            if root_type_id == self.T_AND_ENUM_VAL or root_type_id == self.T_OR_ENUM_VAL:
+                self.guards.append((root.left, root_type_id == self.T_AND_ENUM_VAL))
+                try:
+                    right = self.walk_expression(root.right)
+                finally:
+                    self.guards.pop()
+                # the result is whichever operand decided it
+                if type(left) is type(right) and type(left) in self.SHORT_CIRCUIT_TYPES:
+                    return type(left)(value=None)
+                return DYNAMIC_TYPE_CLASS()
             right = self.walk_expression(root.right)
             type_left = type(left)
             type_right = type(right)
-            root_type_id = root.op
 
             if type_left is DYNAMIC_TYPE_CLASS or type_right is DYNAMIC_TYPE_CLASS:
                 return DYNAMIC_TYPE_CLASS()
@@ -897,7 +1040,7 @@ class SemanticAnalysis:
             if not base_value or type_base is self.DICT_TYPE_CLASS:
                 return DYNAMIC_TYPE_CLASS()
 
-            for _pos, idx in enumerate(indexes):
+            for pos, idx in enumerate(indexes):
                 idx_value = idx.value
                 if type_base not in (self.ARRAY_TYPE_CLASS, self.STRING_TYPE_CLASS):
                     raise SemanticError(
@@ -915,6 +1058,8 @@ class SemanticAnalysis:
                     try:
                         base = element_list[idx_value]
                     except (IndexError, TypeError, KeyError):
+                        if self.index_guarded(root.index[pos], idx_value):
+                            return DYNAMIC_TYPE_CLASS()
                         raise SemanticError(
                             self.file,
                             "Index out of bounds",
@@ -1019,9 +1164,17 @@ class SemanticAnalysis:
                     expected_return.append(arg)
                 return self.DICT_TYPE_CLASS(value=expected_return)
 
+            def walk_built_in_range(root):
+                for arg in root.args:
+                    self.walk_expression(arg.root_expr)
+                # an array, but a lazy one (see lazy_range in evaluator_nodes.py),
+                # whose elements are only known at runtime
+                return self.ARRAY_TYPE_CLASS(value=None)
+
             built_in_to_walk = {
                 "set": walk_built_in_set,
                 "dict": walk_built_in_dict,
+                "range": walk_built_in_range,
             }
 
             root_args = root.args
@@ -1081,9 +1234,9 @@ class SemanticAnalysis:
             # with type checking for every built in function, this will change
             # from hardcode to like self.builtintypes or something
             root_name_value = root.name.value
-            if root_name_value in built_in_to_walk and type_callee_type in (
-                self.SET_TYPE_CLASS,
-                self.DICT_TYPE_CLASS,
+            if root_name_value in built_in_to_walk and (
+                type_callee_type in (self.SET_TYPE_CLASS, self.DICT_TYPE_CLASS)
+                or callee_type.value is None
             ):
                 return built_in_to_walk[root_name_value](root)
 
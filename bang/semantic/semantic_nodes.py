@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 from bang.parsing.parser_nodes import BlockNode
@@ -70,11 +70,52 @@ class InstanceType:
     fields: dict[str, Any]
 
 
+# what calling a function can do besides working out its result, put on every
+# FunctionNode by the semantic pass (see effect_analysis.py). the lists name the
+# variables or callees responsible, DYNAMIC_EFFECT standing in for a value that
+# isn't a variable (args[0]{} or f{}[0] = 1)
+@dataclass(slots=True)
+class EffectSummary:
+    name: str
+    io: bool = False  # prints
+    writes_captured: list[str] = field(default_factory=list)
+    # index or field assignments to values the call may not have created itself
+    mutates: list[str] = field(default_factory=list)
+    # enclosing variables that may hold something else from one call to the next
+    reads_mutable: list[str] = field(default_factory=list)
+    calls_impure: list[str] = field(default_factory=list)
+    # creates instances, functions or dataclasses, a new identity on every call
+    allocates: bool = False
+    self_calls: int = 0  # calls of itself outside of tail position
+    tail_calls: bool = False
+    # its calls are cached automatically, see memoized_function
+    memoize: bool = False
+
+    @property
+    def pure(self) -> bool:
+        # nothing a call does can be seen outside of it, and nothing outside of it
+        # but its arguments decides what it returns
+        return not (
+            self.io
+            or self.writes_captured
+            or self.mutates
+            or self.reads_mutable
+            or self.calls_impure
+        )
+
+    @property
+    def cacheable(self) -> bool:
+        return self.pure and not self.allocates
+
+
+DYNAMIC_EFFECT = "<dynamic>"
+
 ARRAY_TYPE_CLASS = ArrayType
 BOOL_TYPE_CLASS = BoolType
 DATA_CLASS_TYPE_CLASS = DataClassType
 DICT_TYPE_CLASS = DictType
 DYNAMIC_TYPE_CLASS = DynamicType
+EFFECT_SUMMARY_CLASS = EffectSummary
 FUNCTION_TYPE_CLASS = FunctionType
 INSTANCE_TYPE_CLASS = InstanceType
 NONE_TYPE_CLASS = NoneType
@@ -270,6 +270,22 @@ def analyze(code: str, tmp_path):
         "fn bar args\n return 5\nend\nx = bar{} + true\n",
         "fn bar args\n return 5\nend\nx = bar{} + false\n",
         'fn bar args\n return 5\nend\nx = bar{} + "3"\n',
+        # range{} is an array whose elements are only known at runtime
+        "[a, b] = range{5}\nprint{a + b}\n",
+        "r = range{3}; r[0] = 1; r += [4]\n",
+        "r = range{3}; x = r[9]\n",
+        "fn range args; return 1; end; x = range{} + 1\n",
+        "fn bar args\n return [1, 2]\nend\n[a, b] = bar{}\nprint{a, b}\n",
+        "[a, b] = [1] + [2]\nprint{a}\n",
+        # the right operand of && and || only runs when the left one lets it
+        "a = [1]\nx = len{a} > 3 && a[3]\n",
+        "a = [1]\nx = len{a} < 3 || a[1 + 2] + 1\n",
+        "a = [1]\ni = 4\nif i >= 0 && i < 1 && a[i] > 0\nprint{a}\nend\n",
+        "a = [1]\nx = 3 < len{a} && a[3]\n",
+        "a = [1]\nx = !(len{a} > 3) || a[3]\n",
+        "a = [1]\ni = 4\nx = i >= 1 || a[i]\n",
+        "a = [1]\ni = -4\nx = i >= 0 && a[i]\n",
+        'x = (1 && "s") + 1\n',
     ],
 )
 def test_semantic_valid(program, tmp_path):
@@ -413,9 +429,111 @@ def test_semantic_valid(program, tmp_path):
         "data Car [model_type, engine_type, color_type]; car = Car{}; car.model_type = [1]; car.model_type[1] = 1\n",
         "data B [z]; b = B{[0]}; print{b.z[1]}\n",
         "data P [x]; p = P{1}; p{}\n",
+        "x = range{3} + 1\n",
+        'x = range{3}["a"]\n',
+        "x = set{range{3}, 1}\n",
+        # && and || of two strings is a string
+        'x = ("a" && "b") - 1\n',
+        "a = [1]\nx = a[3] && len{a} > 3\n",
+        # a left operand that doesn't limit the index doesn't guard it
+        "x = [1, 2]\nif x[0] > 0 && x[5] > 0\nprint{x}\nend\n",
+        "x = [1, 2]\nj = 0\ni = 5\nif j < 1 && x[i] > 0\nprint{x}\nend\n",
+        # nor does one limiting it in the wrong direction, or on the other path
+        "arr = [1]\nx = len{arr} > 5 || arr[3] == 1\n",
+        "arr = [1]\nx = len{arr} < 5 && arr[3] == 1\n",
+        "arr = [1]\nx = 5 > len{arr} && arr[3] == 1\n",
+        "arr = [1]\nx = !(len{arr} > 5) && arr[3] == 1\n",
+        "arr = [1]\ni = 3\nx = i < 1 || arr[i] == 1\n",
+        "arr = [1]\ni = 3\nx = i > 0 && arr[i] == 1\n",
+        "arr = [1]\ni = 3\nx = (i < 1 || len{arr} > 9) || arr[i] == 1\n",
     ],
 )
 def test_semantic_invalid(program, tmp_path):
     """Each program here should raise a *SemanticError*."""
     with pytest.raises(SemanticError):
         analyze(program, tmp_path)
+
+
+# ----------------------------
+# Effects
+# ----------------------------
+def effects(code: str, tmp_path):
+    """The EffectSummary of every function in the program, by name."""
+    return {summary.name: summary for summary in analyze(code, tmp_path).effects.values()}
+
+
+FIB = "fn fib args; n = args[0]; if n < 2; return n; end; return fib{n - 1} + fib{n - 2}; end\n"
+
+
+def test_tree_recursive_pure_functions_are_memoized(tmp_path):
+    fib = effects(FIB, tmp_path)["fib"]
+    assert fib.pure and fib.cacheable and fib.memoize
+    assert fib.self_calls == 2
+
+
+@pytest.mark.parametrize(
+    "program, field, expected",
+    [
+        ("fn f a; print{a}; end\n", "io", True),
+        ("x = 1\nfn f a; x = 2; end\n", "writes_captured", ["x"]),
+        ("fn f a; for i 3; end; end\ni = 0\n", "writes_captured", ["i"]),
+        ("fn f a; a[0] = 1; end\n", "mutates", ["a"]),
+        ("fn f a; b = a[0]; b[0] = 1; end\n", "mutates", ["b"]),
+        ("fn f a; r = [a[0]]; r[0][0] = 1; end\n", "mutates", ["r"]),
+        ("data P [x]\nfn f a; a[0].x = 1; end\n", "mutates", ["a"]),
+        ("fn f a; f{}[0] = 1; end\n", "mutates", ["<dynamic>"]),
+        ("x = 1\nfn f a; return x; end\nx = 2\n", "reads_mutable", ["x"]),
+        ("fn f a; return a[0]{1}; end\n", "calls_impure", ["<dynamic>"]),
+        ("fn g a; print{a}; end\nfn f a; return g{a} + 1; end\n", "calls_impure", ["g"]),
+        # impurity travels up any number of calls, in any order
+        (
+            "fn h a; print{a}; end\nfn g a; return h{a} + 1; end\nfn f a; return g{a} + 1; end\n",
+            "calls_impure",
+            ["g"],
+        ),
+        # a function declared in a loop is a different one every iteration
+        (
+            "for i 2\nfn g a; return 1; end\nfn f a; return g{} + 1; end\nend\n",
+            "calls_impure",
+            ["g"],
+        ),
+        ("fn f a; return len{a}; end\nlen = max\n", "calls_impure", ["len"]),
+        ("fn f a; return memo_stats{a[0]}; end\n", "calls_impure", ["memo_stats"]),
+    ],
+)
+def test_impure_functions(program, field, expected, tmp_path):
+    f = effects(program, tmp_path)["f"]
+    assert getattr(f, field) == expected
+    assert not f.pure and not f.memoize
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        "fn f a; r = []; for i a[0]; r += [i]; end; r[0] = 5; return r; end\n",
+        "data P [x]\nfn f a; p = P{1}; p.x = a[0]; return p.x; end\n",
+        "fn f a; s = set{a}; d = dict{}; d[1] = s; return len{d}; end\n",
+        "fn g a; return a[0] * 2; end\nfn f a; return g{a[0]} + sum{a}; end\n",
+        # writing a name only used inside of the function
+        "fn f a; y = 1; return y; end\n",
+    ],
+)
+def test_pure_functions(program, tmp_path):
+    assert effects(program, tmp_path)["f"].pure
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        # a new instance or function every call
+        "data P [x]\nfn f a; if a[0]; return [f{0}, f{0}]; end; return P{1}; end\n",
+        "fn f a; fn g b; return 1; end; if a[0]; return [f{0}, f{0}]; end; return g; end\n",
+        # calls in tail position have to run in constant stack
+        "fn f a; if a[0] < 2; return a[1]; end; return f{a[0] - 1, a[0] * f{1, 1}}; end\n",
+        # only one call of itself, there's nothing to share
+        "fn f a; if a[0] < 2; return 1; end; return a[0] * f{a[0] - 1}; end\n",
+    ],
+)
+def test_pure_functions_that_arent_memoized(program, tmp_path):
+    f = effects(program, tmp_path)["f"]
+    assert f.pure and not f.memoize
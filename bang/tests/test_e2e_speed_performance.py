@@ -54,16 +54,18 @@ def fmt_pct(x: float) -> str:
 # ----------------------------
 # In-proc timed pipeline
 # ----------------------------
-def timed_pipeline_inproc(bang_file: Path) -> Tuple[int, Dict[str, float]]:
+def timed_pipeline_inproc(bang_file: Path, fold: bool = True) -> Tuple[int, Dict[str, float]]:
     """
     Times the same end-to-end pipeline as bang.cli.run_file(), but returns per-phase timings.
     Phases:
-      lex, expr_split, expr_load, cf, sem, eval, total
+      lex, expr_split, expr_load, cf, sem, fold, eval, total
+    (fold is 0 when constant folding is turned off)
     """
     from bang.lexing.lexer import Lexer, LexerError
     from bang.parsing.expression_parser import ExpressionParser, ParserError
     from bang.parsing.control_flow_parser import ControlFlowParser
     from bang.semantic.semantic_analysis import SemanticAnalysis, SemanticError
+    from bang.optimizer.constant_folding import ConstantFolder
     from bang.runtime.evaluator import Evaluator, EvaluatorError
 
     t = {}
@@ -103,6 +105,13 @@ def timed_pipeline_inproc(bang_file: Path) -> Tuple[int, Dict[str, float]]:
         e1 = time.perf_counter()
         t["sem"] = e1 - e0
 
+        # constant folding
+        g0 = time.perf_counter()
+        if fold:
+            ConstantFolder(roots).fold()
+        g1 = time.perf_counter()
+        t["fold"] = g1 - g0
+
         # evaluation
         f0 = time.perf_counter()
         Evaluator(lex.text, roots).eval_program()
@@ -118,18 +127,18 @@ def timed_pipeline_inproc(bang_file: Path) -> Tuple[int, Dict[str, float]]:
         return 1, t
 
 
-def measure_inproc(bang_file: Path, iters: int, warmup: int) -> Dict[str, List[float]]:
+def measure_inproc(bang_file: Path, iters: int, warmup: int, fold: bool = True) -> Dict[str, List[float]]:
     # warmup
     for _ in range(warmup):
-        rc, _ = timed_pipeline_inproc(bang_file)
+        rc, _ = timed_pipeline_inproc(bang_file, fold)
         if rc != 0:
             raise RuntimeError(f"warmup failed for {bang_file} (rc={rc})")
 
     gc.disable()
-    series: Dict[str, List[float]] = {k: [] for k in ("lex", "expr_split", "expr_load", "cf", "sem", "eval", "total")}
+    series: Dict[str, List[float]] = {k: [] for k in ("lex", "expr_split", "expr_load", "cf", "sem", "fold", "eval", "total")}
     try:
         for _ in range(iters):
-            rc, t = timed_pipeline_inproc(bang_file)
+            rc, t = timed_pipeline_inproc(bang_file, fold)
             if rc != 0:
                 raise RuntimeError(f"run failed for {bang_file} (rc={rc})")
             for k in series.keys():
@@ -142,8 +151,12 @@ def measure_inproc(bang_file: Path, iters: int, warmup: int) -> Dict[str, List[f
 # ----------------------------
 # Subprocess mode (total only)
 # ----------------------------
-def measure_subproc_total_only(bang_file: Path, iters: int, warmup: int, module: str) -> List[float]:
+def measure_subproc_total_only(
+    bang_file: Path, iters: int, warmup: int, module: str, fold: bool = True
+) -> List[float]:
     cmd = [sys.executable, "-m", module, str(bang_file)]
+    if not fold:
+        cmd.append("--no-fold")
 
     for _ in range(warmup):
         r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -188,6 +201,7 @@ def print_phase_table(rows):
         f"{'load':>12} {'%':>6}  "
         f"{'cf':>12} {'%':>6}  "
         f"{'sem':>12} {'%':>6}  "
+        f"{'fold':>12} {'%':>6}  "
         f"{'eval':>12} {'%':>6}  "
         f"{'total':>12}"
     )
@@ -206,6 +220,7 @@ def print_phase_table(rows):
         load_s, load_p = cell("expr_load")
         cf_s, cf_p = cell("cf")
         sem_s, sem_p = cell("sem")
+        fold_s, fold_p = cell("fold")
         eval_s, eval_p = cell("eval")
 
         print(
@@ -215,6 +230,7 @@ def print_phase_table(rows):
             f"{load_s:>12} {load_p:>6}  "
             f"{cf_s:>12} {cf_p:>6}  "
             f"{sem_s:>12} {sem_p:>6}  "
+            f"{fold_s:>12} {fold_p:>6}  "
             f"{eval_s:>12} {eval_p:>6}  "
             f"{fmt_seconds(r['total_med']):>12}"
         )
@@ -230,11 +246,14 @@ def main():
     ap.add_argument("--warmup", type=int, default=10, help="warmup iterations per size")
     ap.add_argument("--module", default="bang.cli",
                     help="module for subproc mode (default: bang.cli)")
+    ap.add_argument("--no-fold", action="store_true",
+                    help="skip constant folding, to compare against a run with it")
     args = ap.parse_args()
 
     os.environ.setdefault("PYTHONHASHSEED", "0")
 
-    print(f"\nBang E2E benchmark | mode={args.mode} | iters={args.iters} | warmup={args.warmup}\n")
+    print(f"\nBang E2E benchmark | mode={args.mode} | iters={args.iters} | warmup={args.warmup} "
+          f"| fold={not args.no_fold}\n")
 
     rows = []
 
@@ -245,7 +264,7 @@ def main():
             bang_file = write_program(tmpdir, n)
 
             if args.mode == "inproc":
-                series = measure_inproc(bang_file, args.iters, args.warmup)
+                series = measure_inproc(bang_file, args.iters, args.warmup, not args.no_fold)
 
                 # total stats
                 tmin, tmed, tp95, tmax = summarize(series["total"])
@@ -263,14 +282,16 @@ def main():
                 }
 
                 # phase medians
-                for phase in ("lex", "expr_split", "expr_load", "cf", "sem", "eval"):
+                for phase in ("lex", "expr_split", "expr_load", "cf", "sem", "fold", "eval"):
                     _, pmed, _, _ = summarize(series[phase])
                     row[f"{phase}_med"] = pmed
 
                 rows.append(row)
 
             else:
-                total_times = measure_subproc_total_only(bang_file, args.iters, args.warmup, args.module)
+                total_times = measure_subproc_total_only(
+                    bang_file, args.iters, args.warmup, args.module, not args.no_fold
+                )
                 tmin, tmed, tp95, tmax = summarize(total_times)
                 per_line = tmed / n
                 lps = (1.0 / per_line) if per_line > 0 else float("inf")
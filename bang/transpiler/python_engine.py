@@ -0,0 +1,177 @@
+# runs bang programs by transpiling them to python source (see python_transpiler.py)
+# and handing that to compile()/exec, so the hot paths of a program run as cpython
+# bytecode instead of going through any bang dispatching at all.
+#
+# the generated code only ever calls back into the evaluator for the value level
+# semantics, and every error those raise is already an EvaluatorError pointing at
+# the bang source. the one error python raises on its own is NameError, for names the
+# evaluator would fail to find at run time, which is mapped back to the bang
+# statement it came from here
+
+from bang.runtime.binary_operations import add_in_place
+from bang.runtime.closure_compiler import ClosureCompiler
+from bang.runtime.evaluator import EvaluatorError
+from bang.transpiler.python_transpiler import (
+    PROGRAM_FUNCTION_NAME,
+    SOURCE_FILE_NAME,
+    PythonTranspiler,
+    UnsupportedProgram,
+    find_name_location,
+)
+
+
+class _TailCall:
+    __slots__ = ("callee", "args")
+
+    def __init__(self, callee, args):
+        self.callee = callee
+        self.args = args
+
+
+def tail_calls(body):
+    """Wrap the python function of a bang function with calls in tail position.
+    Those return a _TailCall instead of making the call, which is then made here,
+    in a loop, so tail recursion runs in constant stack."""
+
+    def run(args):
+        result = body(args)
+        while result.__class__ is _TailCall:
+            closure = result.callee.closure
+            # another function that returns tail calls runs unwrapped, so its own
+            # tail calls end up in this loop as well
+            result = getattr(closure, "tail_body", closure)(result.args)
+        return result
+
+    run.tail_body = body
+    return run
+
+
+class PythonEngine(ClosureCompiler):
+    def __init__(self, file, roots):
+        super().__init__(file, roots)
+        # None when the program runs on the closure compiler instead
+        self.transpiler = None
+
+    def transpile(self):
+        """Return the generated python source, or None when the program can't be
+        transpiled and runs on the closure compiler."""
+        transpiler = PythonTranspiler(self.roots, self.built_in_functions)
+        try:
+            source = transpiler.transpile()
+        except UnsupportedProgram:
+            self.transpiler = None
+            return None
+        self.transpiler = transpiler
+        self.call_sites = transpiler.call_sites
+        self.field_sites = transpiler.field_sites
+        return source
+
+    def eval_program(self):
+        source = self.transpile()
+        if source is None:
+            super().eval_program()
+            return
+
+        namespace = self.runtime_helpers()
+        namespace.update(self.transpiler.constants())
+        exec(compile(source, SOURCE_FILE_NAME, "exec"), namespace)
+        try:
+            program_locals = namespace[PROGRAM_FUNCTION_NAME]()
+        except NameError as e:
+            raise self.name_error(e) from None
+
+        # the outermost bang frame, so callers can look at the final state
+        # the same way they would after running any other engine
+        global_names = self.transpiler.global_names()
+        self.scope_stack[0].update(
+            (global_names[name], value)
+            for name, value in program_locals.items()
+            if name in global_names
+        )
+
+    def eval_call(self, callee, args, meta_data):
+        # functions created by generated code carry the python function they were
+        # transpiled to, the closure compiler's functions carry their frames
+        if self.transpiler is not None:
+            return callee.closure(args)
+        return super().eval_call(callee, args, meta_data)
+
+    # -------------------------------------------
+    # RUNTIME HELPERS START
+    # -------------------------------------------
+
+    def runtime_helpers(self):
+        """The globals the generated source runs with."""
+        return {
+            "_BUILTINS": self.built_in_functions,
+            "_FN": self.RUN_TIME_FUNCTION,
+            "_memoized": self.memoized,
+            "_DATA": self.RUN_TIME_DATACLASS,
+            "_INSTANCE": self.RUN_TIME_INSTANCE,
+            "_binop": self.eval_bin_op_values,
+            "_unop": self.eval_unary_op_value,
+            "_index": self.run_index,
+            "_fields": self.eval_field_site,
+            "_call": self.call_cached,
+            "_iter": self.run_iter,
+            "_set_field": self.run_set_field,
+            "_field_slot": self.eval_field_slot,
+            "_add_in_place": add_in_place,
+            "_unpack": self.run_unpack,
+            "_index_error": self.run_index_error,
+            "_TAIL": _TailCall,
+            "_tail_calls": tail_calls,
+        }
+
+    def error(self, msg, meta_data):
+        return EvaluatorError(
+            self.file, msg, meta_data.line, meta_data.column_start, meta_data.column_end
+        )
+
+    def run_index(self, index_chain, base, root):
+        return self.eval_index_chain(base, index_chain, root)
+
+    def run_iter(self, bound, meta_data):
+        if type(bound) is int:
+            return range(0, bound, -1 if bound < 0 else 1)
+        try:
+            return iter(bound)
+        except TypeError:
+            raise self.error("bound not iterable", meta_data) from None
+
+    def run_set_field(self, value, base, site, meta_data):
+        values, index = self.eval_field_slot(site, base, meta_data)
+        values[index] = value
+
+    def run_unpack(self, value, count, meta_data):
+        if type(value) not in self.ARRAY_TYPES:
+            raise self.error("multi-variable assignment right hand must be type list", meta_data)
+        if count > len(value):
+            raise self.error("not enough values to unpack", meta_data)
+        return value
+
+    def run_index_error(self, meta_data):
+        raise self.error("Index out of bounds", meta_data)
+
+    # -------------------------------------------
+    # RUNTIME HELPERS END
+    # -------------------------------------------
+
+    def name_error(self, error):
+        # the innermost frame running generated code is the statement that failed
+        name = self.transpiler.bang_name(error)
+        line = None
+        traceback = error.__traceback__
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == SOURCE_FILE_NAME:
+                line = traceback.tb_lineno
+            traceback = traceback.tb_next
+
+        statement = self.transpiler.statement_at(line) if line is not None else None
+        meta_data = None
+        if statement is not None:
+            meta_data = find_name_location(statement, name) or getattr(statement, "meta_data", None)
+        msg = f"Variable {name} not found in current scope"
+        if meta_data is None:
+            return EvaluatorError(self.file, msg, 0, 0, 0)
+        return self.error(msg, meta_data)
@@ -0,0 +1,793 @@
+# lowers the checked, blockenized tree into python source, so that cpython's own
+# compiler and bytecode interpreter end up running the bang program.
+#
+# every bang variable becomes a python local of the function it lives in, named
+# after the bang name plus a unique suffix (x -> x_3). names are resolved the same
+# way the semantic pass scopes them, so a variable created inside of an if body is
+# a different python variable than one with the same name outside of it.
+#
+# a bang call copies the frames its function closed over, while a python closure
+# reads its cells live. the two only disagree when a function writes a captured
+# variable, or when a function nested inside of it reads one after the call that
+# created it is over, so exactly those captured variables are copied into locals
+# when the python function starts.
+#
+# everything that isn't a plain int operation calls back into the evaluator's value
+# level helpers, so every operator, index, field access and call keeps the exact bang
+# semantics and error messages. the few programs whose scoping can't be expressed
+# with python closures raise UnsupportedProgram and run on the closure compiler
+
+import re
+
+from bang.lexing.lexer_tokens import (
+    T_AND_ENUM_VAL,
+    T_ASSIGN_ENUM_VAL,
+    T_ASTERISK_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_GT_ENUM_VAL,
+    T_GTEQ_ENUM_VAL,
+    T_LEQ_ENUM_VAL,
+    T_LT_ENUM_VAL,
+    T_MINUS_ENUM_VAL,
+    T_NEGATE_ENUM_VAL,
+    T_NEQ_ENUM_VAL,
+    T_OR_ENUM_VAL,
+    T_PLUS_ASSIGN_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+    T_UMINUS_ENUM_VAL,
+)
+from bang.parsing.parser_nodes import (
+    ARRAY_LITERAL_NODE_CLASS,
+    ASSIGNMENT_NODE_CLASS,
+    BIN_OP_NODE_CLASS,
+    BLOCK_NODE_CLASS,
+    BREAK_NODE_CLASS,
+    CALL_NODE_CLASS,
+    CONSTANT_ARRAY_NODE_CLASS,
+    CONTINUE_NODE_CLASS,
+    DATA_CLASS_NODE_CLASS,
+    ELIF_NODE_CLASS,
+    EXPRESSION_NODE_CLASS,
+    FIELD_ACCESS_NODE_CLASS,
+    FOR_NODE_CLASS,
+    FUNCTION_NODE_CLASS,
+    IDENTIFIER_NODE_CLASS,
+    IF_NODE_CLASS,
+    INDEX_NODE_CLASS,
+    RETURN_NODE_CLASS,
+    UNARY_OP_NODE_CLASS,
+    WHILE_NODE_CLASS,
+)
+from bang.runtime.evaluator import Evaluator
+from bang.runtime.evaluator_nodes import CALL_SITE, FIELD_SITE
+
+PROGRAM_FUNCTION_NAME = "__bang_program__"
+SOURCE_FILE_NAME = "<bang>"
+
+# int op int in bang is exactly the python operator
+INT_FAST_OPS = {
+    T_PLUS_ENUM_VAL: "+",
+    T_MINUS_ENUM_VAL: "-",
+    T_ASTERISK_ENUM_VAL: "*",
+    T_LT_ENUM_VAL: "<",
+    T_LEQ_ENUM_VAL: "<=",
+    T_GT_ENUM_VAL: ">",
+    T_GTEQ_ENUM_VAL: ">=",
+    T_EQ_ENUM_VAL: "==",
+    T_NEQ_ENUM_VAL: "!=",
+}
+
+# what the constant folder leaves in the tree in place of constant expressions
+FOLDED_TYPES = frozenset((int, float, str, bool, CONSTANT_ARRAY_NODE_CLASS))
+
+# NameError.name isn't set for every kind of unbound name, the message always quotes it
+_QUOTED_NAME = re.compile(r"'([^']+)'")
+_COPY_SUFFIX = re.compile(r"_c\d+$")
+
+
+class UnsupportedProgram(Exception):
+    pass
+
+
+class _Declaration:
+    # one bang variable, owned by one function
+    __slots__ = ("python_name", "function", "shared_frame")
+
+    def __init__(self, python_name, function, shared_frame):
+        self.python_name = python_name
+        self.function = function
+        # the evaluator creates a fresh frame for this variable more than once per
+        # call of its function (scopes inside of loops, while frames). python has one
+        # cell per call, so no other function may capture it
+        self.shared_frame = shared_frame
+
+
+class _Function:
+    __slots__ = ("key", "parent", "loop_depth", "while_depth", "tail_calls")
+
+    def __init__(self, key, parent):
+        self.key = key
+        self.parent = parent
+        self.loop_depth = 0
+        self.while_depth = 0
+        # whether the function returns the result of calling a bang function
+        # anywhere, those return a tail call for _tail_calls to make instead
+        self.tail_calls = False
+
+
+class _Scope:
+    __slots__ = ("names", "reentrant")
+
+    def __init__(self, function):
+        self.names = {}
+        self.reentrant = function.loop_depth > 0
+
+
+class PythonTranspiler:
+    LITERALS = Evaluator.LITERALS
+    ASSIGNMENT_TO_NORMAL_OPS = Evaluator.ASSIGNMENT_TO_NORMAL_OPS
+
+    def __init__(self, roots, built_in_names):
+        self.roots = roots
+        self.built_in_names = list(built_in_names)
+        # function key -> python names of the captured variables the function copies
+        # on entry. the first generating pass finds them and the second one uses them
+        self.copies = {}
+
+    # -------------------------------------------
+    # DRIVER START
+    # -------------------------------------------
+
+    def transpile(self):
+        """Return the python source of the program. It defines PROGRAM_FUNCTION_NAME,
+        which runs the program and returns its locals, and expects constants() and
+        the runtime helpers (see python_engine.py) as its globals."""
+        self.generate()
+        return self.generate()
+
+    def generate(self):
+        self.lines = []
+        # the bang statement each generated line came from, used to report errors
+        self.line_nodes = []
+        self.constant_values = {}
+        # id(CallNode) -> call_site of every generated call
+        self.call_sites = {}
+        # id(FieldAccessNode) -> field_site of every generated field access
+        self.field_sites = {}
+        # python name -> bang name
+        self.bang_names = {}
+        self.name_counter = 0
+        self.function_counter = 0
+        self.temp_counter = 0
+        self.indent = 0
+        self.current_statement = None
+
+        self.function = _Function(0, None)
+        self.scopes = [_Scope(self.function)]
+
+        self.emit(f"def {PROGRAM_FUNCTION_NAME}():")
+        self.indent += 1
+        for name in self.built_in_names:
+            self.emit(f"{self.declare(name)} = _BUILTINS[{name!r}]")
+        for construct in self.roots:
+            self.generate_construct(construct)
+        self.emit("return locals()")
+        self.indent -= 1
+        return "\n".join(self.lines) + "\n"
+
+    def constants(self):
+        return dict(self.constant_values)
+
+    def global_names(self):
+        """Python name -> bang name of every variable of the outermost scope."""
+        return {d.python_name: name for name, d in self.scopes[0].names.items()}
+
+    # -------------------------------------------
+    # DRIVER END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EMITTING START
+    # -------------------------------------------
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+        self.line_nodes.append(self.current_statement)
+
+    def constant(self, value):
+        # tree nodes and field chains reach the helpers through globals
+        name = f"_n{len(self.constant_values)}"
+        self.constant_values[name] = value
+        return name
+
+    def call_site(self, root):
+        # the inline cache of a call (see call_site), shared with the engine
+        self.call_sites[id(root)] = site = CALL_SITE()
+        return self.constant(site)
+
+    def field_site(self, root):
+        # the inline cache of a field access (see field_site), shared with the engine
+        self.field_sites[id(root)] = site = FIELD_SITE(tuple(root.field))
+        return self.constant(site)
+
+    def temp(self):
+        self.temp_counter += 1
+        return f"_t{self.temp_counter}"
+
+    # -------------------------------------------
+    # EMITTING END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # NAMES START
+    # -------------------------------------------
+
+    def declare(self, name):
+        scope = self.scopes[-1]
+        self.name_counter += 1
+        python_name = f"{name}_{self.name_counter}"
+        scope.names[name] = _Declaration(
+            python_name, self.function, scope.reentrant or self.function.while_depth > 0
+        )
+        self.bang_names[python_name] = name
+        return python_name
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            declaration = scope.names.get(name)
+            if declaration is not None:
+                return declaration
+        return None
+
+    def capture(self, declaration, writing):
+        # every function between the owner of the variable and the one using it has
+        # to copy it on entry, since a nested call sees that copy in bang. the function
+        # using the variable only needs its own copy when it writes it
+        python_name = declaration.python_name
+        if declaration.shared_frame:
+            raise UnsupportedProgram(
+                f"{self.bang_names[python_name]} is captured from a frame "
+                "the evaluator creates more than once"
+            )
+        if writing:
+            self.copies.setdefault(self.function.key, set()).add(python_name)
+        function = self.function.parent
+        while function is not declaration.function:
+            self.copies.setdefault(function.key, set()).add(python_name)
+            function = function.parent
+        return self.visible_name(python_name, self.function)
+
+    def visible_name(self, python_name, function):
+        # the name a captured variable has inside of function: its
+        # closest copy, or else the owner's own variable
+        while function is not None:
+            if python_name in self.copies.get(function.key, ()):
+                return f"{python_name}_c{function.key}"
+            function = function.parent
+        return python_name
+
+    def read_name(self, name):
+        declaration = self.lookup(name)
+        if declaration is None:
+            # the semantic pass doesn't check for loop bounds,
+            # these names may only exist at run time
+            raise UnsupportedProgram(f"{name} can't be resolved statically")
+        if declaration.function is self.function:
+            return declaration.python_name
+        return self.capture(declaration, False)
+
+    def write_name(self, name):
+        # like initalize_var, a write goes to the closest existing variable
+        declaration = self.lookup(name)
+        if declaration is None:
+            return self.declare(name)
+        if declaration.function is self.function:
+            return declaration.python_name
+        return self.capture(declaration, True)
+
+    # -------------------------------------------
+    # NAMES END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # STATEMENTS START
+    # -------------------------------------------
+
+    def generate_construct(self, root):
+        self.current_statement = root
+        self.temp_counter = 0
+        type_root = type(root)
+        if type_root is ASSIGNMENT_NODE_CLASS:
+            self.generate_assignment(root)
+        elif type_root is IF_NODE_CLASS:
+            self.generate_if(root)
+        elif type_root is FOR_NODE_CLASS:
+            self.generate_for(root)
+        elif type_root is WHILE_NODE_CLASS:
+            self.generate_while(root)
+        elif type_root is BLOCK_NODE_CLASS:
+            self.generate_block(root)
+        elif type_root is BREAK_NODE_CLASS or type_root is CONTINUE_NODE_CLASS:
+            if not self.function.loop_depth:
+                # a function body inside of a loop passes the semantic pass, python
+                # won't compile it. the closure compiler raises the bang error
+                raise UnsupportedProgram("break or continue outside of a loop of its function")
+            self.emit("break" if type_root is BREAK_NODE_CLASS else "continue")
+        elif type_root is RETURN_NODE_CLASS:
+            expression = root.expression.root_expr
+            if type(expression) is CALL_NODE_CLASS and self.function.parent is not None:
+                self.function.tail_calls = True
+                self.emit(f"return {self.generate_call(expression, tail=True)}")
+            else:
+                self.emit(f"return {self.generate_expression(root.expression)}")
+        elif type_root is FUNCTION_NODE_CLASS:
+            self.generate_function(root)
+        elif type_root is DATA_CLASS_NODE_CLASS:
+            self.generate_dataclass(root)
+        else:
+            # expression statements and calls
+            self.emit(self.generate_expression(root))
+
+    def generate_block(self, root):
+        for construct in root.block:
+            self.generate_construct(construct)
+
+    def generate_body(self, root):
+        start = len(self.lines)
+        self.indent += 1
+        self.generate_block(root)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.indent -= 1
+
+    def generate_scoped_body(self, root):
+        self.scopes.append(_Scope(self.function))
+        self.generate_body(root)
+        self.scopes.pop()
+
+    def generate_if(self, root):
+        keyword = "if"
+        for branch in [root, *root.elif_branch.block]:
+            self.current_statement = branch
+            self.temp_counter = 0
+            self.emit(f"{keyword} {self.generate_expression(branch.condition)}:")
+            self.generate_scoped_body(branch.body)
+            keyword = "elif"
+        # like eval_if, only the first entry of the else branch runs
+        for else_root in root.else_branch.block[:1]:
+            self.current_statement = else_root
+            self.emit("else:")
+            self.generate_scoped_body(else_root.body)
+
+    def generate_for(self, root):
+        meta_data = self.constant(root.meta_data)
+        # the loop frame exists before the bound is evaluated
+        self.scopes.append(_Scope(self.function))
+        bound = self.generate_expression(root.bound)
+        variable = self.write_name(root.variable.value)
+        self.emit(f"for {variable} in _iter({bound}, {meta_data}):")
+        self.function.loop_depth += 1
+        self.generate_body(root.body)
+        self.function.loop_depth -= 1
+        self.scopes.pop()
+
+    def generate_while(self, root):
+        # the semantic pass doesn't give while bodies a scope, but the evaluator runs
+        # them in their own frame, so names first created inside of the loop stop
+        # existing once it is done
+        function = self.function
+        scope = self.scopes[-1]
+        known = set(scope.names)
+        self.emit(f"while {self.generate_expression(root.condition)}:")
+        function.loop_depth += 1
+        function.while_depth += 1
+        self.generate_body(root.body)
+        function.while_depth -= 1
+        function.loop_depth -= 1
+        self.current_statement = root
+        for name, declaration in scope.names.items():
+            if name not in known:
+                self.emit("try:")
+                self.emit(f"    del {declaration.python_name}")
+                self.emit("except NameError:")
+                self.emit("    pass")
+
+    def generate_function(self, root):
+        function_node = self.constant(root)
+        target = self.write_name(root.name)
+
+        self.function_counter += 1
+        function = _Function(self.function_counter, self.function)
+        python_function = f"_fn{function.key}"
+        self.function = function
+        self.scopes.append(_Scope(function))
+
+        # the arguments array is bound after the captured variables are copied, an
+        # argument name that already exists outside of the function writes there
+        local_param = self.lookup(root.arg_list_name) is None
+        param = self.write_name(root.arg_list_name)
+        self.emit(f"def {python_function}({param if local_param else '_args'}):")
+        self.indent += 1
+        for python_name in sorted(self.copies.get(function.key, ())):
+            outer = self.visible_name(python_name, function.parent)
+            self.emit(f"{python_name}_c{function.key} = {outer}")
+        if not local_param:
+            self.emit(f"{param} = _args")
+        self.indent -= 1
+
+        self.generate_body(root.body)
+        self.current_statement = root
+        self.indent += 1
+        # falling off the end of a function returns 0
+        self.emit("return 0")
+        self.indent -= 1
+
+        self.scopes.pop()
+        self.function = function.parent
+        closure = python_function
+        if function.tail_calls:
+            closure = f"_tail_calls({python_function})"
+        value = (
+            f"_FN(body={function_node}.body, params_name={function_node}.arg_list_name, "
+            f"effects={function_node}.effects, closure={closure})"
+        )
+        if root.effects is not None and root.effects.memoize:
+            value = f"_memoized({value})"
+        self.emit(f"{target} = {value}")
+
+    def generate_dataclass(self, root):
+        seen = set()
+        dataclass_fields = [f for f in root.fields if not (f in seen or seen.add(f))]
+        self.emit(f"{self.write_name(root.name)} = _DATA(fields={dataclass_fields!r})")
+
+    # -------------------------------------------
+    # STATEMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # ASSIGNMENTS START
+    # -------------------------------------------
+
+    def generate_assignment(self, root):
+        left_hand = root.left_hand
+        op_type_id = root.op
+        if op_type_id == T_PLUS_ASSIGN_ENUM_VAL and type(left_hand) in (
+            IDENTIFIER_NODE_CLASS,
+            INDEX_NODE_CLASS,
+            FIELD_ACCESS_NODE_CLASS,
+        ):
+            self.generate_add_assignment(root)
+            return
+        parallel = Evaluator.parallel_assignment(root)
+        if parallel is not None:
+            self.generate_parallel_assignment(root, *parallel)
+            return
+        if op_type_id != T_ASSIGN_ENUM_VAL and type(left_hand) is not ARRAY_LITERAL_NODE_CLASS:
+            # x op= y is x = x op y, the right hand is only evaluated once
+            value = self.generate_bin_op(
+                BIN_OP_NODE_CLASS(
+                    left=left_hand,
+                    op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                    right=root.right_hand.root_expr,
+                    meta_data=root.meta_data,
+                )
+            )
+        else:
+            value = self.generate_expression(root.right_hand)
+        self.generate_store(left_hand, value, root, 0)
+
+    def generate_add_assignment(self, root):
+        # x += y, the same steps as the evaluator's eval_add_assignment. x's array (set,
+        # dict) is added to in place when the variable, element or field still holds it
+        # and nothing else refers to it (see add_in_place)
+        left_hand = root.left_hand
+        type_left_hand = type(left_hand)
+        node = self.constant(
+            BIN_OP_NODE_CLASS(
+                left=left_hand,
+                op=T_PLUS_ENUM_VAL,
+                right=root.right_hand.root_expr,
+                meta_data=root.meta_data,
+            )
+        )
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            left = self.generate_expression(left_hand)
+            right = self.generate_expression(root.right_hand)
+            name = self.write_name(left_hand.value)
+            a = self.temp()
+            b = self.temp()
+            self.emit(
+                f"{name} = ({a} + {b} if ((({a} := {left}).__class__ is int) "
+                f"& (({b} := {right}).__class__ is int)) "
+                f"else {a} if {a} is {name} and _add_in_place({a}, {b}) "
+                f"else _binop({a}, {b}, {node}))"
+            )
+            return
+
+        # the element or field is kept as a container and a key
+        meta_data = self.constant(root.meta_data)
+        if type_left_hand is FIELD_ACCESS_NODE_CLASS:
+            self.emit(
+                f"_c0, _k0 = _field_slot({self.field_site(left_hand)}, "
+                f"{self.generate_expression(left_hand.base)}, {self.constant(left_hand.meta_data)})"
+            )
+        else:
+            self.emit(f"_c0 = {self.generate_expression(left_hand.base)}")
+            keys = [self.generate_expression(i) for i in left_hand.index]
+            if len(keys) > 1:
+                self.emit(
+                    f"_c0 = _index([{', '.join(keys[:-1])}], _c0, {self.constant(left_hand)})"
+                )
+            self.emit(f"_k0 = {keys[-1]}")
+        self.emit("try:")
+        self.emit("    _l0 = _c0[_k0]")
+        self.emit("except (IndexError, TypeError, KeyError):")
+        # reading the element fails like reading it anywhere else would
+        self.emit(f"    _index_error({self.constant(left_hand.meta_data)})")
+        self.emit(f"_r0 = {self.generate_expression(root.right_hand)}")
+        self.emit("if (_l0.__class__ is int) & (_r0.__class__ is int):")
+        self.emit("    _r0 = _l0 + _r0")
+        self.emit("else:")
+        self.emit("    try:")
+        self.emit("        _u0 = _c0[_k0] is _l0")
+        self.emit("    except (IndexError, TypeError, KeyError):")
+        self.emit(f"        _index_error({meta_data})")
+        self.emit(f"    _r0 = _l0 if _u0 and _add_in_place(_l0, _r0) else _binop(_l0, _r0, {node})")
+        self.emit("try:")
+        self.emit("    _c0[_k0] = _r0")
+        self.emit("except (IndexError, TypeError, KeyError):")
+        self.emit(f"    _index_error({meta_data})")
+
+    def generate_store(self, left_hand, value, root, depth):
+        type_left_hand = type(left_hand)
+
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            self.emit(f"{self.write_name(left_hand.value)} = {value}")
+
+        elif type_left_hand is INDEX_NODE_CLASS:
+            # the value is computed before the target, as in the evaluator
+            held = f"_v{depth}"
+            self.emit(f"{held} = {value}")
+            target = self.generate_expression(left_hand.base) + "".join(
+                f"[{self.generate_expression(i)}]" for i in left_hand.index
+            )
+            self.emit("try:")
+            self.emit(f"    {target} = {held}")
+            self.emit("except (IndexError, TypeError, KeyError):")
+            self.emit(f"    _index_error({self.constant(root.meta_data)})")
+
+        elif type_left_hand is FIELD_ACCESS_NODE_CLASS:
+            self.emit(
+                f"_set_field({value}, {self.generate_expression(left_hand.base)}, "
+                f"{self.field_site(left_hand)}, {self.constant(left_hand.meta_data)})"
+            )
+
+        else:
+            held = f"_v{depth}"
+            elements = left_hand.elements
+            meta_data = self.constant(root.meta_data)
+            self.emit(f"{held} = _unpack({value}, {len(elements)}, {meta_data})")
+            for i, element in enumerate(elements):
+                self.generate_element_store(element.root_expr, f"{held}[{i}]", root, depth + 1)
+
+    def generate_element_store(self, element_root, element_value, root, depth):
+        if root.op != T_ASSIGN_ENUM_VAL and type(element_root) is not ARRAY_LITERAL_NODE_CLASS:
+            # the current value op the unpacked value
+            op_node = self.constant(
+                BIN_OP_NODE_CLASS(
+                    left=element_root,
+                    op=self.ASSIGNMENT_TO_NORMAL_OPS[root.op],
+                    right=None,
+                    meta_data=root.meta_data,
+                )
+            )
+            current = self.generate_expression(element_root)
+            element_value = f"_binop({current}, {element_value}, {op_node})"
+        self.generate_store(element_root, element_value, root, depth)
+
+    def generate_parallel_assignment(self, root, targets, values):
+        # [a, b] = [x, y] holds every value in a local of its own instead of a list,
+        # all of them are evaluated before the first target is assigned
+        held = [f"_p{i}" for i in range(len(values))]
+        for name, value in zip(held, values, strict=True):
+            self.emit(f"{name} = {self.generate_expression(value)}")
+        for name, target in zip(held, targets, strict=False):
+            self.generate_element_store(target, name, root, 1)
+
+    # -------------------------------------------
+    # ASSIGNMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EXPRESSIONS START
+    # -------------------------------------------
+
+    def generate_expression(self, root):
+        type_root = type(root)
+        if type_root is EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+            type_root = type(root)
+
+        if type_root in self.LITERALS:
+            return repr(self.LITERALS[type_root](root.value))
+
+        if type_root in FOLDED_TYPES:
+            # the constant folder's values, a list display builds a fresh
+            # (nested) list every time it runs, which is what a bang array does
+            return repr(root.value if type_root is CONSTANT_ARRAY_NODE_CLASS else root)
+
+        if type_root is IDENTIFIER_NODE_CLASS:
+            return self.read_name(root.value)
+
+        if type_root is BIN_OP_NODE_CLASS:
+            return self.generate_bin_op(root)
+
+        if type_root is UNARY_OP_NODE_CLASS:
+            operand = self.generate_expression(root.operand)
+            if root.op == T_NEGATE_ENUM_VAL:
+                return f"(not {operand})"
+            a = self.temp()
+            sign = "-" if root.op == T_UMINUS_ENUM_VAL else ""
+            return (
+                f"({sign}{a} if ({a} := {operand}).__class__ is int "
+                f"else _unop({a}, {self.constant(root)}))"
+            )
+
+        if type_root is ARRAY_LITERAL_NODE_CLASS:
+            return "[" + ", ".join(self.generate_expression(i) for i in root.elements) + "]"
+
+        if type_root is INDEX_NODE_CLASS:
+            # every index is evaluated before the base
+            indexes = [self.generate_expression(i) for i in root.index]
+            base = self.generate_expression(root.base)
+            node = self.constant(root)
+            if len(indexes) > 1:
+                return f"_index([{', '.join(indexes)}], {base}, {node})"
+            a = self.temp()
+            b = self.temp()
+            return (
+                f"({b}[{a}] if ((({a} := {indexes[0]}).__class__ is int) "
+                f"& (({b} := {base}).__class__ is list)) and -len({b}) <= {a} < len({b}) "
+                f"else _index([{a}], {b}, {node}))"
+            )
+
+        if type_root is CALL_NODE_CLASS:
+            return self.generate_call(root)
+
+        if type_root is FIELD_ACCESS_NODE_CLASS:
+            base = self.generate_expression(root.base)
+            site = self.field_site(root)
+            meta_data = self.constant(root.meta_data)
+            if len(root.field) > 1:
+                return f"_fields({site}, {base}, {meta_data})"
+            # one field is read right here when the instance has the layout the site
+            # saw last, which only counts the site's misses
+            a = self.temp()
+            b = self.temp()
+            return (
+                f"({a}.values[{b}[1]] if ({a} := {base}).__class__ is _INSTANCE "
+                f"and {a}.offsets is ({b} := {site}.links[0])[0] "
+                f"else _fields({site}, {a}, {meta_data}))"
+            )
+
+        # anything else evaluates to itself, as in eval_expression
+        return self.constant(root)
+
+    def generate_call(self, root, tail=False):
+        root_name = root.name
+        if type(root_name) is IDENTIFIER_NODE_CLASS:
+            func_name = repr(root_name.value)
+            callee = self.read_name(root_name.value)
+        else:
+            func_name = "None"
+            callee = self.generate_expression(root_name)
+        args = "[" + ", ".join(self.generate_expression(i) for i in root.args) + "]"
+        a = self.temp()
+        b = self.temp()
+        # a call in tail position hands the bang function and its arguments back to
+        # the caller's trampoline instead of calling it on top of the returning one
+        call = f"_TAIL({a}, {b})" if tail else f"{a}.closure({b})"
+        return (
+            f"({call} if ((({a} := {callee}).__class__ is _FN) "
+            f"& (({b} := {args}) is not None)) "
+            f"else _call({self.call_site(root)}, {a}, {func_name}, {b}, {self.constant(root)}))"
+        )
+
+    def generate_bin_op(self, root):
+        left = self.generate_expression(root.left)
+        right = self.generate_expression(root.right)
+        if root.op == T_AND_ENUM_VAL:
+            # python's and/or only evaluate the right operand when the left one doesn't
+            # decide the result, and result in the operand that did, like bang's
+            return f"({left} and {right})"
+        if root.op == T_OR_ENUM_VAL:
+            return f"({left} or {right})"
+        node = self.constant(root)
+        python_op = INT_FAST_OPS.get(root.op)
+        if python_op is None:
+            return f"_binop({left}, {right}, {node})"
+        a = self.temp()
+        b = self.temp()
+        # & instead of and, the right operand is evaluated either way
+        return (
+            f"({a} {python_op} {b} if ((({a} := {left}).__class__ is int) "
+            f"& (({b} := {right}).__class__ is int)) else _binop({a}, {b}, {node}))"
+        )
+
+    # -------------------------------------------
+    # EXPRESSIONS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # ERRORS START
+    # -------------------------------------------
+
+    def bang_name(self, error):
+        """The bang variable a NameError raised by the generated code is about."""
+        python_name = getattr(error, "name", None)
+        if python_name is None:
+            match = _QUOTED_NAME.search(str(error))
+            python_name = match.group(1) if match else ""
+        python_name = _COPY_SUFFIX.sub("", python_name)
+        return self.bang_names.get(python_name, python_name)
+
+    def statement_at(self, line):
+        if 1 <= line <= len(self.line_nodes):
+            return self.line_nodes[line - 1]
+        return None
+
+    # -------------------------------------------
+    # ERRORS END
+    # -------------------------------------------
+
+
+def find_name_location(root, name):
+    """Return the meta data the evaluator reports when name can't be found while
+    running the statement root, searching its expressions in evaluation order."""
+    type_root = type(root)
+    if type_root is EXPRESSION_NODE_CLASS:
+        return find_name_location(root.root_expr, name)
+    if type_root is IDENTIFIER_NODE_CLASS:
+        return root.meta_data if root.value == name else None
+    if type_root is BIN_OP_NODE_CLASS:
+        return find_name_location(root.left, name) or find_name_location(root.right, name)
+    if type_root is UNARY_OP_NODE_CLASS:
+        return find_name_location(root.operand, name)
+    if type_root is ARRAY_LITERAL_NODE_CLASS:
+        return _first_location(root.elements, name)
+    if type_root is INDEX_NODE_CLASS:
+        return _first_location(root.index, name) or find_name_location(root.base, name)
+    if type_root is CALL_NODE_CLASS:
+        if type(root.name) is IDENTIFIER_NODE_CLASS:
+            if root.name.value == name:
+                return root.meta_data
+            return _first_location(root.args, name)
+        return find_name_location(root.name, name) or _first_location(root.args, name)
+    if type_root is FIELD_ACCESS_NODE_CLASS:
+        return find_name_location(root.base, name)
+    if type_root is ASSIGNMENT_NODE_CLASS:
+        found = find_name_location(root.right_hand, name)
+        if found is not None:
+            return found
+        left_hand = root.left_hand
+        if type(left_hand) is INDEX_NODE_CLASS:
+            # an indexed target's base is looked up with the assignment's location
+            if type(left_hand.base) is IDENTIFIER_NODE_CLASS and left_hand.base.value == name:
+                return root.meta_data
+            return _first_location(left_hand.index, name)
+        return find_name_location(left_hand, name)
+    if type_root in (IF_NODE_CLASS, ELIF_NODE_CLASS, WHILE_NODE_CLASS):
+        return find_name_location(root.condition, name)
+    if type_root is FOR_NODE_CLASS:
+        return find_name_location(root.bound, name)
+    if type_root is RETURN_NODE_CLASS:
+        return find_name_location(root.expression, name)
+    return None
+
+
+def _first_location(roots, name):
+    for root in roots:
+        found = find_name_location(root, name)
+        if found is not None:
+            return found
+    return None
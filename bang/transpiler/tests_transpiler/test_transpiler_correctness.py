@@ -0,0 +1,149 @@
+import pytest
+
+from bang.lexing.lexer import Lexer
+from bang.parsing.control_flow_parser import ControlFlowParser
+from bang.parsing.expression_parser import ExpressionParser
+from bang.runtime.evaluator import Evaluator, EvaluatorError
+from bang.semantic.semantic_analysis import SemanticAnalysis
+from bang.transpiler.python_engine import PythonEngine
+from bang.transpiler.python_transpiler import PROGRAM_FUNCTION_NAME
+
+
+def build(code: str, tmp_path):
+    """Lexes, parses and semantically checks a Bang program, returning the
+    file text and the roots the transpiler lowers."""
+    src = tmp_path / "temp.bang"
+    src.write_text(code)
+
+    lexer = Lexer(str(src))
+    tokens = lexer.tokenizer()
+
+    e_parser = ExpressionParser(tokens, lexer.text)
+    e_parser.split()
+    e_parser.loading_into_algos()
+
+    roots = ControlFlowParser(lexer.text, e_parser.post_SYA).blockenize()
+    SemanticAnalysis(lexer.text, roots).walk_program()
+    return lexer.text, roots
+
+
+def run(code: str, tmp_path, engine=PythonEngine):
+    runner = engine(*build(code, tmp_path))
+    runner.eval_program()
+    return runner
+
+
+# ----------------------------
+# Generated source
+# ----------------------------
+def test_program_becomes_one_python_function(tmp_path):
+    source = PythonEngine(*build("x = 1\nfor i 10\nx += i\nend\n", tmp_path)).transpile()
+
+    assert source.startswith(f"def {PROGRAM_FUNCTION_NAME}():")
+    assert "for i_" in source
+    compile(source, "<bang>", "exec")
+
+
+def test_bang_functions_become_python_functions(tmp_path):
+    source = PythonEngine(*build("fn f args; return args[0] + 1; end\nf{1}\n", tmp_path)).transpile()
+
+    assert "def _fn1(args_" in source
+    assert "_FN(body=" in source
+
+
+def test_functions_with_tail_calls_are_trampolined(tmp_path):
+    source = PythonEngine(
+        *build("fn f args; return f{1}; end\nfn g args; return len{args} + 1; end\n", tmp_path)
+    ).transpile()
+
+    assert "closure=_tail_calls(_fn1)" in source
+    assert "closure=_fn2)" in source
+
+
+def test_unsupported_programs_fall_back(tmp_path):
+    # every iteration of the loop closes over a fresh if frame, which
+    # python closures can't express
+    code = (
+        "fs = []\nfor i 3\nif 1\nv = i\nfn g a; return v; end\nfs += [g]\nend\nend\n"
+        "r = [fs[0]{}, fs[2]{}]\n"
+    )
+    engine = run(code, tmp_path)
+    assert engine.transpiler is None
+    assert engine.scope_stack[0]["r"] == [0, 2]
+
+
+def test_break_outside_of_a_loop_of_its_function_falls_back(tmp_path):
+    # python won't compile the break, the closure compiler reports it
+    with pytest.raises(EvaluatorError) as error:
+        run("for i 3\nfn f a\nbreak\nend\nf{}\nend\n", tmp_path)
+    assert error.value.msg == "cannot break outside of loop scope"
+
+
+# ----------------------------
+# Execution
+# ----------------------------
+def test_final_globals_are_visible(tmp_path):
+    engine = run("x = 0\nfor i 10\nif i == 5\nbreak\nend\nx += i\nend\n", tmp_path)
+    assert engine.transpiler is not None
+    assert engine.scope_stack[0]["x"] == 0 + 1 + 2 + 3 + 4
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        # writes to captured variables stay inside of the call
+        "x = 1\nfn f args; x += 10; return x; end\nr = [f{}, f{}, x]\n",
+        # nested functions see the variables of the call that created them
+        "fn mk args; c = args[0]; fn inc a; c += 1; return c; end; return inc; end\n"
+        "f = mk{5}\nr = [f{}, f{}]\n",
+        "x = 1\nfn outer args; fn inner a; return x; end; return inner; end\n"
+        "h = outer{}\nx = 100\nr = h{}\n",
+        # an argument name that already exists writes to that variable
+        "x = 5\nfn p x; return x; end\nr = [p{1}, x]\n",
+        # a for loop variable that already exists is reused
+        "i = 7\nfor i 3\nend\nr = i\n",
+        "[a, b] = [1, 2]\n[a, b] += [10, 20]\nr = [a, b]\n",
+        'data P [a, b]\nq = P{1}\nq.b = [1, 2]\nq.b[1] = 5\nr = [q.a, q.b]\n',
+        'r = ["abc" - "b", [1, 2] * [3, 4], [1, 2, 3] / [2], none, true + 1, !0]\n',
+        "fn f args; y = 1; end\nr = f{}\n",
+    ],
+)
+def test_matches_the_evaluator(program, tmp_path):
+    expected = run(program, tmp_path, engine=Evaluator).scope_stack[0]["r"]
+    engine = run(program, tmp_path)
+    assert engine.transpiler is not None
+    assert engine.scope_stack[0]["r"] == expected
+
+
+# ----------------------------
+# Errors
+# ----------------------------
+def test_errors_point_at_the_bang_source(tmp_path):
+    code = "i = 0\nwhile i < 2\nw = i\ni += 1\nend\nprint{1 + w}\n"
+    with pytest.raises(EvaluatorError) as expected:
+        run(code, tmp_path, engine=Evaluator)
+    with pytest.raises(EvaluatorError) as error:
+        run(code, tmp_path)
+
+    assert error.value.msg == "Variable w not found in current scope"
+    assert (error.value.row, error.value.start, error.value.end) == (
+        expected.value.row,
+        expected.value.start,
+        expected.value.end,
+    )
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        "fn g args; return args[0]; end; p = g{1}; p.x = 2\n",
+        "fn g args; return 0.5; end; for i g{}; end\n",
+        "fn g args; return 0; end; x = 1 / g{}\n",
+        "fn g args; return args; end; x = g{1}[5]\n",
+        "fn g args; return args; end; y = g{1}; y[3] = 1\n",
+        "fn g args; return args; end; [a, b] = g{1}\n",
+    ],
+)
+def test_runtime_errors(program, tmp_path):
+    with pytest.raises(EvaluatorError):
+        run(program, tmp_path)
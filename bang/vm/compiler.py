@@ -0,0 +1,587 @@
+# compiles the checked, blockenized tree into flat bytecode for the bang vm.
+# every function body (and the program itself) becomes one code object,
+# a pair of parallel arrays holding the opcodes and their operands.
+# control flow is lowered into jumps, so break/continue/return are
+# plain instructions instead of exceptions unwinding through python frames
+
+from bang.lexing.lexer_tokens import (
+    T_AND_ENUM_VAL,
+    T_ASSIGN_ENUM_VAL,
+    T_OR_ENUM_VAL,
+    T_PLUS_ASSIGN_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+)
+from bang.parsing.parser_nodes import (
+    ARRAY_LITERAL_NODE_CLASS,
+    ASSIGNMENT_NODE_CLASS,
+    BIN_OP_NODE_CLASS,
+    BLOCK_NODE_CLASS,
+    BREAK_NODE_CLASS,
+    CALL_NODE_CLASS,
+    CONSTANT_ARRAY_NODE_CLASS,
+    CONTINUE_NODE_CLASS,
+    DATA_CLASS_NODE_CLASS,
+    EXPRESSION_NODE_CLASS,
+    FIELD_ACCESS_NODE_CLASS,
+    FOR_NODE_CLASS,
+    FUNCTION_NODE_CLASS,
+    IDENTIFIER_NODE_CLASS,
+    IF_NODE_CLASS,
+    INDEX_NODE_CLASS,
+    RETURN_NODE_CLASS,
+    UNARY_OP_NODE_CLASS,
+    WHILE_NODE_CLASS,
+)
+from bang.runtime.evaluator import Evaluator
+from bang.runtime.evaluator_nodes import CALL_SITE, FIELD_SITE
+from bang.runtime.resolver import Resolver
+from bang.semantic.semantic_analysis import SemanticAnalysis
+from bang.vm.opcodes import (
+    BINARY_OP,
+    BUILD_LIST,
+    CALL,
+    COPY_CONST,
+    FIELD_SLOT,
+    FOR_ITER,
+    GET_ITER,
+    HALT,
+    INDEX,
+    INPLACE_ADD,
+    INPLACE_ADD_ITEM,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP,
+    LOAD_CONST,
+    LOAD_FIELDS,
+    LOAD_ITEM,
+    LOAD_NAME,
+    MAKE_DATACLASS,
+    MAKE_FUNCTION,
+    POP_SCOPE,
+    POP_SCOPES,
+    POP_TOP,
+    PUSH_SCOPE,
+    RAISE_ERROR,
+    RETURN_VALUE,
+    REVERSE,
+    ROT_TWO,
+    STORE_ANY,
+    STORE_FIELD,
+    STORE_INDEX,
+    STORE_NAME,
+    TAIL_CALL,
+    UNARY_OP,
+    UNPACK,
+)
+from bang.vm.vm_nodes import CODE_OBJECT
+
+
+class _LoopContext:
+    # what a break/continue inside of a loop needs to know to jump out of it
+    __slots__ = ("is_for", "scope_depth", "continue_target", "break_jumps")
+
+    def __init__(self, is_for, scope_depth, continue_target):
+        self.is_for = is_for
+        self.scope_depth = scope_depth
+        self.continue_target = continue_target
+        self.break_jumps = []
+
+
+class BytecodeCompiler:
+    # literals are turned into their runtime values once, the same conversion
+    # the evaluator does every time it sees one
+    LITERALS = Evaluator.LITERALS
+    ASSIGNMENT_TO_NORMAL_OPS = Evaluator.ASSIGNMENT_TO_NORMAL_OPS
+
+    def __init__(self, roots, resolution=None):
+        self.roots = roots
+        # id(function body) -> code object, the vm looks function bodies up here
+        self.code_objects = {}
+        # id(CallNode) -> call_site of every call instruction
+        self.call_sites = {}
+        # id(field_site) -> field_site of every instruction following fields
+        self.field_sites = {}
+
+        self.code = None
+        self.current_line = 0
+        # if/elif/else scopes opened inside of the current function, a break
+        # has to pop every one of them that was opened inside of its loop
+        self.scope_depth = 0
+        self.loops = []
+        self.func_depth = 0
+        # the vm runs on the evaluator's list frames, every name is compiled to the
+        # (depth, slot) the resolver gave it. the vm resolves the program with its own
+        # built in functions, which end up in the global frame
+        if resolution is None:
+            resolution = Resolver(roots, SemanticAnalysis.BUILT_IN_FUNCTIONS).resolve()
+        self.resolution = resolution
+        self.resolved_names = resolution.names
+
+        self.construct_to_compile = {
+            ASSIGNMENT_NODE_CLASS: self.compile_assignment,
+            IF_NODE_CLASS: self.compile_if,
+            FOR_NODE_CLASS: self.compile_for,
+            WHILE_NODE_CLASS: self.compile_while,
+            BLOCK_NODE_CLASS: self.compile_block,
+            BREAK_NODE_CLASS: self.compile_break,
+            CONTINUE_NODE_CLASS: self.compile_continue,
+            RETURN_NODE_CLASS: self.compile_return,
+            EXPRESSION_NODE_CLASS: self.compile_expression_statement,
+            FUNCTION_NODE_CLASS: self.compile_function,
+            CALL_NODE_CLASS: self.compile_expression_statement,
+            DATA_CLASS_NODE_CLASS: self.compile_dataclass,
+        }
+
+    def compile_program(self):
+        self.code = CODE_OBJECT(name="<program>")
+        for construct in self.roots:
+            self.compile_construct(construct)
+        self.emit(HALT)
+        return self.code
+
+    # -------------------------------------------
+    # EMITTING START
+    # -------------------------------------------
+
+    def emit(self, op, arg=None):
+        code = self.code
+        code.ops.append(op)
+        code.args.append(arg)
+        code.lines.append(self.current_line)
+        return len(code.ops) - 1
+
+    def emit_jump(self, op):
+        # the target is patched in once it is known
+        return self.emit(op, None)
+
+    def patch_jump(self, at, target=None):
+        self.code.args[at] = len(self.code.ops) if target is None else target
+
+    def here(self):
+        return len(self.code.ops)
+
+    # -------------------------------------------
+    # EMITTING END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # STATEMENTS START
+    # -------------------------------------------
+
+    def compile_construct(self, root):
+        meta_data = getattr(root, "meta_data", None)
+        if meta_data is not None:
+            self.current_line = meta_data.line
+        self.construct_to_compile[type(root)](root)
+
+    def compile_block(self, root):
+        for construct in root.block:
+            self.compile_construct(construct)
+
+    def compile_expression_statement(self, root):
+        self.compile_expression(root)
+        self.emit(POP_TOP)
+
+    def compile_scoped_block(self, root):
+        layout = self.resolution.frames[id(root)]
+        if layout is None:
+            # a body declaring nothing runs in the enclosing frame
+            self.compile_block(root)
+            return
+        self.emit(PUSH_SCOPE, layout)
+        self.scope_depth += 1
+        self.compile_block(root)
+        self.scope_depth -= 1
+        self.emit(POP_SCOPE)
+
+    def compile_if(self, root):
+        end_jumps = []
+        branches = [(root.condition, root.body)]
+        branches.extend((e.condition, e.body) for e in root.elif_branch.block)
+        for condition, body in branches:
+            self.compile_expression(condition.root_expr)
+            next_branch = self.emit_jump(JUMP_IF_FALSE)
+            self.compile_scoped_block(body)
+            end_jumps.append(self.emit_jump(JUMP))
+            self.patch_jump(next_branch)
+        for else_root in root.else_branch.block:
+            self.compile_scoped_block(else_root.body)
+            break
+        for at in end_jumps:
+            self.patch_jump(at)
+
+    def compile_for(self, root):
+        layout = self.resolution.frames[id(root.body)]
+        if layout is not None:
+            self.emit(PUSH_SCOPE, layout)
+        self.compile_expression(root.bound.root_expr)
+        self.emit(GET_ITER, root.meta_data)
+
+        loop = _LoopContext(True, self.scope_depth, self.here())
+        exhausted = self.emit_jump(FOR_ITER)
+        self.compile_store_name(self.resolved_names[id(root.variable)])
+        self.loops.append(loop)
+        self.compile_block(root.body)
+        self.loops.pop()
+        self.emit(JUMP, loop.continue_target)
+
+        # an exhausted FOR_ITER already dropped the iterator, a break drops it itself
+        self.patch_jump(exhausted)
+        for at in loop.break_jumps:
+            self.patch_jump(at)
+        if layout is not None:
+            self.emit(POP_SCOPE)
+
+    def compile_while(self, root):
+        layout = self.resolution.frames[id(root.body)]
+        if layout is not None:
+            self.emit(PUSH_SCOPE, layout)
+        loop = _LoopContext(False, self.scope_depth, self.here())
+        self.compile_expression(root.condition.root_expr)
+        exhausted = self.emit_jump(JUMP_IF_FALSE)
+        self.loops.append(loop)
+        self.compile_block(root.body)
+        self.loops.pop()
+        self.emit(JUMP, loop.continue_target)
+
+        self.patch_jump(exhausted)
+        for at in loop.break_jumps:
+            self.patch_jump(at)
+        if layout is not None:
+            self.emit(POP_SCOPE)
+
+    def compile_loop_exit(self, loop):
+        # drop the if/elif/else scopes opened between the loop and this jump
+        opened = self.scope_depth - loop.scope_depth
+        if opened:
+            self.emit(POP_SCOPES, opened)
+
+    def compile_break(self, root):
+        if not self.loops:
+            self.emit(RAISE_ERROR, ("cannot break outside of loop scope", root.meta_data))
+            return
+        loop = self.loops[-1]
+        self.compile_loop_exit(loop)
+        if loop.is_for:
+            self.emit(POP_TOP)
+        loop.break_jumps.append(self.emit_jump(JUMP))
+
+    def compile_continue(self, root):
+        if not self.loops:
+            self.emit(RAISE_ERROR, ("cannot continue outside of loop scope", root.meta_data))
+            return
+        loop = self.loops[-1]
+        self.compile_loop_exit(loop)
+        self.emit(JUMP, loop.continue_target)
+
+    def compile_return(self, root):
+        if not self.func_depth:
+            self.emit(RAISE_ERROR, ("cannot return outside of function scope", root.meta_data))
+            return
+        # the vm throws away the whole frame on return, so open scopes
+        # and loop iterators don't need any cleanup here
+        expression = root.expression.root_expr
+        if type(expression) is CALL_NODE_CLASS:
+            self.compile_call_operands(expression)
+            self.emit(TAIL_CALL, self.call_operand(expression))
+            return
+        self.compile_expression(expression)
+        self.emit(RETURN_VALUE)
+
+    def compile_function(self, root):
+        block = root.body
+
+        saved = (self.code, self.scope_depth, self.loops, self.current_line)
+        self.code = CODE_OBJECT(name=root.name)
+        self.scope_depth = 0
+        self.loops = []
+        self.func_depth += 1
+        self.compile_block(block)
+        self.func_depth -= 1
+        # falling off the end of a function returns 0
+        self.emit(LOAD_CONST, 0)
+        self.emit(RETURN_VALUE)
+        self.code_objects[id(block)] = self.code
+        self.code, self.scope_depth, self.loops, self.current_line = saved
+
+        self.emit(MAKE_FUNCTION, (root, self.resolution.closures[id(root)]))
+        self.compile_store_name(self.resolution.declarations[id(root)])
+
+    def compile_dataclass(self, root):
+        seen = set()
+        dataclass_fields = [f for f in root.fields if not (f in seen or seen.add(f))]
+        self.emit(MAKE_DATACLASS, dataclass_fields)
+        self.compile_store_name(self.resolution.declarations[id(root)])
+
+    # -------------------------------------------
+    # STATEMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # ASSIGNMENTS START
+    # -------------------------------------------
+
+    def compile_assignment(self, root):
+        left_hand = root.left_hand
+        op_type_id = root.op
+
+        if op_type_id == T_PLUS_ASSIGN_ENUM_VAL and type(left_hand) in (
+            IDENTIFIER_NODE_CLASS,
+            INDEX_NODE_CLASS,
+            FIELD_ACCESS_NODE_CLASS,
+        ):
+            self.compile_add_assignment(root)
+            return
+
+        parallel = Evaluator.parallel_assignment(root)
+        if parallel is not None:
+            self.compile_parallel_assignment(root, *parallel)
+            return
+
+        if op_type_id != T_ASSIGN_ENUM_VAL and type(left_hand) is not ARRAY_LITERAL_NODE_CLASS:
+            # x op= y runs as x = x op y
+            self.compile_expression(
+                BIN_OP_NODE_CLASS(
+                    left=left_hand,
+                    op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                    right=root.right_hand.root_expr,
+                    meta_data=root.meta_data,
+                )
+            )
+        else:
+            self.compile_expression(root.right_hand.root_expr)
+
+        self.compile_store(left_hand, op_type_id, root)
+
+    def compile_add_assignment(self, root):
+        # x += y, the same steps as the evaluator's eval_add_assignment: the variable,
+        # element or field is read before y is evaluated and assigned to after
+        left_hand = root.left_hand
+        op_node = BIN_OP_NODE_CLASS(
+            left=left_hand,
+            op=T_PLUS_ENUM_VAL,
+            right=root.right_hand.root_expr,
+            meta_data=root.meta_data,
+        )
+        type_left_hand = type(left_hand)
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            resolved = self.resolved_names[id(left_hand)]
+            self.compile_load(left_hand, left_hand.meta_data)
+            self.compile_expression(root.right_hand.root_expr)
+            if len(resolved.coordinates) != 1:
+                # the frame it is stored in is only known at runtime
+                self.emit(BINARY_OP, op_node)
+                self.emit(STORE_ANY, (resolved.name, resolved))
+                return
+            ((depth, slot),) = resolved.coordinates
+            self.emit(INPLACE_ADD, (resolved.name, depth, slot, op_node))
+            return
+
+        if type_left_hand is FIELD_ACCESS_NODE_CLASS:
+            self.compile_expression(left_hand.base)
+            self.compile_field_operand(FIELD_SLOT, left_hand)
+        else:
+            base_node = left_hand.base
+            if type(base_node) is IDENTIFIER_NODE_CLASS:
+                self.compile_load(base_node, root.meta_data)
+            else:
+                self.compile_expression(base_node)
+            # reading the element fails like reading it anywhere else would
+            index_node = INDEX_NODE_CLASS(base=None, index=[], meta_data=left_hand.meta_data)
+            for idx in left_hand.index[:-1]:
+                self.compile_expression(idx.root_expr)
+                self.emit(ROT_TWO)
+                self.emit(INDEX, (1, index_node))
+            self.compile_expression(left_hand.index[-1].root_expr)
+        self.emit(LOAD_ITEM, left_hand.meta_data)
+        self.compile_expression(root.right_hand.root_expr)
+        self.emit(INPLACE_ADD_ITEM, (op_node, root.meta_data))
+
+    def compile_store(self, left_hand, op_type_id, root):
+        # every store consumes the value on top of the stack
+        type_left_hand = type(left_hand)
+        if type_left_hand is IDENTIFIER_NODE_CLASS:
+            self.compile_store_name(self.resolved_names[id(left_hand)])
+
+        elif type_left_hand is INDEX_NODE_CLASS:
+            base_node = left_hand.base
+            if type(base_node) is IDENTIFIER_NODE_CLASS:
+                self.compile_load(base_node, root.meta_data)
+            else:
+                self.compile_expression(base_node)
+            # same error reporting as the evaluator, every step of the
+            # chain reports on the assignment
+            index_node = INDEX_NODE_CLASS(base=None, index=[], meta_data=root.meta_data)
+            for idx in left_hand.index[:-1]:
+                self.compile_expression(idx.root_expr)
+                # INDEX expects the base on top
+                self.emit(ROT_TWO)
+                self.emit(INDEX, (1, index_node))
+            self.compile_expression(left_hand.index[-1].root_expr)
+            self.emit(STORE_INDEX, root)
+
+        elif type_left_hand is FIELD_ACCESS_NODE_CLASS:
+            self.compile_expression(left_hand.base)
+            self.compile_field_operand(STORE_FIELD, left_hand)
+
+        else:
+            elements = left_hand.elements
+            self.emit(UNPACK, (len(elements), root.meta_data))
+            for element in elements:
+                self.compile_element_store(element.root_expr, op_type_id, root)
+
+    def compile_store_name(self, resolved):
+        if len(resolved.coordinates) != 1:
+            self.emit(STORE_ANY, (resolved.name, resolved))
+            return
+        ((depth, slot),) = resolved.coordinates
+        self.emit(STORE_NAME, (resolved.name, depth, slot))
+
+    def compile_element_store(self, element_node, op_type_id, root):
+        # stores the value on top of the stack in one target of a multi-assignment
+        if op_type_id != T_ASSIGN_ENUM_VAL and type(element_node) is not ARRAY_LITERAL_NODE_CLASS:
+            # current value op unpacked value
+            self.compile_expression(element_node)
+            self.emit(ROT_TWO)
+            self.emit(
+                BINARY_OP,
+                BIN_OP_NODE_CLASS(
+                    left=element_node,
+                    op=self.ASSIGNMENT_TO_NORMAL_OPS[op_type_id],
+                    right=None,
+                    meta_data=root.meta_data,
+                ),
+            )
+        self.compile_store(element_node, op_type_id, root)
+
+    def compile_parallel_assignment(self, root, targets, values):
+        # [a, b] = [x, y] leaves its values on the stack instead of building a list
+        # and unpacking it. values past the last target are evaluated and dropped,
+        # the rest are turned around so the first target finds its value on top
+        for value in values:
+            self.compile_expression(value)
+        for _ in range(len(values) - len(targets)):
+            self.emit(POP_TOP)
+        if len(targets) == 2:
+            self.emit(ROT_TWO)
+        elif len(targets) > 2:
+            self.emit(REVERSE, len(targets))
+        for target in targets:
+            self.compile_element_store(target, root.op, root)
+
+    # -------------------------------------------
+    # ASSIGNMENTS END
+    # -------------------------------------------
+
+    # -------------------------------------------
+    # EXPRESSIONS START
+    # -------------------------------------------
+
+    def compile_expression(self, root):
+        type_root = type(root)
+        if type_root is EXPRESSION_NODE_CLASS:
+            root = root.root_expr
+            type_root = type(root)
+
+        if type_root in self.LITERALS:
+            self.emit(LOAD_CONST, self.LITERALS[type_root](root.value))
+
+        elif type_root is BIN_OP_NODE_CLASS:
+            self.compile_expression(root.left)
+            if root.op == T_AND_ENUM_VAL or root.op == T_OR_ENUM_VAL:
+                # the right operand only runs when the left one doesn't decide the result
+                decided = self.emit_jump(
+                    JUMP_IF_FALSE_OR_POP if root.op == T_AND_ENUM_VAL else JUMP_IF_TRUE_OR_POP
+                )
+                self.compile_expression(root.right)
+                self.patch_jump(decided)
+            else:
+                self.compile_expression(root.right)
+                self.emit(BINARY_OP, root)
+
+        elif type_root is UNARY_OP_NODE_CLASS:
+            self.compile_expression(root.operand)
+            self.emit(UNARY_OP, root)
+
+        elif type_root is ARRAY_LITERAL_NODE_CLASS:
+            for element in root.elements:
+                self.compile_expression(element.root_expr)
+            self.emit(BUILD_LIST, len(root.elements))
+
+        elif type_root is INDEX_NODE_CLASS:
+            # the evaluator computes every index before the base
+            for idx in root.index:
+                self.compile_expression(idx.root_expr)
+            self.compile_expression(root.base)
+            self.emit(INDEX, (len(root.index), root))
+
+        elif type_root is IDENTIFIER_NODE_CLASS:
+            self.compile_load(root, root.meta_data)
+
+        elif type_root is CALL_NODE_CLASS:
+            self.compile_call_operands(root)
+            self.emit(CALL, self.call_operand(root))
+
+        elif type_root is FIELD_ACCESS_NODE_CLASS:
+            self.compile_expression(root.base)
+            self.emit(LOAD_FIELDS, (root.field, root.meta_data, self.field_site(root.field)))
+
+        elif type_root is CONSTANT_ARRAY_NODE_CLASS:
+            self.emit(COPY_CONST, root)
+
+        else:
+            # anything else evaluates to itself, the same as in eval_expression
+            self.emit(LOAD_CONST, root)
+
+    def compile_load(self, root, meta_data):
+        resolved = self.resolved_names[id(root)]
+        if not resolved.coordinates:
+            # declared in none of the frames that can be seen from here
+            self.emit(
+                RAISE_ERROR, (f"Variable {resolved.name} not found in current scope", meta_data)
+            )
+            return
+        # the first coordinate is the innermost frame that may hold the name, the vm only
+        # looks any further (the way load_var does) when that slot isn't set yet
+        depth, slot = resolved.coordinates[0]
+        self.emit(LOAD_NAME, (resolved.name, depth, slot, resolved, meta_data))
+
+    def call_operand(self, root):
+        # every call instruction carries the inline cache of its call (see call_site)
+        self.call_sites[id(root)] = site = CALL_SITE()
+        return len(root.args), self.call_name(root), root, site
+
+    def field_site(self, chain):
+        # every instruction following fields carries an inline cache (see field_site)
+        site = FIELD_SITE(tuple(chain))
+        self.field_sites[id(site)] = site
+        return site
+
+    def compile_field_operand(self, op, left_hand):
+        # the fields before the last one are followed first, op then works on the last
+        # field of the instance they lead to
+        chain = left_hand.field
+        meta_data = left_hand.meta_data
+        if len(chain) > 1:
+            self.emit(LOAD_FIELDS, (chain[:-1], meta_data, self.field_site(chain[:-1])))
+        self.emit(op, (chain[-1], meta_data, self.field_site(chain[-1:])))
+
+    def call_name(self, root):
+        # the callee's name when it is called by name, builtins are found by it
+        if type(root.name) is IDENTIFIER_NODE_CLASS:
+            return root.name.value
+        return None
+
+    def compile_call_operands(self, root):
+        root_name = root.name
+        if type(root_name) is IDENTIFIER_NODE_CLASS:
+            self.compile_load(root_name, root.meta_data)
+        else:
+            self.compile_expression(root_name)
+        for arg in root.args:
+            self.compile_expression(arg.root_expr)
+
+    # -------------------------------------------
+    # EXPRESSIONS END
+    # -------------------------------------------
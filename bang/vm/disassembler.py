@@ -0,0 +1,88 @@
+# human readable listings of compiled bang bytecode, handy for checking
+# what the compiler made out of a hot loop or function
+
+from bang.lexing.lexer_tokens import SYMBOLS, T_UMINUS_ENUM_VAL, T_UPLUS_ENUM_VAL
+from bang.vm.opcodes import (
+    BINARY_OP,
+    CALL,
+    COPY_CONST,
+    FIELD_SLOT,
+    GET_ITER,
+    INDEX,
+    INPLACE_ADD,
+    INPLACE_ADD_ITEM,
+    JUMP_OPCODES,
+    LOAD_FIELDS,
+    LOAD_ITEM,
+    LOAD_NAME,
+    MAKE_FUNCTION,
+    OPCODE_NAMES,
+    PUSH_SCOPE,
+    RAISE_ERROR,
+    STORE_ANY,
+    STORE_FIELD,
+    STORE_INDEX,
+    STORE_NAME,
+    TAIL_CALL,
+    UNARY_OP,
+    UNPACK,
+)
+
+# binary/unary operators are shown by their source symbol
+OPERATOR_SYMBOLS = {token: symbol for symbol, token in SYMBOLS.items()}
+OPERATOR_SYMBOLS[T_UMINUS_ENUM_VAL] = "-"
+OPERATOR_SYMBOLS[T_UPLUS_ENUM_VAL] = "+"
+
+
+def format_operand(op, arg):
+    # operands often carry tree nodes along for error reporting,
+    # only the part that matters for reading the code is shown
+    if arg is None:
+        return ""
+    if op in JUMP_OPCODES:
+        return f"-> {arg}"
+    if op in (LOAD_NAME, STORE_NAME, INPLACE_ADD):
+        return f"{arg[0]!r} ({arg[1]}, {arg[2]})"
+    if op == STORE_ANY:
+        return f"{arg[0]!r} " + " ".join(f"({depth}, {slot})" for depth, slot in arg[1].coordinates)
+    if op in (STORE_FIELD, FIELD_SLOT, RAISE_ERROR):
+        return repr(arg[0])
+    if op == PUSH_SCOPE:
+        return ", ".join(arg.names)
+    if op in (BINARY_OP, UNARY_OP):
+        return OPERATOR_SYMBOLS.get(arg.op, str(arg.op))
+    if op in (CALL, TAIL_CALL):
+        argc, func_name = arg[0], arg[1]
+        return f"{argc} ({func_name})" if func_name is not None else str(argc)
+    if op == INDEX:
+        return str(arg[0])
+    if op == LOAD_FIELDS:
+        return ".".join(arg[0])
+    if op == UNPACK:
+        return str(arg[0])
+    if op in (STORE_INDEX, GET_ITER, LOAD_ITEM, INPLACE_ADD_ITEM):
+        return ""
+    if op == COPY_CONST:
+        return repr(arg.value)
+    if op == MAKE_FUNCTION:
+        return f"{arg[0].name}{{{arg[0].arg_list_name}}}"
+    return repr(arg)
+
+
+def disassemble(code, code_objects=None):
+    """Return the listing of code, followed by the listing of every function
+    body it creates when code_objects (id(body) -> code object) is given."""
+    lines = [f"disassembly of {code.name}:"]
+    last_line = None
+    for offset, (op, arg, line) in enumerate(zip(code.ops, code.args, code.lines, strict=True)):
+        line_col = f"{line:>4}" if line != last_line else "    "
+        last_line = line
+        operand = format_operand(op, arg)
+        lines.append(f"{line_col}  {offset:>5}  {OPCODE_NAMES[op]:<15} {operand}".rstrip())
+
+    if code_objects:
+        for op, arg in zip(code.ops, code.args, strict=True):
+            if op == MAKE_FUNCTION:
+                lines.append("")
+                lines.append(disassemble(code_objects[id(arg[0].body)], code_objects))
+    return "\n".join(lines)
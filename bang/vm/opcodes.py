@@ -0,0 +1,73 @@
+# the instruction set of the bang virtual machine.
+# every instruction is one opcode from this file plus one operand
+# (None when the instruction doesn't need one). the compiler lays them
+# out in two parallel arrays so the vm only ever indexes two lists
+
+# loading and storing values
+LOAD_CONST = 0  # operand: the value
+# names are read and written at the (depth, slot) the resolver gave them
+LOAD_NAME = 1  # operand: (name, depth, slot, resolved_name, meta_data)
+STORE_NAME = 2  # operand: (name, depth, slot)
+# a write of a name more than one frame may hold goes to the innermost of them holding
+# it, which is only known at runtime (see Evaluator.store_slot)
+STORE_ANY = 35  # operand: (name, resolved_name)
+POP_TOP = 3
+ROT_TWO = 4
+REVERSE = 34  # operand: how many values on top of the stack to turn around
+
+# operations
+BINARY_OP = 5  # operand: the BinOpNode (op id + meta data for errors)
+UNARY_OP = 6  # operand: the UnaryOpNode
+BUILD_LIST = 7  # operand: number of elements
+# pushes a fresh copy of an array the constant folder worked out ahead of time
+COPY_CONST = 27  # operand: ConstantArrayNode
+
+# indexing / fields
+INDEX = 8  # operand: (number of indexes, IndexNode)
+STORE_INDEX = 9  # operand: AssignmentNode (meta data for errors)
+# the field instructions carry the inline cache of their chain (see field_site)
+LOAD_FIELDS = 10  # operand: (field chain, meta_data, field_site)
+STORE_FIELD = 11  # operand: (field name, meta_data, field_site)
+UNPACK = 12  # operand: (number of targets, meta_data)
+# x += y. the value of x is below y on the stack, and x's array (set, dict) is
+# added to in place when nothing else refers to it (see add_in_place)
+INPLACE_ADD = 28  # operand: (name, depth, slot, BinOpNode)
+# an element or field being added to is kept on the stack as container, key.
+# FIELD_SLOT turns an instance into its values and the field's index, LOAD_ITEM
+# pushes the value the slot holds and INPLACE_ADD_ITEM consumes all three and y
+FIELD_SLOT = 29  # operand: (field name, meta_data, field_site)
+LOAD_ITEM = 30  # operand: meta_data
+INPLACE_ADD_ITEM = 31  # operand: (BinOpNode, meta_data)
+
+# scopes
+PUSH_SCOPE = 13  # operand: the frame_layout of the frame to push
+POP_SCOPE = 14
+POP_SCOPES = 15  # operand: how many scopes to drop
+
+# control flow, jump operands are absolute instruction offsets
+JUMP = 16
+JUMP_IF_FALSE = 17
+# && and ||: jump leaving the left operand on the stack when it decides the result,
+# otherwise pop it and go on to the right operand
+JUMP_IF_FALSE_OR_POP = 32
+JUMP_IF_TRUE_OR_POP = 33
+GET_ITER = 18  # operand: meta_data
+FOR_ITER = 19  # operand: offset to jump to once the iterator is exhausted
+
+# functions
+MAKE_FUNCTION = 20  # operand: (FunctionNode, depths of the scopes it closes over)
+MAKE_DATACLASS = 21  # operand: list of unique field names
+CALL = 22  # operand: (number of args, callee name or None, CallNode, call_site)
+RETURN_VALUE = 23
+# returns the result of a call (operand as CALL). a bang function is run in place
+# of the returning one instead of on top of it, so tail calls don't pile up frames
+TAIL_CALL = 26
+
+RAISE_ERROR = 24  # operand: (message, meta_data)
+HALT = 25
+
+OPCODE_NAMES = {
+    value: name for name, value in list(globals().items()) if name.isupper() and type(value) is int
+}
+
+JUMP_OPCODES = {JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, FOR_ITER}
@@ -0,0 +1,209 @@
+import pytest
+
+from bang.lexing.lexer import Lexer
+from bang.parsing.control_flow_parser import ControlFlowParser
+from bang.parsing.expression_parser import ExpressionParser
+from bang.runtime.evaluator import EvaluatorError
+from bang.semantic.semantic_analysis import SemanticAnalysis
+from bang.vm import opcodes
+from bang.vm.compiler import BytecodeCompiler
+from bang.vm.disassembler import disassemble
+from bang.vm.vm import VirtualMachine
+
+
+def build(code: str, tmp_path):
+    """Lexes, parses and semantically checks a Bang program, returning the
+    file text and the roots the vm compiles."""
+    src = tmp_path / "temp.bang"
+    src.write_text(code)
+
+    lexer = Lexer(str(src))
+    tokens = lexer.tokenizer()
+
+    e_parser = ExpressionParser(tokens, lexer.text)
+    e_parser.split()
+    e_parser.loading_into_algos()
+
+    roots = ControlFlowParser(lexer.text, e_parser.post_SYA).blockenize()
+    SemanticAnalysis(lexer.text, roots).walk_program()
+    return lexer.text, roots
+
+
+def run(code: str, tmp_path):
+    vm = VirtualMachine(*build(code, tmp_path))
+    vm.eval_program()
+    return vm
+
+
+# ----------------------------
+# Compiler output
+# ----------------------------
+def test_loops_compile_to_jumps(tmp_path):
+    _, roots = build("x = 0\nfor i 10\nif i == 5\ny = i\nbreak\nend\nx += i\nend\n", tmp_path)
+    code = BytecodeCompiler(roots).compile_program()
+
+    assert code.ops[-1] == opcodes.HALT
+    assert opcodes.FOR_ITER in code.ops
+    # the break leaves the if scope and the loop iterator before jumping out
+    assert opcodes.POP_SCOPES in code.ops
+    for op, arg in zip(code.ops, code.args):
+        if op in opcodes.JUMP_OPCODES:
+            assert 0 <= arg <= len(code.ops)
+
+
+def test_blocks_declaring_nothing_open_no_scope(tmp_path):
+    _, roots = build("x = 0\nfor i 10\nif i == 5\nbreak\nend\nx += i\nend\n", tmp_path)
+    code = BytecodeCompiler(roots).compile_program()
+    # the loop body declares i, the if body nothing
+    assert code.ops.count(opcodes.PUSH_SCOPE) == 1
+    assert opcodes.POP_SCOPES not in code.ops
+
+
+def test_function_bodies_are_compiled_once(tmp_path):
+    _, roots = build("fn f args; return args[0] + 1; end\nf{1}\nf{2}\n", tmp_path)
+    compiler = BytecodeCompiler(roots)
+    compiler.compile_program()
+
+    assert len(compiler.code_objects) == 1
+    (body,) = compiler.code_objects.values()
+    assert body.name == "f"
+    assert body.ops[-1] == opcodes.RETURN_VALUE
+
+
+def test_returned_calls_compile_to_tail_calls(tmp_path):
+    _, roots = build("fn f args; return f{args[0] - 1}; end\n", tmp_path)
+    compiler = BytecodeCompiler(roots)
+    compiler.compile_program()
+
+    (body,) = compiler.code_objects.values()
+    assert opcodes.CALL not in body.ops
+    assert "TAIL_CALL       1 (f)" in disassemble(body)
+
+
+def test_add_assignments_compile_to_in_place_adds(tmp_path):
+    code = "data P [f]\np = P{[1]}\nx = [1]\nx += [2]\ny = [[1]]\ny[0] += [3]\np.f += [4]\n"
+    _, roots = build(code, tmp_path)
+    program = BytecodeCompiler(roots).compile_program()
+    listing = disassemble(program)
+
+    assert opcodes.BINARY_OP not in program.ops
+    assert "INPLACE_ADD     'x'" in listing
+    assert listing.count("INPLACE_ADD_ITEM") == 2
+    assert "FIELD_SLOT      'f'" in listing
+
+
+def test_names_compile_to_their_frame_slots(tmp_path):
+    _, roots = build("x = 1\nfor i 2\n    y = x\n    x += y\nend\n", tmp_path)
+    compiler = BytecodeCompiler(roots)
+    listing = disassemble(compiler.compile_program())
+    x = compiler.resolution.global_frame.names.index("x")
+
+    assert f"STORE_NAME      'x' (0, {x})" in listing
+    assert "PUSH_SCOPE      i, y" in listing
+    assert "STORE_NAME      'y' (1, 1)" in listing
+    assert f"INPLACE_ADD     'x' (0, {x})" in listing
+
+
+def test_names_more_than_one_frame_may_hold_are_stored_at_runtime(tmp_path):
+    _, roots = build("for i 2\n    if i\n        x = 1\n    end\n    x = 2\nend\n", tmp_path)
+    listing = disassemble(BytecodeCompiler(roots).compile_program())
+
+    # the if's own slot, then the one the loop body declares further down
+    assert "STORE_ANY       'x' (2, 0) (1, 1)" in listing
+    assert "STORE_NAME      'x' (1, 1)" in listing
+
+
+def test_and_or_compile_to_jumps_over_their_right_operand(tmp_path):
+    _, roots = build("a = 1\nx = a && a + 1\ny = a || a + 2\n", tmp_path)
+    code = BytecodeCompiler(roots).compile_program()
+
+    assert opcodes.BINARY_OP in code.ops
+    for jump in (opcodes.JUMP_IF_FALSE_OR_POP, opcodes.JUMP_IF_TRUE_OR_POP):
+        at = code.ops.index(jump)
+        # past the right operand, to the instruction storing the result
+        assert code.ops[code.args[at]] == opcodes.STORE_NAME
+        assert opcodes.BINARY_OP in code.ops[at:code.args[at]]
+
+
+def test_literal_multi_assignments_build_no_list(tmp_path):
+    _, roots = build("a = 1\nb = 2\nc = 3\n[a, b] = [b, a]\n[a, b, c] = [c, a, b]\n", tmp_path)
+    ops = BytecodeCompiler(roots).compile_program().ops
+    assert opcodes.BUILD_LIST not in ops
+    assert opcodes.UNPACK not in ops
+    assert opcodes.ROT_TWO in ops
+    assert opcodes.REVERSE in ops
+
+    _, roots = build("a = 1\nb = 2\n[a, [b]] = [b, [a]]\n", tmp_path)
+    # nested targets still unpack the right hand
+    assert opcodes.UNPACK in BytecodeCompiler(roots).compile_program().ops
+
+
+def test_disassembler_lists_every_code_object(tmp_path):
+    _, roots = build("fn f args; return args[0] * 2; end\nprint{f{21}}\n", tmp_path)
+    compiler = BytecodeCompiler(roots)
+    listing = disassemble(compiler.compile_program(), compiler.code_objects)
+
+    assert "disassembly of <program>:" in listing
+    assert "disassembly of f:" in listing
+    assert "MAKE_FUNCTION" in listing
+    assert "BINARY_OP       *" in listing
+    assert "CALL            1 (print)" in listing
+
+
+# ----------------------------
+# Execution
+# ----------------------------
+def test_break_and_continue_restore_scopes(tmp_path):
+    vm = run(
+        "x = 0\n"
+        "for i 10\nif i == 2\ncontinue\nend\nif i == 6\nif true\nbreak\nend\nend\nx += i\nend\n"
+        "while true\nif x > 0\nbreak\nend\nend\n",
+        tmp_path,
+    )
+    assert vm.scope_stack[-1]["x"] == 0 + 1 + 3 + 4 + 5
+    assert len(vm.scope_stack) == 1
+
+
+def test_return_from_nested_loops(tmp_path):
+    vm = run(
+        "fn find args\nfor i 10\nfor j 10\nif i * j == 12\nreturn [i, j]\nend\nend\nend\n"
+        "return 0\nend\nr = find{}\n",
+        tmp_path,
+    )
+    assert vm.scope_stack[-1]["r"] == [2, 6]
+
+
+def test_calls_do_not_use_the_python_stack(tmp_path):
+    # far deeper than the python recursion limit
+    vm = run(
+        "fn down args\nif args[0] == 0\nreturn 0\nend\nreturn down{args[0] - 1} + 1\nend\n"
+        "r = down{20000}\n",
+        tmp_path,
+    )
+    assert vm.scope_stack[-1]["r"] == 20000
+
+
+def test_closures_and_first_class_builtins(tmp_path):
+    vm = run(
+        "fn mk args; c = args[0]; fn inc a; c += 1; return c; end; return inc; end\n"
+        "f = mk{5}\nr = [f{}, f{}]\n"
+        "fn pick args; return len; end\nn = pick{}{[1, 2, 3]}\n",
+        tmp_path,
+    )
+    assert vm.scope_stack[-1]["r"] == [6, 6]
+    assert vm.scope_stack[-1]["n"] == 3
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        "fn g args; return args[0]; end; p = g{1}; p.x = 2\n",
+        "fn g args; return 0.5; end; for i g{}; end\n",
+        "fn g args; return 0; end; x = 1 / g{}\n",
+        "fn g args; return args; end; x = g{1}[5]\n",
+        "fn g args; return args; end; [a, b] = g{1}\n",
+    ],
+)
+def test_vm_runtime_errors(program, tmp_path):
+    with pytest.raises(EvaluatorError):
+        run(program, tmp_path)
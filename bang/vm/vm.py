@@ -0,0 +1,416 @@
+# a stack based virtual machine for bang bytecode.
+# the vm is an Evaluator so it shares the built in functions and every value
+# level operation (binary/unary ops, indexing, fields, calling dataclasses
+# and built ins) with the tree walker, only the execution model is different:
+# one dispatch loop runs flat instruction arrays, and calls push a frame onto the
+# vm's own call stack instead of recursing through python
+
+from bang.lexing.lexer_tokens import (
+    T_ASTERISK_ENUM_VAL,
+    T_EQ_ENUM_VAL,
+    T_GT_ENUM_VAL,
+    T_GTEQ_ENUM_VAL,
+    T_LEQ_ENUM_VAL,
+    T_LT_ENUM_VAL,
+    T_MINUS_ENUM_VAL,
+    T_NEQ_ENUM_VAL,
+    T_PLUS_ENUM_VAL,
+)
+from bang.runtime.binary_operations import add_in_place
+from bang.runtime.evaluator import Evaluator, EvaluatorError
+from bang.runtime.evaluator_nodes import UNSET
+from bang.runtime.resolver import Resolver
+from bang.vm.compiler import BytecodeCompiler
+from bang.vm.opcodes import (
+    BINARY_OP,
+    BUILD_LIST,
+    CALL,
+    COPY_CONST,
+    FIELD_SLOT,
+    FOR_ITER,
+    GET_ITER,
+    HALT,
+    INDEX,
+    INPLACE_ADD,
+    INPLACE_ADD_ITEM,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP,
+    LOAD_CONST,
+    LOAD_FIELDS,
+    LOAD_ITEM,
+    LOAD_NAME,
+    MAKE_DATACLASS,
+    MAKE_FUNCTION,
+    POP_SCOPE,
+    POP_SCOPES,
+    POP_TOP,
+    PUSH_SCOPE,
+    RAISE_ERROR,
+    RETURN_VALUE,
+    REVERSE,
+    ROT_TWO,
+    STORE_ANY,
+    STORE_FIELD,
+    STORE_INDEX,
+    STORE_NAME,
+    TAIL_CALL,
+    UNARY_OP,
+    UNPACK,
+)
+
+# between two numbers these behave exactly like python, everything else goes
+# through the evaluator's binary operation handling
+_NUMERIC = frozenset((int, float, bool))
+_NUMERIC_OPS = {
+    T_PLUS_ENUM_VAL: lambda a, b: a + b,
+    T_MINUS_ENUM_VAL: lambda a, b: a - b,
+    T_ASTERISK_ENUM_VAL: lambda a, b: a * b,
+    T_LT_ENUM_VAL: lambda a, b: a < b,
+    T_LEQ_ENUM_VAL: lambda a, b: a <= b,
+    T_GT_ENUM_VAL: lambda a, b: a > b,
+    T_GTEQ_ENUM_VAL: lambda a, b: a >= b,
+    T_EQ_ENUM_VAL: lambda a, b: a == b,
+    T_NEQ_ENUM_VAL: lambda a, b: a != b,
+}
+
+
+class VirtualMachine(Evaluator):
+    def __init__(self, file, roots):
+        super().__init__(file, roots)
+        self.resolution = Resolver(roots, self.built_in_functions).resolve()
+        self.resolved_names = self.resolution.names
+        self.compiler = BytecodeCompiler(roots, self.resolution)
+        self.program_code = self.compiler.compile_program()
+        self.code_objects = self.compiler.code_objects
+        self.call_sites = self.compiler.call_sites
+        self.field_sites = self.compiler.field_sites
+
+    def eval_program(self):
+        self.frames = [self.resolution.global_frame.template[:]]
+        self.run(self.program_code)
+        self.publish_globals()
+
+    def eval_call(self, callee, args, meta_data):
+        # only reached when something other than the dispatch loop calls a
+        # function value, the loop itself never recurses for bang calls
+        saved = self.frames, self.shared_depth, self.shared_snapshot
+        try:
+            return self.run(self.code_objects[id(callee.body)], callee, args)
+        finally:
+            self.frames, self.shared_depth, self.shared_snapshot = saved
+
+    def raise_error(self, msg, meta_data):
+        raise EvaluatorError(
+            self.file, msg, meta_data.line, meta_data.column_start, meta_data.column_end
+        )
+
+    def run(self, code, callee=None, args=None):
+        RUN_TIME_FUNCTION = self.RUN_TIME_FUNCTION
+        RUN_TIME_DATACLASS = self.RUN_TIME_DATACLASS
+        ARRAY_TYPES = self.ARRAY_TYPES
+        code_objects = self.code_objects
+        eval_bin_op_values = self.eval_bin_op_values
+        eval_unary_op_value = self.eval_unary_op_value
+        eval_index_chain = self.eval_index_chain
+        eval_field_site = self.eval_field_site
+        eval_field_slot = self.eval_field_slot
+        call_cached = self.call_cached
+        enter_call = self.enter_call
+        closure_frames = self.closure_frames
+        load_var = self.load_var
+        store_var = self.store_var
+        NUMERIC = _NUMERIC
+        NUMERIC_OPS = _NUMERIC_OPS
+
+        # calls share the frames their function closed over, the same as in the
+        # evaluator (see enter_call), self.frames always is the running call's frames
+        if callee is not None:
+            enter_call(callee, args)
+        frames = self.frames
+        ops = code.ops
+        opargs = code.args
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        # (ops, opargs, pc, stack, frames, shared_depth, shared_snapshot) of every
+        # caller inside of this run
+        calls = []
+
+        while True:
+            op = ops[pc]
+            arg = opargs[pc]
+            pc += 1
+
+            if op == LOAD_NAME:
+                value = frames[arg[1]][arg[2]]
+                if value is UNSET:
+                    # looked for further out, or reported, the way the evaluator does
+                    value = load_var(arg[3], arg[4])
+                push(value)
+
+            elif op == LOAD_CONST:
+                push(arg)
+
+            elif op == BINARY_OP:
+                right = pop()
+                left = pop()
+                if type(left) in NUMERIC and type(right) in NUMERIC and arg.op in NUMERIC_OPS:
+                    push(NUMERIC_OPS[arg.op](left, right))
+                else:
+                    push(eval_bin_op_values(left, right, arg))
+
+            elif op == STORE_NAME:
+                frames[arg[1]][arg[2]] = pop()
+
+            elif op == STORE_ANY:
+                store_var(arg[1], pop())
+
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+
+            elif op == FOR_ITER:
+                try:
+                    push(next(stack[-1]))
+                except StopIteration:
+                    pop()
+                    pc = arg
+
+            elif op == CALL:
+                argc, func_name, call_node, site = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                func = pop()
+                if type(func) is RUN_TIME_FUNCTION:
+                    site.hits += 1
+                    calls.append(
+                        (ops, opargs, pc, stack, frames, self.shared_depth, self.shared_snapshot)
+                    )
+                    code = code_objects[id(func.body)]
+                    ops = code.ops
+                    opargs = code.args
+                    pc = 0
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    enter_call(func, call_args)
+                    frames = self.frames
+                else:
+                    push(call_cached(site, func, func_name, call_args, call_node))
+
+            elif op == TAIL_CALL:
+                argc, func_name, call_node, site = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                func = pop()
+                if type(func) is RUN_TIME_FUNCTION:
+                    site.hits += 1
+                    # same as CALL, except the returning function's frame is
+                    # replaced instead of kept around for the call to return to
+                    code = code_objects[id(func.body)]
+                    ops = code.ops
+                    opargs = code.args
+                    pc = 0
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    enter_call(func, call_args)
+                    frames = self.frames
+                    continue
+                value = call_cached(site, func, func_name, call_args, call_node)
+                if not calls:
+                    return value
+                ops, opargs, pc, stack, frames, self.shared_depth, self.shared_snapshot = (
+                    calls.pop()
+                )
+                self.frames = frames
+                push = stack.append
+                pop = stack.pop
+                push(value)
+
+            elif op == RETURN_VALUE:
+                value = pop()
+                if not calls:
+                    # the function this run was started for is returning
+                    return value
+                ops, opargs, pc, stack, frames, self.shared_depth, self.shared_snapshot = (
+                    calls.pop()
+                )
+                self.frames = frames
+                push = stack.append
+                pop = stack.pop
+                push(value)
+
+            elif op == POP_TOP:
+                pop()
+
+            elif op == INDEX:
+                count, index_node = arg
+                base = pop()
+                if count == 1:
+                    indexes = [pop()]
+                else:
+                    indexes = stack[-count:]
+                    del stack[-count:]
+                push(eval_index_chain(base, indexes, index_node))
+
+            elif op == PUSH_SCOPE:
+                frames.append(arg.template[:])
+
+            elif op == POP_SCOPE:
+                frames.pop()
+
+            elif op == POP_SCOPES:
+                del frames[-arg:]
+
+            elif op == UNARY_OP:
+                push(eval_unary_op_value(pop(), arg))
+
+            elif op == COPY_CONST:
+                push(arg.materialize())
+
+            elif op == BUILD_LIST:
+                if arg:
+                    values = stack[-arg:]
+                    del stack[-arg:]
+                    push(values)
+                else:
+                    push([])
+
+            elif op == GET_ITER:
+                bound = pop()
+                if type(bound) is int:
+                    push(iter(range(0, bound, -1 if bound < 0 else 1)))
+                else:
+                    try:
+                        push(iter(bound))
+                    except TypeError:
+                        self.raise_error("bound not iterable", arg)
+
+            elif op == STORE_INDEX:
+                final_idx = pop()
+                target = pop()
+                value = pop()
+                try:
+                    target[final_idx] = value
+                except (IndexError, TypeError, KeyError):
+                    self.raise_error("Index out of bounds", arg.meta_data)
+
+            elif op == LOAD_FIELDS:
+                push(eval_field_site(arg[2], pop(), arg[1]))
+
+            elif op == STORE_FIELD:
+                target = pop()
+                values, index = eval_field_slot(arg[2], target, arg[1])
+                values[index] = pop()
+
+            elif op == INPLACE_ADD:
+                _, depth, slot, op_node = arg
+                # popped into locals so the stack doesn't count as a reference
+                value = pop()
+                left = pop()
+                frame = frames[depth]
+                if type(left) in NUMERIC and type(value) in NUMERIC:
+                    frame[slot] = left + value
+                elif frame[slot] is not left or not add_in_place(left, value):
+                    frame[slot] = eval_bin_op_values(left, value, op_node)
+
+            elif op == FIELD_SLOT:
+                values, index = eval_field_slot(arg[2], pop(), arg[1])
+                push(values)
+                push(index)
+
+            elif op == LOAD_ITEM:
+                try:
+                    push(stack[-2][stack[-1]])
+                except (IndexError, TypeError, KeyError):
+                    self.raise_error("Index out of bounds", arg)
+
+            elif op == INPLACE_ADD_ITEM:
+                op_node, meta_data = arg
+                value = pop()
+                left = pop()
+                key = pop()
+                target = pop()
+                if type(left) in NUMERIC and type(value) in NUMERIC:
+                    value = left + value
+                else:
+                    try:
+                        unchanged = target[key] is left
+                    except (IndexError, TypeError, KeyError):
+                        self.raise_error("Index out of bounds", meta_data)
+                    if unchanged and add_in_place(left, value):
+                        continue
+                    value = eval_bin_op_values(left, value, op_node)
+                try:
+                    target[key] = value
+                except (IndexError, TypeError, KeyError):
+                    self.raise_error("Index out of bounds", meta_data)
+
+            elif op == UNPACK:
+                count, meta_data = arg
+                value = pop()
+                if type(value) not in ARRAY_TYPES:
+                    self.raise_error(
+                        "multi-variable assignment right hand must be type list", meta_data
+                    )
+                if count > len(value):
+                    self.raise_error("not enough values to unpack", meta_data)
+                # pushed in reverse so the first target finds its value on top
+                for i in range(count - 1, -1, -1):
+                    push(value[i])
+
+            elif op == ROT_TWO:
+                stack[-1], stack[-2] = stack[-2], stack[-1]
+
+            elif op == REVERSE:
+                stack[-arg:] = stack[: -arg - 1 : -1]
+
+            elif op == MAKE_FUNCTION:
+                node, depths = arg
+                # only the frames declaring a name the function refers to are kept
+                function = RUN_TIME_FUNCTION(
+                    body=node.body,
+                    params_name=node.arg_list_name,
+                    closure=closure_frames(depths),
+                    effects=node.effects,
+                )
+                if node.effects is not None and node.effects.memoize:
+                    function = self.memoized(function)
+                push(function)
+
+            elif op == MAKE_DATACLASS:
+                push(RUN_TIME_DATACLASS(fields=list(arg)))
+
+            elif op == RAISE_ERROR:
+                self.raise_error(arg[0], arg[1])
+
+            elif op == HALT:
+                return None
+
+            else:
+                raise RuntimeError(f"unknown opcode {op}")
@@ -0,0 +1,18 @@
+from dataclasses import dataclass, field
+
+
+# one compiled unit of bang code, either the program itself or the body of a function.
+# ops[i] is the opcode of instruction i, args[i] its operand and lines[i] the source
+# line it came from (only used for disassembling)
+@dataclass(slots=True)
+class code_object:
+    name: str
+    ops: list[int] = field(default_factory=list)
+    args: list = field(default_factory=list)
+    lines: list[int] = field(default_factory=list)
+
+    def __repr__(self) -> str:
+        return f"<code {self.name}>"
+
+
+CODE_OBJECT = code_object